@@ -1,302 +1,272 @@
 import streamlit as st
-import pandas as pd
-import re
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import os
+import time
 from itertools import combinations
-from fuzzywuzzy import process, fuzz  # [추가] 오타 보정 라이브러리
+from drug_engine import DrugEngine, DATA_FILE
+from drug_kvstore import PAIR_FILE
+from drug_warmup import start_warmup, append_query_log
+from drug_chat_history import render_chat_history
+from drug_names import split_drug_list
+from drug_session import NAMES, DiskSpill, SessionStore, render_message, text_message
+from drug_reload import EngineHolder, PollingReloader
+from drug_snapshot import SNAPSHOT_ROOT, CURRENT_FILE, load_snapshot_engine
 
-# --- 1. 데이터 로드 (CSV 읽기 + 오타 보정용 DB 생성) ---
-@st.cache_data
-def load_data():
-    """CSV 파일을 읽고 검색 최적화 및 오타 보정용 리스트를 생성합니다."""
-    file_path = 'druglist.csv'
-    
-    if not os.path.exists(file_path):
-        st.error(f"❌ '{file_path}' 파일이 없습니다. 같은 폴더에 넣어주세요.")
-        return None, None
-        
-    try:
-        # CSV 읽기 (UTF-8)
-        df = pd.read_csv(file_path, encoding='utf-8', dtype=str)
-        df['상세정보'] = df['상세정보'].fillna('상호작용 정보 없음')
-        
-        # [속도 향상] 검색용 'clean' 컬럼 미리 생성
-        clean_rule = r'[\s\(\)\[\]_/\-\.]|주사제|정제|정|약|캡슐|시럽|약물'
-        for col in ['제품명A', '성분명A', '제품명B', '성분명B']:
-            df[col + '_clean'] = df[col].astype(str).str.lower().str.replace(clean_rule, '', regex=True)
-            
-        # [추가] 오타 보정용 전체 이름 리스트 생성
-        combined_names = pd.concat([
-            df['제품명A'], df['성분명A'],
-            df['제품명B'], df['성분명B']
-        ]).dropna().unique()
-        
-        # 너무 짧은 단어 제외하고 집합 생성
-        all_names = {str(name) for name in combined_names if len(str(name)) > 1}
-        
-        print(f"✅ 데이터 로드 완료! (총 {len(all_names)}개 약물명)")
-        return df, all_names
+# --- 1. 데이터 로드 (엔진은 프로세스당 한 번만 생성되어 모든 세션이 공유) ---
+# [추가] 스냅샷이 있으면 CURRENT 스냅샷으로 서비스하고 포인터를 감시, 없으면 CSV를 직접 읽고 감시
+SNAPSHOT_POINTER = os.path.join(SNAPSHOT_ROOT, CURRENT_FILE)
+WATCH_PATH = SNAPSHOT_POINTER if os.path.exists(SNAPSHOT_POINTER) else DATA_FILE
+RENDER_INTERVAL = 0.1   # N:N 분석 중 메시지를 다시 그리는 최소 간격(초)
+SESSION_SPILL_DIR = 'sessions'   # 메모리에서 내보낸 세션을 보관할 폴더 (None이면 내보낸 세션은 버림)
+
+# 고정 안내 문구 (세션마다 같은 문자열 객체를 참조)
+WELCOME_MESSAGE = "기능을 선택해주세요."
+ING_MODE_MESSAGE = "💊 **성분 검색** 모드입니다. 약물 이름을 입력하세요."
+INT_MODE_MESSAGE = "⚠️ **상호작용 분석** 모드입니다. 약물들을 입력해주세요.\n(예: 네시나, 보노렉스, 이지엔)"
+TOO_FEW_MESSAGE = "❌ 비교할 약물이 부족합니다. (최소 2개 입력)"
+DISCLAIMER = "\n\n---\n\n**🔔 본 정보는 약물 상호작용 데이터베이스를 기반으로 합니다. 최종적인 의학적 판단 및 복약 지도는 반드시 전문가(의사, 약사)와 상의하십시오.**"
 
+def build_engine(watch_path, wait_for_indexes=False):
+    """데이터를 읽어 검색 엔진을 만들고, 백그라운드에서 인덱스 생성과 캐시 워밍을 시작합니다."""
+    if watch_path == SNAPSHOT_POINTER:
+        engine = load_snapshot_engine()
+    else:
+        engine = DrugEngine.from_csv(watch_path, pair_path=PAIR_FILE)
+
+    # [추가] 첫 화면은 기다리지 않음: 인덱스가 준비될 때까지는 기존 검색으로 응답
+    engine.start_index_build()
+    if wait_for_indexes:
+        engine.wait_for_indexes()
+    # [추가] 인기 조회 항목 캐시 워밍 (UI는 기다리지 않음)
+    _, engine.warmup_report = start_warmup(engine)
+    return engine
+
+@st.cache_resource
+def load_engine():
+    """엔진 보관소를 만들고, 데이터(또는 CURRENT)가 바뀌면 자동으로 다시 로드하도록 감시를 시작합니다."""
+    try:
+        holder = EngineHolder(build_engine(WATCH_PATH))
+    except FileNotFoundError:
+        st.error(f"❌ '{WATCH_PATH}' 파일이 없습니다. 같은 폴더에 넣어주세요.")
+        return None
     except Exception as e:
         st.error(f"파일 로드 실패: {e}")
-        return None, None
+        return None
 
-# 데이터 로드 실행
-df, all_drug_names = load_data()
+    # 다시 로드할 때는 이전 엔진이 계속 응답하므로, 인덱스까지 다 만든 뒤 교체
+    PollingReloader(holder, WATCH_PATH, lambda path: build_engine(path, wait_for_indexes=True)).start()
+    return holder
 
-# --- 2. 핵심 기능 함수들 ---
+# 데이터 로드 실행 (이번 실행 동안은 같은 엔진을 사용 → 다시 로드 중에도 결과가 섞이지 않음)
+engine_holder = load_engine()
+engine = engine_holder.current() if engine_holder else None
+warmup_report = getattr(engine, 'warmup_report', None)
 
-def search_products(df, query):
-    """약물 이름으로 '제품명' 리스트를 검색합니다."""
-    clean_rule = r'[\s\(\)\[\]_/\-\.]|주사제|정제|정|약|캡슐|시럽|약물'
-    clean_q = re.sub(clean_rule, '', query).strip().lower()
-    
-    if len(clean_q) < 2: return []
+# [추가] 세션 상태는 프로세스당 하나의 보관소에 (전체 메모리 예산, 오래 쓰지 않은 세션 내보내기, 세션별 크기 측정)
+@st.cache_resource
+def load_session_store():
+    return SessionStore(spill=DiskSpill(SESSION_SPILL_DIR) if SESSION_SPILL_DIR else None)
 
-    try:
-        pattern = re.escape(clean_q)
-        # clean 컬럼에서 검색
-        mask = df['제품명A_clean'].str.contains(pattern) | df['제품명B_clean'].str.contains(pattern)
-        
-        # 검색된 행에서 제품명 추출
-        res_a = df.loc[df['제품명A_clean'].str.contains(pattern), '제품명A']
-        res_b = df.loc[df['제품명B_clean'].str.contains(pattern), '제품명B']
-        
-        # 합치고 정렬
-        candidates = sorted(list(set(res_a).union(set(res_b))))
-        return candidates
-    except:
-        return []
-
-def get_ingredients(df, exact_product_name):
-    """확정된 제품명의 성분을 가져옵니다."""
-    try:
-        mask = (df['제품명A'] == exact_product_name) | (df['제품명B'] == exact_product_name)
-        rows = df[mask]
-        
-        ingredients = set()
-        for _, r in rows.iterrows():
-            if r['제품명A'] == exact_product_name: ingredients.add(r['성분명A'])
-            if r['제품명B'] == exact_product_name: ingredients.add(r['성분명B'])
-            
-        return {x for x in ingredients if pd.notna(x) and x != 'nan'}
-    except:
-        return set()
+session_store = load_session_store()
+session_id = get_script_run_ctx().session_id
+state = session_store.get(session_id)
 
-def check_interaction(df, prod_A, prod_B):
-    """확정된 두 제품 간의 상호작용을 확인합니다."""
-    try:
-        # 정확한 이름으로 매칭
-        mask = ((df['제품명A'] == prod_A) & (df['제품명B'] == prod_B)) | \
-               ((df['제품명A'] == prod_B) & (df['제품명B'] == prod_A))
-        
-        interactions = df[mask]
-        
-        if interactions.empty:
-            return "안전", f"'{prod_A}'와 '{prod_B}' 간의 보고된 상호작용 정보가 없습니다."
-        
-        # 위험도 분석
-        details = interactions['상세정보'].unique()
-        danger = ["금기", "투여 금지", "독성 증가", "치명적인", "심각한", "유산 산성증", 
-        "고칼륨혈증", "심실성 부정맥", "위험성 증가", "위험 증가", "심장 부정맥", 
-        "QT간격 연장 위험 증가", "QT연장", "심부정맥", "중대한", "심장 모니터링", 
-        "병용금기", "Torsade de pointes 위험 증가", "위험이 증가함", 
-        "약물이상반응 발생 위험", "독성", "허혈", "혈관경련",
-        "횡문근융해와 같은 중증의 근육이상 보고"]
-        caution = ["치료 효과가 제한적", "중증의 위장관계 이상반응", "Alfuzosin 혈중농도 증가", 
-        "양쪽 약물 모두 혈장농도 상승 가능", "Amiodarone 혈중농도 증가", 
-        "혈중농도 증가", "혈장 농도 증가", 
-        "Finerenone 혈중농도의 현저한 증가가 예상됨"]
-        
-        risk, msgs = "안전", []
-        for d in details:
-            d_str = str(d)
-            found = False
-            for k in danger:
-                if k in d_str:
-                    risk = "위험"; msgs.append(f"🚨 **위험**: {d_str}"); found=True; break
-            if not found:
-                for k in caution:
-                    if k in d_str:
-                        if risk!="위험": risk="주의"
-                        msgs.append(f"⚠️ **주의**: {d_str}"); break
-        
-        if not msgs:
-            risk = "정보 확인"
-            msgs.append(f"ℹ️ **정보**: {details[0]}")
-            
-        return risk, "\n\n".join(msgs)
-    except:
-        return "오류", "분석 중 오류 발생"
-
-# [추가] 오타 보정 함수 (먼저 보낸 코드에서 가져옴)
-def get_fuzzy_match(query, choices_set, score_cutoff=65):
-    """사용자 입력과 가장 유사한 약물명을 찾습니다."""
-    if not query or not choices_set:
-        return None
-    try:
-        # partial_ratio를 사용하여 부분 일치 유사도 검사
-        best_match = process.extractOne(query, choices_set, scorer=fuzz.partial_ratio)
-        if best_match and best_match[1] >= score_cutoff:
-            return best_match[0]
-    except Exception as e:
-        print(f"DEBUG: Fuzzy matching error - {e}")
-    return None
+# --- 2. UI 및 상태 관리 ---
+# [수정] 세션에는 제품명 대신 이름 ID(drug_session.NAMES)를, 분석 결과 문자열 대신 (역할, 종류, 인자) 참조를 저장하고
+#        화면에 그릴 때만 문자열로 바꿈. 인자에는 분석 당시 엔진 캐시의 결과 tuple을 그대로 담아
+#        세션마다 복사하지 않으면서도, 엔진이 다시 로드되거나 캐시에서 밀려나도 지난 답이 바뀌지 않음
+
+def format_report(drug_count, rows):
+    """iter_interactions / interaction_report의 (a, b, 위험도, 설명) 목록 → 분석 결과 메시지"""
+    if not rows:
+        return f"✅ 선택하신 {drug_count}개 약물 간에 발견된 위험 상호작용이 없습니다." + DISCLAIMER
+    return "### ⚠️ 분석 결과\n\n" + "\n\n---\n\n".join(f"**[{a} ↔ {b}]**\n\n{exp}" for a, b, risk, exp in rows) + DISCLAIMER
+
+def render_report(report):
+    """report: (약물 수, 분석 당시 interaction_report 결과)"""
+    drug_count, rows = report
+    return format_report(drug_count, rows)
+
+def render_ingredients(found):
+    """found: (이름 ID, 분석 당시 get_ingredients 결과)"""
+    drug_id, ings = found
+    drug = NAMES.name(drug_id)
+    return f"✅ **'{drug}'** 성분: {', '.join(ings)}" if ings else f"ℹ️ '{drug}' 성분 정보 없음"
 
+def render_picked(picked):
+    """선택 결과: ((이름 ID 또는 None=제외, 입력 이름), ...)"""
+    return ", ".join(f"✅ {NAMES.name(name_id)} 선택" if name_id is not None else f"❌ '{target}' 제외"
+                     for name_id, target in picked)
 
-# --- 3. UI 및 상태 관리 ---
+MESSAGE_RENDERERS = {'report': render_report, 'ingredients': render_ingredients, 'picked': render_picked}
 
 st.title("💊 약물 상호작용 챗봇")
 
+# [추가] 캐시 워밍 진행 상황 표시
+if warmup_report:
+    st.sidebar.caption(f"⚡ 캐시 워밍 {warmup_report['done']}/{warmup_report['total']} "
+                       f"(커버리지 {warmup_report['coverage']:.0%}, {warmup_report['duration']:.1f}초)")
+if engine is not None:
+    ready = [name for name, status in engine.index_report().items() if status == 'ready']
+    st.sidebar.caption(f"🔎 인덱스 {len(ready)}/{len(engine.index_status)} 준비됨 "
+                       f"(최근 상호작용 처리: {engine.served_by('interaction') or '-'})")
+
+session_stats = session_store.stats()
+st.sidebar.caption(f"🧠 세션 {session_stats['sessions']}개 {session_stats['bytes'] / 1024:,.0f}KB "
+                   f"/ 예산 {session_stats['budget_bytes'] / 1024 ** 2:,.0f}MB "
+                   f"(이 세션 {session_store.session_size(session_id) / 1024:,.1f}KB, 디스크 {session_stats['spilled_sessions']}개)")
+
+# [추가] 최근 N:N 분석의 첫 결과까지 걸린 시간과 전체 시간
+if state.get("analysis_timing"):
+    first_output, total_time, total_pairs = state.analysis_timing
+    st.sidebar.caption(f"⏱️ 최근 분석 {total_pairs}쌍: 첫 결과 {first_output * 1000:.0f}ms / 전체 {total_time * 1000:.0f}ms")
+
 # 세션 상태 초기화
-if "messages" not in st.session_state:
-    st.session_state.messages = [{"role": "assistant", "content": "기능을 선택해주세요."}]
-if "mode" not in st.session_state: st.session_state.mode = None
-if "queue" not in st.session_state: st.session_state.queue = []       
-if "resolved" not in st.session_state: st.session_state.resolved = [] 
-if "selecting" not in st.session_state: st.session_state.selecting = False 
-if "options" not in st.session_state: st.session_state.options = []
+if "messages" not in state:
+    state.messages = [text_message("assistant", WELCOME_MESSAGE)]
+if "mode" not in state: state.mode = None
+if "slots" not in state: state.slots = []         # 입력 순서대로 확정된 이름 ID (미확정/제외는 None)
+if "pending" not in state: state.pending = []     # 선택이 필요한 (슬롯 번호, 입력 이름, 선택지 ID들)
+if "resolved" not in state: state.resolved = []   # 확정된 이름 ID
+if "selecting" not in state: state.selecting = False 
 
 # 상단 버튼
 c1, c2 = st.columns(2)
 if c1.button("💊 성분 검색", use_container_width=True):
-    st.session_state.mode = "ing"
-    st.session_state.messages = [{"role": "assistant", "content": "💊 **성분 검색** 모드입니다. 약물 이름을 입력하세요."}]
-    st.session_state.selecting = False
-    st.session_state.resolved = [] # 초기화
+    state.mode = "ing"
+    state.messages = [text_message("assistant", ING_MODE_MESSAGE)]
+    state.selecting = False
+    state.resolved = [] # 초기화
     st.rerun()
 
 if c2.button("⚠️ 상호작용 분석", use_container_width=True):
-    st.session_state.mode = "int"
-    st.session_state.messages = [{"role": "assistant", "content": "⚠️ **상호작용 분석** 모드입니다. 약물들을 입력해주세요.\n(예: 네시나, 보노렉스, 이지엔)"}]
-    st.session_state.selecting = False
-    st.session_state.resolved = [] # 초기화
+    state.mode = "int"
+    state.messages = [text_message("assistant", INT_MODE_MESSAGE)]
+    state.selecting = False
+    state.resolved = [] # 초기화
     st.rerun()
 
-# 대화 기록 표시
-for msg in st.session_state.messages:
-    with st.chat_message(msg["role"]): st.markdown(msg["content"])
+# 대화 기록 표시 ([수정] 최근 메시지만 그리고 이전 대화는 '더 보기'로 불러옴)
+render_chat_history(state.messages, render=lambda msg: render_message(msg, MESSAGE_RENDERERS))
 
-# --- 4. 선택지 처리 (사용자 입력 대기) ---
-if st.session_state.selecting:
-    # 큐의 첫 번째 아이템이 오타였을 수도 있고, 여러 검색 결과일 수도 있음
-    target = st.session_state.queue[0]
-    
-    # 옵션이 하나뿐인 경우 (오타 보정 제안인 경우)
-    if len(st.session_state.options) == 1:
-        st.info(f"❓ **'{target}'**을(를) 찾을 수 없습니다. 혹시 아래 약물인가요?")
-    else:
-        st.info(f"👇 **'{target}'** 검색 결과가 여러 개입니다. 선택해주세요:")
-    
-    cols = st.columns(min(len(st.session_state.options), 3))
-    for i, opt in enumerate(st.session_state.options):
-        # 버튼을 누르면 해당 옵션으로 확정
-        if st.button(opt, key=f"sel_{i}"):
-            st.session_state.messages.append({"role": "user", "content": f"✅ {opt} 선택"})
-            st.session_state.resolved.append(opt)
-            st.session_state.queue.pop(0) # 대기열에서 제거
-            st.session_state.selecting = False
+# --- 3. 선택지 처리 (사용자 입력 대기) ---
+# [수정] 이름마다 다시 실행하지 않고, 선택이 필요한 이름들을 한 화면에서 함께 고름
+if state.selecting:
+    EXCLUDE = "❌ 해당 없음 (제외)"
+    with st.form("pick_candidates"):
+        choices = []
+        for i, (slot, target, options) in enumerate(state.pending):
+            # 옵션이 하나뿐인 경우 (오타 보정 제안인 경우)
+            if len(options) == 1:
+                label = f"❓ **'{target}'**을(를) 찾을 수 없습니다. 혹시 아래 약물인가요?"
+            else:
+                label = f"👇 **'{target}'** 검색 결과가 여러 개입니다. 선택해주세요:"
+            # 키에 대화 길이를 넣어 이전 선택 화면의 값이 남지 않게 함
+            choices.append(st.radio(label, list(options) + [None], key=f"sel_{len(state.messages)}_{i}",
+                                    format_func=lambda name_id: EXCLUDE if name_id is None else NAMES.name(name_id)))
+
+        if st.form_submit_button("✅ 선택 완료", type="primary"):
+            picked = []
+            for (slot, target, options), choice in zip(state.pending, choices):
+                state.slots[slot] = choice
+                picked.append((choice, target))
+            state.messages.append(("user", "picked", tuple(picked)))
+            state.resolved = [name_id for name_id in state.slots if name_id is not None]
+            state.slots, state.pending = [], []
+            state.selecting = False
             st.rerun()
-            
-    # [추가] 오타 제안이 마음에 안 들 경우 건너뛰기 버튼
-    if st.button("❌ 해당 없음 (제외)", type="secondary"):
-         st.session_state.messages.append({"role": "assistant", "content": f"❌ '{target}' 제외됨."})
-         st.session_state.queue.pop(0)
-         st.session_state.selecting = False
-         st.rerun()
-
-# --- 5. 메인 로직 (자동 처리 Loop) ---
+
+# --- 4. 메인 로직 ---
 # 선택 모드가 아닐 때만 실행
-if not st.session_state.selecting:
+if not state.selecting:
     
-    # (A) 대기열 처리 (검색 -> 1개면 자동확정, 여러개면 선택모드)
-    if st.session_state.queue:
-        curr = st.session_state.queue[0]
-        cands = search_products(df, curr)
+    # (B) 확정된 약물이 있다면 -> 결과 출력
+    if state.resolved:
+        final_ids = tuple(dict.fromkeys(state.resolved))
+        final_drugs = NAMES.names(final_ids)
         
-        if len(cands) > 1:
-            st.session_state.options = cands
-            st.session_state.selecting = True
-            st.rerun()
-        elif len(cands) == 1:
-            # 1개면 사용자에게 묻지 않고 조용히 확정 후 계속 진행
-            st.session_state.resolved.append(cands[0])
-            st.session_state.queue.pop(0)
-            st.rerun()
-        else:
-            # [수정] 검색 결과가 0개일 때 -> 오타 보정 시도
-            suggestion = get_fuzzy_match(curr, all_drug_names)
-            
-            if suggestion:
-                # 오타일 가능성이 높음 -> 선택 모드로 진입시켜 사용자 확인 유도
-                st.session_state.options = [suggestion]
-                st.session_state.selecting = True
-                st.rerun()
-            else:
-                # 오타 보정으로도 못 찾음 -> 제외
-                st.session_state.messages.append({"role": "assistant", "content": f"❌ '{curr}' 정보를 찾을 수 없어 제외합니다."})
-                st.session_state.queue.pop(0)
-                st.rerun()
-
-    # (B) 대기열이 비었고, 확정된 약물이 있다면 -> 결과 출력
-    elif st.session_state.resolved:
-        final_drugs = st.session_state.resolved
-        
-        # 1. 성분 검색 결과
-        if st.session_state.mode == "ing":
-            for drug in final_drugs:
-                ings = get_ingredients(df, drug)
-                msg = f"✅ **'{drug}'** 성분: {', '.join(ings)}" if ings else f"ℹ️ '{drug}' 성분 정보 없음"
-                st.session_state.messages.append({"role": "assistant", "content": msg})
+        # 1. 성분 검색 결과 (성분 목록은 짧으므로 그대로 저장)
+        if state.mode == "ing":
+            for drug_id in final_ids:
+                ings = tuple(sorted(engine.get_ingredients(NAMES.name(drug_id))))
+                state.messages.append(("assistant", "ingredients", (drug_id, ings)))
         
         # 2. 상호작용 분석 결과 (다중 분석 지원)
-        elif st.session_state.mode == "int":
-            # 면책 조항 문구 정의 및 추가
-            disclaimer = "\n\n---\n\n**🔔 본 정보는 약물 상호작용 데이터베이스를 기반으로 합니다. 최종적인 의학적 판단 및 복약 지도는 반드시 전문가(의사, 약사)와 상의하십시오.**"
+        elif state.mode == "int":
             if len(final_drugs) < 2:
-                st.session_state.messages.append({"role": "assistant", "content": "❌ 비교할 약물이 부족합니다. (최소 2개 입력)"})
+                state.messages.append(text_message("assistant", TOO_FEW_MESSAGE))
             else:
                 # [핵심] N:N 분석 로직
+                # [수정] 끝날 때까지 기다리지 않고 위험한 조합부터 찾는 대로 메시지에 바로 표시
                 report = []
-                found_risk = False
-                
-                with st.spinner(f"🔄 {len(final_drugs)}개 약물의 모든 조합을 분석 중..."):
-                    # combinations를 사용해 모든 짝꿍(2개 조합)을 검사
-                    for a, b in combinations(final_drugs, 2):
-                        risk, exp = check_interaction(df, a, b)
-                        
-                        if risk != "안전":
-                            report.append(f"**[{a} ↔ {b}]**\n\n{exp}")
-                            found_risk = True
-                        # 안전한 경우는 리포트에 포함하지 않음 (스크롤 절약)
-
-                if found_risk:
-                    final_msg = "### ⚠️ 분석 결과\n\n" + "\n\n---\n\n".join(report)
-                else:
-                    final_msg = f"✅ 선택하신 {len(final_drugs)}개 약물 간에 발견된 위험 상호작용이 없습니다."
+                started = time.perf_counter()
+                first_output = None
+                total_pairs = len(final_drugs) * (len(final_drugs) - 1) // 2
+
+                with st.chat_message("assistant"):
+                    progress_bar = st.progress(0.0, text=f"🔄 {len(final_drugs)}개 약물의 모든 조합({total_pairs}쌍)을 분석 중...")
+                    live = st.empty()
+                    last_render = 0.0
+
+                    def show_progress(done, total):
+                        progress_bar.progress(done / total if total else 1.0, text=f"🔄 {done}/{total}쌍 분석 중...")
+
+                    # 안전한 경우는 리포트에 포함하지 않음 (스크롤 절약)
+                    for a, b, risk, exp in engine.iter_interactions(final_drugs, progress=show_progress):
+                        report.append(f"**[{a} ↔ {b}]**\n\n{exp}")
+                        now = time.perf_counter()
+                        if first_output is None:
+                            first_output = now - started
+                        if len(report) == 1 or now - last_render >= RENDER_INTERVAL:
+                            live.markdown("### ⚠️ 분석 결과 (분석 중...)\n\n" + "\n\n---\n\n".join(report))
+                            last_render = now
+                    progress_bar.empty()
 
-                # 면책 조항 추가
-                st.session_state.messages.append({"role": "assistant", "content": final_msg + disclaimer})
+                total_time = time.perf_counter() - started
+                if first_output is None:
+                    first_output = total_time   # 표시할 조합이 없으면 완료 메시지가 첫 결과
+                state.analysis_timing = (first_output, total_time, total_pairs)
+                append_query_log([final_drugs])   # 분석 한 번에 한 줄 (쌍마다 기록하지 않음)
+
+                # 끝까지 읽은 결과는 엔진의 보고서 캐시에 있으므로 같은 tuple을 참조로 저장 (면책 조항은 그릴 때 추가)
+                state.messages.append(("assistant", "report", (len(final_drugs), engine.interaction_report(final_drugs))))
         
-        st.session_state.resolved = [] # 결과 출력 후 초기화
+        state.resolved = [] # 결과 출력 후 초기화
         st.rerun()
 
     # (C) 아무 작업 없을 때 입력창 표시
-    elif st.session_state.mode:
-        placeholder = "약물 이름 입력..." if st.session_state.mode == "ing" else "약물들 입력 (예: A, B, C)"
+    elif state.mode:
+        placeholder = "약물 이름 입력..." if state.mode == "ing" else "약물들 입력 (예: A, B, C)"
         if prompt := st.chat_input(placeholder):
-            if df is None: st.error("파일 로드 안됨"); st.stop()
+            if engine is None: st.error("파일 로드 안됨"); st.stop()
             
-            st.session_state.messages.append({"role": "user", "content": prompt})
+            state.messages.append(text_message("user", prompt))
             with st.chat_message("user"): st.markdown(prompt)
             
             # 쉼표, 공백, 조사 등으로 분리
-            parts = re.split(r'[,\s]+|과|와|랑|하고', prompt)
-            parts = [p.strip() for p in parts if p.strip()]
+            parts = split_drug_list(prompt)
             
             if parts:
-                st.session_state.queue = parts
-                st.session_state.resolved = []
+                # [수정] 모든 이름을 한 번에 해석 (검색 결과 1개 → 자동 확정, 여러 개/오타 제안 → 한꺼번에 선택, 없음 → 제외)
+                slots, pending = [], []
+                append_query_log([(part,) for part in parts])
+                for part, (cands, suggestion) in zip(parts, engine.resolve_names(parts)):
+                    if len(cands) == 1:
+                        slots.append(NAMES.id(cands[0]))
+                        continue
+                    slots.append(None)
+                    if len(cands) > 1:
+                        pending.append((len(slots) - 1, part, NAMES.ids(cands)))
+                    elif suggestion:
+                        pending.append((len(slots) - 1, part, NAMES.ids([suggestion])))
+                    else:
+                        state.messages.append(text_message("assistant", f"❌ '{part}' 정보를 찾을 수 없어 제외합니다."))
+
+                if pending:
+                    state.slots, state.pending = slots, pending
+                    state.selecting = True
+                else:
+                    state.resolved = [name_id for name_id in slots if name_id is not None]
                 st.rerun()
             else:
                  st.warning("입력해주세요.")
\ No newline at end of file
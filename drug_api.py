@@ -0,0 +1,463 @@
+# drug_api.py
+# Streamlit 없이 EMR / 약국 POS에서 같은 답을 받을 수 있는 HTTP JSON API입니다. (표준 라이브러리 asyncio만 사용)
+# 프로세스당 엔진 하나를 모든 연결이 공유하고, 캐시에 없는 검색은 스레드 풀에서 실행하여 이벤트 루프를 막지 않습니다.
+#
+#   python drug_api.py serve --port 8080
+#   curl 'http://localhost:8080/search?q=타이레놀'
+#   curl 'http://localhost:8080/ingredients?product=타이레놀정500밀리그램'
+#   curl 'http://localhost:8080/interaction?a=와파린&b=아스피린&mode=text'
+#   curl -X POST localhost:8080/polypharmacy -d '{"drugs": ["네시나정", "보노렉스정", "이지엔6이브정"]}'
+#   curl -X POST localhost:8080/prescriptions -d '{"prescriptions": [["A정", "B정"], ["A정", "C캡슐", "D정"]]}'
+#   curl -N 'http://localhost:8080/polypharmacy/stream?drugs=A정,B정,C캡슐'   # 서버 전송 이벤트(SSE)
+#
+# /polypharmacy/stream은 상호작용이 있는 쌍을 위험한 것부터 찾는 대로 'interaction' 이벤트로 보내고,
+# 마지막에 'summary' 이벤트(쌍 수, 위험도별 개수, 첫 이벤트까지 걸린 시간)를 보낸 뒤 연결을 닫습니다.
+#
+# /interaction, /polypharmacy, /prescriptions의 mode
+#   product    : 확정된 제품명끼리 비교 (app.py 상호작용 분석과 같은 답, 기본값)
+#   text       : 자유 입력 이름 (drug_checker 계열의 check_drug_interaction_flexible)
+#   ingredient : 확정된 성분명끼리 비교 (키-값 파일 조회)
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote, urlsplit
+
+from drug_engine import DATA_FILE, PRESCRIPTION_MODES, DrugEngine
+from drug_kvstore import PAIR_FILE
+from drug_reload import EngineHolder, PollingReloader
+from drug_snapshot import CURRENT_FILE, SNAPSHOT_ROOT, load_snapshot_engine
+
+API_HOST = '127.0.0.1'
+API_PORT = 8080
+API_WORKERS = min(8, os.cpu_count() or 4)   # 캐시에 없는 검색을 실행할 스레드 수
+MAX_BODY_BYTES = 1 << 20
+MAX_POLYPHARMACY_DRUGS = 50                 # 50개 → 1,225쌍
+MAX_BATCH_PRESCRIPTIONS = 1000              # /prescriptions 한 번에 받는 처방 수
+INTERACTION_MODES = PRESCRIPTION_MODES
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def build_service_engine(wait_for_indexes=False):
+    """CURRENT 스냅샷이 있으면 스냅샷으로, 없으면 CSV로 엔진을 만들고 인덱스 생성을 시작합니다. (app.py와 같은 기준)"""
+    pointer = os.path.join(SNAPSHOT_ROOT, CURRENT_FILE)
+    if os.path.exists(pointer):
+        engine, watch_path = load_snapshot_engine(), pointer
+    else:
+        engine, watch_path = DrugEngine.from_csv(DATA_FILE, pair_path=PAIR_FILE), DATA_FILE
+    engine.start_index_build()
+    if wait_for_indexes:
+        engine.wait_for_indexes()
+    return engine, watch_path
+
+
+# --------------------------------------------------------------------------------------------------
+# 1. 요청 처리 (소켓과 무관 - InProcessClient도 같은 dispatch를 사용)
+# --------------------------------------------------------------------------------------------------
+class DrugApi:
+    """경로별 처리 함수와 공유 엔진/스레드 풀을 들고 있습니다."""
+
+    def __init__(self, holder, workers=API_WORKERS):
+        self.holder = holder if isinstance(holder, EngineHolder) else EngineHolder(holder)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='drug-api')
+        # 모든 경로는 GET(쿼리 문자열)과 POST(JSON 본문)를 모두 받음
+        self.routes = {
+            '/search': self.search,
+            '/ingredients': self.ingredients,
+            '/interaction': self.interaction,
+            '/polypharmacy': self.polypharmacy,
+            '/polypharmacy/stream': self.polypharmacy_stream,
+            '/prescriptions': self.prescriptions,
+            '/health': self.health,
+        }
+        self.request_counts = {}
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    async def _run(self, func, *args):
+        """엔진 호출을 스레드 풀에서 실행합니다. (pandas 검색 중에도 이벤트 루프는 다른 요청을 처리)"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(func, *args))
+
+    async def dispatch(self, method, target, body=b''):
+        """(상태 코드, JSON으로 보낼 dict)를 반환합니다. 스트리밍 경로는 dict 대신 (이벤트, dict) 비동기 반복자입니다."""
+        url = urlsplit(target)
+        handler = self.routes.get(url.path.rstrip('/') or '/')
+        if handler is None:
+            return 404, {'error': f"알 수 없는 경로입니다: {url.path}"}
+        if method not in ('GET', 'POST'):
+            return 405, {'error': "GET 또는 POST로 요청해야 합니다."}
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if body:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise ApiError(400, "요청 본문이 올바른 JSON이 아닙니다.")
+                if not isinstance(data, dict):
+                    raise ApiError(400, "요청 본문은 JSON 객체여야 합니다.")
+                params.update(data)
+            self.request_counts[url.path] = self.request_counts.get(url.path, 0) + 1
+            return 200, await handler(self.holder.current(), params)
+        except ApiError as e:
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            print(f"DEBUG: API 처리 중 오류 ({url.path}) - {e}")
+            return 500, {'error': "처리 중 오류가 발생했습니다."}
+
+    # ---- 경로별 처리 ----
+    async def search(self, engine, params):
+        query = _required(params, 'q')
+        if engine.is_cached('search', query):
+            products = engine.search_products(query)   # 캐시 적중은 루프에서 바로 응답
+        else:
+            products = await self._run(engine.search_products, query)
+        suggestion = None
+        if not products:
+            suggestion = await self._run(engine.get_fuzzy_match, query)
+        return {'query': query, 'products': list(products), 'suggestion': suggestion}
+
+    async def ingredients(self, engine, params):
+        product = _required(params, 'product')
+        if engine.is_cached('ingredients', product):
+            found = engine.get_ingredients(product)
+        else:
+            found = await self._run(engine.get_ingredients, product)
+        return {'product': product, 'ingredients': sorted(found)}
+
+    async def interaction(self, engine, params):
+        a, b = _required(params, 'a'), _required(params, 'b')
+        mode = _mode(params)
+        check = _interaction_check(engine, mode)
+        cache_name, key = {'product': ('interaction', (a, b)), 'text': ('flexible', (a, b))}.get(mode, (None, None))
+        if cache_name and engine.is_cached(cache_name, key):
+            risk, explanation = check(a, b)
+        else:
+            risk, explanation = await self._run(check, a, b)
+        return {'a': a, 'b': b, 'mode': mode, 'risk': risk, 'explanation': explanation}
+
+    async def polypharmacy(self, engine, params):
+        drugs, mode = _polypharmacy_params(params)
+        # 모든 조합을 스레드 풀 작업 하나로 처리 (쌍마다 루프를 오가지 않음)
+        results = await self._run(engine.check_prescriptions, [drugs], mode)
+        return dict(_prescription_result(drugs, results[0]), mode=mode)
+
+    async def polypharmacy_stream(self, engine, params):
+        """요청 확인은 여기서 끝내고(오류는 일반 JSON 응답), 이벤트는 반환한 반복자가 만들어 냅니다."""
+        drugs, mode = _polypharmacy_params(params)
+        return self._interaction_events(engine, drugs, mode)
+
+    async def _interaction_events(self, engine, drugs, mode):
+        """iter_interactions를 스레드 풀에서 돌리며 나오는 쌍마다 바로 이벤트로 넘깁니다."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancelled = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                for row in engine.iter_interactions(drugs, mode):
+                    if cancelled.is_set():   # 클라이언트가 연결을 끊음
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, row)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        started = time.perf_counter()
+        first_event = None
+        counts = Counter()
+        future = loop.run_in_executor(self.executor, produce)
+        try:
+            while (row := await queue.get()) is not done:
+                if isinstance(row, Exception):
+                    print(f"DEBUG: 스트리밍 처리 중 오류 - {row}")
+                    yield 'error', {'error': "처리 중 오류가 발생했습니다."}
+                    continue
+                a, b, risk, explanation = row
+                counts[risk] += 1
+                if first_event is None:
+                    first_event = time.perf_counter() - started
+                yield 'interaction', {'a': a, 'b': b, 'risk': risk, 'explanation': explanation}
+            n = len(drugs)
+            yield 'summary', {'drugs': drugs, 'mode': mode, 'pairs_checked': n * (n - 1) // 2,
+                              'found_risk': bool(counts), 'counts': dict(counts),
+                              'first_event_ms': None if first_event is None else round(first_event * 1000, 2),
+                              'seconds': round(time.perf_counter() - started, 4)}
+        finally:
+            cancelled.set()
+            await future
+
+    async def prescriptions(self, engine, params):
+        """여러 처방을 한 번에 확인: 같은 쌍은 배치 전체에서 한 번만 계산합니다."""
+        batch = params.get('prescriptions')
+        if not isinstance(batch, list) or not batch:
+            raise ApiError(400, "'prescriptions'는 처방(약물 이름 목록)의 목록이어야 합니다.")
+        if len(batch) > MAX_BATCH_PRESCRIPTIONS:
+            raise ApiError(400, f"한 번에 최대 {MAX_BATCH_PRESCRIPTIONS}개 처방까지 확인할 수 있습니다.")
+        batch = [_drug_list(drugs, f'prescriptions[{i}]') for i, drugs in enumerate(batch)]
+        mode = _mode(params)
+        started = time.perf_counter()
+        results = await self._run(engine.check_prescriptions, batch, mode)
+        return {'mode': mode, 'results': [_prescription_result(d, r) for d, r in zip(batch, results)],
+                'pairs_checked': sum(len(r) for r in results),
+                'distinct_pairs': len({frozenset(r[:2]) for rows in results for r in rows}),
+                'seconds': round(time.perf_counter() - started, 4)}
+
+    async def health(self, engine, params):
+        return {'version': engine.version, 'engine_generation': self.holder.version,
+                'indexes': engine.index_report(), 'caches': engine.cache_stats(), 'requests': self.request_counts}
+
+
+def _required(params, name):
+    value = params.get(name)
+    if not isinstance(value, str) or not value.strip():
+        raise ApiError(400, f"'{name}' 값이 필요합니다.")
+    return value.strip()
+
+
+def _mode(params):
+    mode = params.get('mode') or 'product'
+    if mode not in INTERACTION_MODES:
+        raise ApiError(400, f"mode는 {', '.join(INTERACTION_MODES)} 중 하나여야 합니다.")
+    return mode
+
+
+def _polypharmacy_params(params):
+    """'drugs'(목록 또는 쉼표로 구분한 문자열)와 mode"""
+    drugs = params.get('drugs')
+    if isinstance(drugs, str):
+        drugs = [d.strip() for d in drugs.split(',')]
+    return _drug_list(drugs, 'drugs'), _mode(params)
+
+
+def _drug_list(drugs, name):
+    """약물 이름 목록을 확인하고 순서를 유지한 채 중복을 제거합니다."""
+    if not isinstance(drugs, list) or not all(isinstance(d, str) for d in drugs):
+        raise ApiError(400, f"'{name}'는 약물 이름 목록이어야 합니다.")
+    drugs = list(dict.fromkeys(d.strip() for d in drugs if d.strip()))
+    if len(drugs) < 2:
+        raise ApiError(400, f"'{name}': 비교할 약물이 부족합니다. (최소 2개)")
+    if len(drugs) > MAX_POLYPHARMACY_DRUGS:
+        raise ApiError(400, f"'{name}': 한 번에 최대 {MAX_POLYPHARMACY_DRUGS}개까지 비교할 수 있습니다.")
+    return drugs
+
+
+def _prescription_result(drugs, rows):
+    interactions = [{'a': a, 'b': b, 'risk': risk, 'explanation': exp} for a, b, risk, exp in rows if risk != "안전"]
+    return {'drugs': drugs, 'pairs_checked': len(rows), 'found_risk': bool(interactions),
+            'interactions': interactions}
+
+
+def _interaction_check(engine, mode):
+    return {'product': engine.check_interaction,
+            'text': engine.check_drug_interaction_flexible,
+            'ingredient': engine.check_ingredient_pair}[mode]
+
+
+# --------------------------------------------------------------------------------------------------
+# 2. HTTP 서버 (HTTP/1.1 keep-alive, Content-Length 본문만 지원)
+# --------------------------------------------------------------------------------------------------
+def is_event_stream(payload):
+    return hasattr(payload, '__aiter__')
+
+
+def encode_event(event, payload):
+    data = json.dumps(payload, ensure_ascii=False)
+    return f"event: {event}\ndata: {data}\n\n".encode('utf-8')
+
+
+SSE_HEAD = (b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n")   # 본문 끝은 연결 종료로 알림
+
+
+def encode_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def read_request(reader):
+    """(메서드, 대상, 헤더 dict, 본문)을 읽습니다. 연결이 닫혔으면 None."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise ApiError(400, "잘못된 요청 줄입니다.")
+    headers = {'': version}
+    while True:
+        header = await reader.readline()
+        if header in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = header.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    length = headers.get('content-length') or '0'
+    if not length.isdigit():   # 숫자가 아니거나 음수
+        raise ApiError(400, "Content-Length가 올바르지 않습니다.")
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        raise ApiError(413, "요청 본문이 너무 큽니다.")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, headers, body
+
+
+def _keep_alive(headers):
+    connection = headers.get('connection', '').lower()
+    if headers[''] == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+class DrugApiServer:
+    def __init__(self, api, host=API_HOST, port=API_PORT):
+        self.api = api
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]   # port=0이면 실제로 열린 포트
+        return self
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ApiError as e:
+                    writer.write(encode_response(e.status, {'error': str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self.api.dispatch(method, target, body)
+                if is_event_stream(payload):
+                    await self.write_events(writer, payload)
+                    break
+                keep_alive = _keep_alive(headers)
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def write_events(self, writer, events):
+        """이벤트를 하나씩 바로 보냅니다. (클라이언트가 끊으면 반복자를 닫아 계산도 멈춤)"""
+        writer.write(SSE_HEAD)
+        try:
+            async for event, payload in events:
+                writer.write(encode_event(event, payload))
+                await writer.drain()
+        finally:
+            await events.aclose()
+
+
+# --------------------------------------------------------------------------------------------------
+# 3. 소켓 없이 쓰는 클라이언트 (로컬 확인/테스트용)
+# --------------------------------------------------------------------------------------------------
+class InProcessClient:
+    """서버를 띄우지 않고 같은 dispatch를 호출합니다. 응답은 (상태 코드, dict)입니다.
+
+        client = InProcessClient(engine)
+        status, data = client.get('/search', q='타이레놀')
+        status, data = client.post('/polypharmacy', {'drugs': ['A', 'B', 'C']})
+        status, events = client.post('/polypharmacy/stream', {'drugs': ['A', 'B', 'C']})   # [(이벤트, dict), ...]
+    """
+
+    def __init__(self, engine_or_api):
+        self.api = engine_or_api if isinstance(engine_or_api, DrugApi) else DrugApi(engine_or_api)
+        self.loop = asyncio.new_event_loop()
+
+    def get(self, path, **params):
+        query = '&'.join(f"{k}={quote(str(v), safe='')}" for k, v in params.items())
+        return self._call('GET', f"{path}?{query}" if query else path)
+
+    def post(self, path, data):
+        return self._call('POST', path, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    def _call(self, method, target, body=b''):
+        status, payload = self.loop.run_until_complete(self.api.dispatch(method, target, body))
+        if is_event_stream(payload):
+            payload = self.loop.run_until_complete(_collect(payload))
+        return status, payload
+
+    def close(self):
+        self.loop.close()
+        self.api.close()
+
+
+async def _collect(events):
+    return [item async for item in events]
+
+
+# --------------------------------------------------------------------------------------------------
+# 4. 실행
+# --------------------------------------------------------------------------------------------------
+async def run_server(host=API_HOST, port=API_PORT, workers=API_WORKERS, watch=True):
+    engine, watch_path = build_service_engine()
+    holder = EngineHolder(engine)
+    if watch:
+        # 데이터(또는 CURRENT)가 바뀌면 인덱스까지 다 만든 새 엔진으로 교체 (app.py와 동일)
+        PollingReloader(holder, watch_path, lambda path: build_service_engine(wait_for_indexes=True)[0]).start()
+    server = await DrugApiServer(DrugApi(holder, workers), host, port).start()
+    print(f"✅ (api) http://{host}:{server.port} 에서 대기 중 (작업 스레드 {workers}개)")
+    await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="약물 상호작용 HTTP JSON API")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help="API 서버 실행")
+    serve.add_argument('--host', default=API_HOST)
+    serve.add_argument('--port', type=int, default=API_PORT)
+    serve.add_argument('--workers', type=int, default=API_WORKERS)
+    serve.add_argument('--no-watch', action='store_true', help="데이터 변경 감시(자동 다시 로드) 안 함")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        asyncio.run(run_server(args.host, args.port, args.workers, watch=not args.no_watch))
+    except KeyboardInterrupt:
+        print(f"✅ (api) 종료 ({time.perf_counter() - started:.0f}초 동안 실행)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+# drug_batch.py
+# 과거 처방 전체를 야간 감사용으로 한꺼번에 확인하는 명령줄 도구입니다. (UI 없음)
+# 입력을 스트리밍으로 읽어 묶음 단위로 프로세스 풀에 나눠 주고, 결과는 입력 순서대로 바로 파일에 씁니다.
+#
+#   python drug_batch.py prescriptions.jsonl results.jsonl
+#   python drug_batch.py prescriptions.csv results.csv --mode text --workers 8
+#
+# 입력 형식
+#   JSONL : 한 줄에 {"id": "RX001", "drugs": ["A정", "B캡슐"]} (또는 이름 목록만)
+#   CSV   : id(처방번호) + drugs(약물) 컬럼에 이름을 , ; | 로 구분   → 한 행 = 한 처방
+#           id(처방번호) + drug(약물명) 컬럼                        → 같은 id가 이어진 행들 = 한 처방
+# 출력 형식
+#   JSONL : 처방마다 {"id", "drugs", "pairs_checked", "found_risk", "interactions": [...]}
+#   CSV   : '안전'이 아닌 쌍마다 한 행 (id, a, b, risk, explanation)
+#
+# 엔진은 부모 프로세스에서 한 번만 (스냅샷이 있으면 스냅샷으로) 만들고, 작업 프로세스는 fork로 그 메모리와
+# pairs.kv mmap을 읽기 전용으로 공유합니다. fork를 쓸 수 없는 플랫폼에서는 각 작업 프로세스가 스냅샷을 엽니다.
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from drug_engine import DATA_FILE, PRESCRIPTION_MODES, DrugEngine
+from drug_snapshot import CURRENT_FILE, SNAPSHOT_ROOT, load_snapshot_engine
+
+BATCH_CHUNK = 200                 # 작업 하나에 담는 처방 수
+BATCH_INFLIGHT_PER_WORKER = 4     # 작업 프로세스당 동시에 맡겨 두는 묶음 수 (메모리 상한)
+PROGRESS_INTERVAL = 0.5           # 진행 상황 표시 주기 (초)
+DRUG_SEPARATOR_RE = re.compile(r'\s*[,;|]\s*')
+ID_COLUMNS = ('id', '처방번호', '처방ID')
+DRUGS_COLUMNS = ('drugs', '약물')
+DRUG_COLUMNS = ('drug', '약물명', '제품명')
+
+_engine = None   # 작업 프로세스의 엔진
+
+
+# --------------------------------------------------------------------------------------------------
+# 1. 입력 읽기 (스트리밍)
+# --------------------------------------------------------------------------------------------------
+class PrescriptionReader:
+    """(처방 id, 약물 이름 목록)을 하나씩 읽습니다. 파일 전체를 메모리에 올리지 않습니다.
+
+    position은 지금까지 읽은 바이트 위치(진행률 표시용, 읽기 버퍼만큼 앞설 수 있음)입니다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._file = None
+
+    @property
+    def position(self):
+        return self._file.buffer.tell() if self._file is not None and not self._file.closed else self.size
+
+    def __iter__(self):
+        jsonl = self.path.lower().endswith('.jsonl')
+        with open(self.path, encoding='utf-8' if jsonl else 'utf-8-sig', newline=None if jsonl else '') as f:
+            self._file = f
+            yield from (self._iter_jsonl(f) if jsonl else self._iter_csv(f))
+
+    @staticmethod
+    def _iter_jsonl(f):
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, list):
+                yield str(line_no), [str(d) for d in record]
+            else:
+                yield str(record.get('id', line_no)), [str(d) for d in record.get('drugs') or []]
+
+    @staticmethod
+    def _iter_csv(f):
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        id_col, drugs_col, drug_col = _pick(fields, ID_COLUMNS), _pick(fields, DRUGS_COLUMNS), _pick(fields, DRUG_COLUMNS)
+        if drugs_col:
+            for row_no, row in enumerate(reader, 1):
+                drugs = [d for d in DRUG_SEPARATOR_RE.split(row[drugs_col] or '') if d]
+                yield (row[id_col] if id_col else str(row_no)), drugs
+        elif id_col and drug_col:
+            # 한 행에 약물 하나: 같은 id가 이어지는 동안 한 처방으로 묶음
+            current, drugs = None, []
+            for row in reader:
+                if row[id_col] != current and drugs:
+                    yield current, drugs
+                    drugs = []
+                current = row[id_col]
+                if (row[drug_col] or '').strip():
+                    drugs.append(row[drug_col].strip())
+            if drugs:
+                yield current, drugs
+        else:
+            raise ValueError(f"CSV에 '{DRUGS_COLUMNS[0]}' 컬럼 또는 '{ID_COLUMNS[0]}'+'{DRUG_COLUMNS[0]}' 컬럼이 필요합니다.")
+
+
+def _pick(fieldnames, candidates):
+    return next((name for name in candidates if name in fieldnames), None)
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --------------------------------------------------------------------------------------------------
+# 2. 작업 프로세스
+# --------------------------------------------------------------------------------------------------
+def load_batch_engine(snapshot_root=SNAPSHOT_ROOT, csv_path=None):
+    """CURRENT 스냅샷(없거나 csv_path를 주면 CSV)으로 인덱스까지 준비된 엔진을 만듭니다."""
+    if csv_path is None and os.path.exists(os.path.join(snapshot_root, CURRENT_FILE)):
+        engine = load_snapshot_engine(root=snapshot_root)
+    else:
+        engine = DrugEngine.from_csv(csv_path or DATA_FILE)
+    engine.start_index_build()
+    engine.wait_for_indexes()
+    return engine
+
+
+def _init_worker(engine, snapshot_root, csv_path):
+    global _engine
+    # fork: 부모가 만든 엔진을 그대로 사용 / spawn: 엔진을 넘기지 않으므로 여기서 스냅샷을 엶
+    _engine = engine if engine is not None else load_batch_engine(snapshot_root, csv_path)
+
+
+def _check_chunk(chunk, mode):
+    ids = [rx_id for rx_id, _ in chunk]
+    drug_lists = [drugs for _, drugs in chunk]
+    results = _engine.check_prescriptions(drug_lists, mode)
+    return [(rx_id, list(dict.fromkeys(d for d in drugs if d)), rows)
+            for rx_id, drugs, rows in zip(ids, drug_lists, results)]
+
+
+# --------------------------------------------------------------------------------------------------
+# 3. 결과 쓰기 / 진행 표시
+# --------------------------------------------------------------------------------------------------
+class ResultWriter:
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.lower().endswith('.jsonl')
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        if not self.jsonl:
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(['id', 'a', 'b', 'risk', 'explanation'])
+
+    def write(self, rx_id, drugs, rows):
+        flagged = [(a, b, risk, exp) for a, b, risk, exp in rows if risk != "안전"]
+        if self.jsonl:
+            record = {'id': rx_id, 'drugs': drugs, 'pairs_checked': len(rows), 'found_risk': bool(flagged),
+                      'interactions': [{'a': a, 'b': b, 'risk': r, 'explanation': e} for a, b, r, e in flagged]}
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            for a, b, risk, exp in flagged:
+                self.csv.writerow([rx_id, a, b, risk, exp])
+        return len(flagged)
+
+    def close(self):
+        self.file.close()
+
+
+class Progress:
+    """표준 오류에 (입력 위치 기준) 진행률, 처리 건수, 속도를 한 줄로 갱신합니다."""
+
+    def __init__(self, reader, stream=sys.stderr, enabled=True):
+        self.reader = reader
+        self.stream = stream
+        self.enabled = enabled and stream is not None
+        self.started = time.perf_counter()
+        self.last = 0.0
+
+    def update(self, stats, final=False):
+        now = time.perf_counter()
+        if not self.enabled or (not final and now - self.last < PROGRESS_INTERVAL):
+            return
+        self.last = now
+        elapsed = now - self.started
+        done = stats['prescriptions']
+        percent = min(self.reader.position / self.reader.size, 1.0) if self.reader.size else 1.0
+        self.stream.write(f"\r{percent:>6.1%}  처방 {done:,}건, 쌍 {stats['pairs']:,}개, "
+                          f"표시 대상 {stats['flagged_pairs']:,}쌍, 초당 {done / elapsed if elapsed else 0:,.0f}처방, "
+                          f"{elapsed:.1f}초")
+        if final:
+            self.stream.write('\n')
+        self.stream.flush()
+
+
+def run_batch(input_path, output_path, mode='product', workers=None, chunk_size=BATCH_CHUNK,
+              snapshot_root=SNAPSHOT_ROOT, csv_path=None, progress=True):
+    """입력 처방 전체를 확인하여 output_path에 쓰고 통계 dict를 반환합니다."""
+    if mode not in PRESCRIPTION_MODES:
+        raise ValueError(f"mode는 {', '.join(PRESCRIPTION_MODES)} 중 하나여야 합니다.")
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    # fork면 부모가 만든 엔진(인덱스 생성 완료 후)을 자식이 그대로 공유, 아니면 자식마다 스냅샷을 엶
+    use_fork = 'fork' in multiprocessing.get_all_start_methods()
+    engine = load_batch_engine(snapshot_root, csv_path) if use_fork else None
+    context = multiprocessing.get_context('fork' if use_fork else 'spawn')
+
+    reader = PrescriptionReader(input_path)
+    writer = ResultWriter(output_path)
+    meter = Progress(reader, enabled=progress)
+    stats = {'prescriptions': 0, 'pairs': 0, 'flagged_pairs': 0, 'flagged_prescriptions': 0}
+
+    def consume(future):
+        for rx_id, drugs, rows in future.result():
+            flagged = writer.write(rx_id, drugs, rows)
+            stats['prescriptions'] += 1
+            stats['pairs'] += len(rows)
+            stats['flagged_pairs'] += flagged
+            stats['flagged_prescriptions'] += bool(flagged)
+        meter.update(stats)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(engine, snapshot_root, csv_path)) as pool:
+            pending = deque()
+            for chunk in _chunks(reader, chunk_size):
+                pending.append(pool.submit(_check_chunk, chunk, mode))
+                # 입력 순서대로 쓰고, 맡겨 둔 묶음 수를 제한하여 메모리 사용량을 일정하게 유지
+                while len(pending) >= workers * BATCH_INFLIGHT_PER_WORKER:
+                    consume(pending.popleft())
+            while pending:
+                consume(pending.popleft())
+    finally:
+        writer.close()
+
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    stats['rx_per_sec'] = round(stats['prescriptions'] / stats['seconds'], 1) if stats['seconds'] else None
+    stats['workers'] = workers
+    meter.update(stats, final=True)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="과거 처방 일괄 상호작용 확인 (프로세스 병렬)")
+    parser.add_argument('input', help="처방 파일 (.jsonl 또는 .csv)")
+    parser.add_argument('output', help="결과 파일 (.jsonl 또는 .csv)")
+    parser.add_argument('--mode', choices=PRESCRIPTION_MODES, default='product')
+    parser.add_argument('--workers', type=int, default=None, help="작업 프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument('--chunk', type=int, default=BATCH_CHUNK, help="작업 하나에 담는 처방 수")
+    parser.add_argument('--root', default=SNAPSHOT_ROOT, help="스냅샷 디렉터리 (CURRENT 사용)")
+    parser.add_argument('--csv', default=None, help="스냅샷 대신 이 데이터 CSV로 엔진 생성")
+    parser.add_argument('--quiet', action='store_true', help="진행 상황 표시 안 함")
+    args = parser.parse_args(argv)
+
+    s = run_batch(args.input, args.output, args.mode, args.workers, args.chunk, args.root, args.csv,
+                  progress=not args.quiet)
+    print(f"✅ 처방 {s['prescriptions']:,}건 ({s['pairs']:,}쌍) 확인, 표시 대상 처방 {s['flagged_prescriptions']:,}건 / "
+          f"{s['flagged_pairs']:,}쌍, 작업 프로세스 {s['workers']}개, {s['seconds']:.2f}초 (초당 {s['rx_per_sec']:,}처방)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
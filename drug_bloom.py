@@ -0,0 +1,189 @@
+# drug_bloom.py
+# 상호작용이 등록된 (이름 ID, 이름 ID) 쌍에 대한 블룸 필터입니다.
+# 필터에 없는 쌍은 "확실히 상호작용 없음"이므로 테이블을 검색하지 않고 바로 '안전'을 반환할 수 있습니다.
+#
+#   python drug_bloom.py measure druglist.csv query_log.txt
+
+import argparse
+import itertools
+import math
+import sys
+import time
+
+import numpy as np
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+_GOLDEN = 0x9E3779B97F4A7C15
+_C1 = 0xBF58476D1CE4E5B9
+_C2 = 0x94D049BB133111EB
+_SEED2 = 0x5851F42D4C957F2D
+
+
+def pair_id(id_a, id_b):
+    """순서와 무관한 64비트 쌍 키를 만듭니다."""
+    if id_a > id_b:
+        id_a, id_b = id_b, id_a
+    return (id_a << 32) | id_b
+
+
+def _mix(x):
+    """splitmix64 (파이썬 정수용)"""
+    x = (x + _GOLDEN) & MASK64
+    x = ((x ^ (x >> 30)) * _C1) & MASK64
+    x = ((x ^ (x >> 27)) * _C2) & MASK64
+    return x ^ (x >> 31)
+
+
+def _mix_array(x):
+    """splitmix64 (numpy uint64 배열용, 오버플로는 2^64로 감김)"""
+    with np.errstate(over='ignore'):
+        x = x + np.uint64(_GOLDEN)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(_C1)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(_C2)
+        return x ^ (x >> np.uint64(31))
+
+
+class BloomFilter:
+    """64비트 정수 키용 블룸 필터 (numpy로 일괄 생성, 조회는 파이썬 정수 연산)"""
+
+    def __init__(self, num_bits, num_hashes, bits=None, count=0):
+        self.num_bits = max(int(num_bits), 8)
+        self.num_hashes = max(int(num_hashes), 1)
+        self.bits = bits if bits is not None else bytes((self.num_bits + 7) // 8)
+        self.count = count
+
+    @classmethod
+    def from_keys(cls, keys, fp_rate=0.01):
+        """uint64 키 배열로 필터를 만듭니다. (목표 오탐률 fp_rate)"""
+        keys = np.unique(np.asarray(keys, dtype=np.uint64))
+        n = max(len(keys), 1)
+        num_bits = math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2))
+        num_hashes = round(num_bits / n * math.log(2))
+        bloom = cls(num_bits, num_hashes)
+
+        bit_array = np.zeros(bloom.num_bits, dtype=bool)
+        h1 = _mix_array(keys)
+        h2 = _mix_array(keys ^ np.uint64(_SEED2)) | np.uint64(1)
+        m = np.uint64(bloom.num_bits)
+        with np.errstate(over='ignore'):
+            for i in range(bloom.num_hashes):
+                bit_array[(h1 + np.uint64(i) * h2) % m] = True
+        bloom.bits = np.packbits(bit_array, bitorder='little').tobytes()
+        bloom.count = len(keys)
+        return bloom
+
+    def __contains__(self, key):
+        h1 = _mix(key)
+        h2 = _mix(key ^ _SEED2) | 1
+        bits, m = self.bits, self.num_bits
+        for i in range(self.num_hashes):
+            idx = ((h1 + i * h2) & MASK64) % m
+            if not (bits[idx >> 3] >> (idx & 7)) & 1:
+                return False
+        return True
+
+    def contains_pair(self, id_a, id_b):
+        return pair_id(id_a, id_b) in self
+
+    def expected_fp_rate(self, count=None):
+        count = self.count if count is None else count
+        return (1 - math.exp(-self.num_hashes * count / self.num_bits)) ** self.num_hashes
+
+    def nbytes(self):
+        return len(self.bits)
+
+
+# --------------------------------------------------------------------------------------------------
+# 조회 기록 기반 측정
+# --------------------------------------------------------------------------------------------------
+def measure(engine, pairs, fp_probes=100000):
+    """조회 기록의 조합들로 필터 사용 전/후 지연 시간과 오탐률을 측정합니다."""
+    results = {}
+    original = engine.use_pair_filter
+    try:
+        for use_filter in (False, True):
+            engine.use_pair_filter = use_filter
+            engine.clear_caches()
+            start = time.perf_counter()
+            answers = [engine.check_drug_interaction_flexible(a, b) for a, b in pairs]
+            results[use_filter] = (time.perf_counter() - start, answers)
+    finally:
+        engine.use_pair_filter = original   # 서비스 중인 엔진에서 측정해도 원래 설정으로 돌려놓음
+
+    # 조회 기록 기준: 필터를 통과했지만(테이블 검색) 결과가 '안전'이었던 조회 수
+    passed = wasted = 0
+    for (a, b), (risk, _) in zip(pairs, results[True][1]):
+        set_A, set_B = engine.find_drug_info(a), engine.find_drug_info(b)
+        if set_A is None or set_B is None:
+            continue
+        if not engine._definitely_no_interaction(set_A, set_B):
+            passed += 1
+            if risk == "안전":
+                wasted += 1
+
+    # 이름 ID 쌍 수준 실측 오탐률: 실제로 없는 임의의 쌍 중 필터를 통과한 비율
+    true_keys = set(engine.pair_keys.tolist())
+    rng = np.random.default_rng(0)
+    vocab_size = len(engine.name_vocab)
+    probes = false_positives = 0
+    for a, b in rng.integers(0, max(vocab_size, 1), size=(fp_probes, 2)).tolist():
+        key = pair_id(a, b)
+        if key in true_keys:
+            continue
+        probes += 1
+        false_positives += key in engine.pair_filter
+
+    base_time, base_answers = results[False]
+    fast_time, fast_answers = results[True]
+    mismatches = sum(1 for x, y in zip(base_answers, fast_answers) if x != y)
+    negatives = sum(1 for risk, _ in fast_answers if risk == "안전")
+    return {
+        'queries': len(pairs),
+        'safe_answers': negatives,
+        'base_ms': base_time * 1000,
+        'filter_ms': fast_time * 1000,
+        'speedup': base_time / fast_time if fast_time else float('inf'),
+        'filter_passed': passed,
+        'filter_passed_safe': wasted,
+        'fp_probes': probes,
+        'false_positives': false_positives,
+        'expected_fp_rate': engine.pair_filter.expected_fp_rate(),
+        'filter_bytes': engine.pair_filter.nbytes(),
+        'mismatches': mismatches,
+    }
+
+
+def main(argv=None):
+    from drug_engine import DATA_FILE, DrugEngine
+    from drug_warmup import QUERY_LOG_PATH, read_query_log
+
+    parser = argparse.ArgumentParser(description="블룸 필터 빠른 부정 경로 측정")
+    sub = parser.add_subparsers(dest='command', required=True)
+    m = sub.add_parser('measure', help="조회 기록의 조합으로 지연 시간/오탐률 측정")
+    m.add_argument('csv', nargs='?', default=DATA_FILE)
+    m.add_argument('log', nargs='?', default=QUERY_LOG_PATH)
+    args = parser.parse_args(argv)
+
+    engine = DrugEngine.from_csv(args.csv)
+    # 여러 약물 분석 기록은 그 안의 모든 조합으로
+    pairs = [pair for entry, count in read_query_log(args.log).items() if len(entry) >= 2
+             for pair in itertools.combinations(entry, 2) for _ in range(count)]
+    if not pairs:
+        print(f"❌ '{args.log}'에 조합 조회 기록이 없습니다.")
+        return 1
+
+    r = measure(engine, pairs)
+    print(f"조회 {r['queries']}건 중 '안전' {r['safe_answers']}건")
+    print(f"필터 미사용 {r['base_ms']:.1f}ms → 사용 {r['filter_ms']:.1f}ms (x{r['speedup']:.1f})")
+    print(f"필터 통과(테이블 검색) {r['filter_passed']}건 중 결과 '안전' {r['filter_passed_safe']}건")
+    fp_rate = r['false_positives'] / r['fp_probes'] if r['fp_probes'] else 0.0
+    print(f"실측 오탐률 {fp_rate:.2%} ({r['fp_probes']}개 임의 쌍), 이론 오탐률 {r['expected_fp_rate']:.2%}, "
+          f"필터 크기 {r['filter_bytes']:,}바이트")
+    if r['mismatches']:
+        print(f"❌ 필터 사용 전/후 결과 불일치 {r['mismatches']}건")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# drug_chat_history.py
+# Streamlit 챗봇의 대화 기록을 최근 메시지 몇 개만 그리도록 제한합니다.
+# 긴 상담에서도 다시 실행할 때마다 그리는 메시지 수(와 브라우저로 보내는 양)가 일정하게 유지됩니다.
+# 이전 메시지는 '더 보기' 버튼을 누를 때만 한 페이지씩 불러옵니다.
+#
+#   from drug_chat_history import render_chat_history
+#   render_chat_history(st.session_state.messages)
+#   render_chat_history(st.session_state.messages, render=lambda m: render_message(m, renderers))   # drug_session 메시지
+
+import streamlit as st
+
+HISTORY_WINDOW = 20   # 기본으로 그리는 최근 메시지 수
+HISTORY_PAGE = 20     # '더 보기' 한 번에 추가로 그리는 메시지 수
+
+
+def visible_range(total, shown, window=HISTORY_WINDOW):
+    """메시지 total개 중 그릴 범위의 시작 번호 (최근 shown개, 최소 window개)"""
+    return max(0, total - max(shown, window))
+
+
+def _dict_message(msg):
+    return msg["role"], msg["content"]
+
+
+def render_chat_history(messages, key='history', window=HISTORY_WINDOW, page=HISTORY_PAGE, render=_dict_message):
+    """최근 메시지만 그리고, 숨겨진 이전 메시지는 버튼으로 한 페이지씩 펼칩니다.
+
+    render: 메시지 → (역할, 마크다운). 그리는 메시지에만 호출합니다.
+    """
+    shown_key = f"{key}_shown"
+    shown = st.session_state.get(shown_key, window)
+    start = visible_range(len(messages), shown, window)
+
+    if start:
+        if st.button(f"⬆️ 이전 대화 {min(page, start)}개 더 보기 (숨겨진 대화 {start}개)", key=f"{key}_more"):
+            st.session_state[shown_key] = len(messages) - start + page
+            st.rerun()
+    if shown > window and len(messages) > window:
+        if st.button("⬇️ 최근 대화만 보기", key=f"{key}_less"):
+            st.session_state[shown_key] = window
+            st.rerun()
+
+    for msg in messages[start:]:
+        role, content = render(msg)
+        with st.chat_message(role):
+            st.markdown(content)
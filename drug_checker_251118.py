@@ -2,6 +2,10 @@ import streamlit as st
 import pandas as pd
 import re
 
+from drug_chat_history import render_chat_history
+from drug_session import NAMES
+from drug_names import clean_query, parse_component_question, parse_interaction_question, parse_product_name
+
 # 1. 데이터 로드 
 @st.cache_data
 def load_data():
@@ -17,6 +21,11 @@ def load_data():
         df['성분명A_lower'] = df['성분명A'].str.lower()
         df['제품명B_lower'] = df['제품명B'].str.lower()
         df['성분명B_lower'] = df['성분명B'].str.lower()
+        # 제품명 비교용 기본 이름 (함량/제형 제거) - 고유 제품명마다 한 번만 파싱
+        for col in ('제품명A', '제품명B'):
+            codes, uniques = pd.factorize(df[col])
+            bases = pd.Series([parse_product_name(name).base for name in uniques] + [None])
+            df[col + '_base'] = bases.take(codes).to_numpy()
         print("✅ (Streamlit) 약물 상호작용 데이터 로드 성공!")
         return df
     except FileNotFoundError:
@@ -32,14 +41,6 @@ def load_data():
 df = load_data()
 
 # 2. 약물 검색 및 상호작용 함수들
-def clean_query(query):
-    """검색어 정제 함수: 괄호, 특정 제형 단어를 제거하고 소문자로 변환합니다."""
-    if not query:
-        return ""
-    # bot_v9.11.py의 clean_query 함수 사용
-    cleaned = re.sub(r'\(.*?\)|\[.*?\]|(주사제|정제|캡슐|시럽)$', '', str(query)).strip().lower() 
-    return cleaned
-
 @st.cache_data 
 def find_drug_info_optimized(df, query):
     """[V6] (상호작용 검색용) 쿼리한 약물 '자체'의 제품명/성분명만 효율적으로 검색합니다."""
@@ -86,29 +87,14 @@ def find_drug_info_optimized(df, query):
 def get_product_list(df, drug_query):
     """사용자 쿼리로부터 관련 제품명 목록을 추출합니다."""
     
-    # 쿼리 전처리: 숫자, 용량/제형 단위를 제거하고 비교 유연성 확보 (오류 수정 반영)
-    cleaned_query = re.sub(r'\(.*?\)|\[.*?\]', '', drug_query, flags=re.IGNORECASE).strip().lower()
-    # 숫자 및 용량/제형 단어를 제거합니다.
-    cleaned_query = re.sub(r'\d+[a-zA-Z]+|\d+|주사제|정제|캡슐|시럽|시럽액|정|주|액|제\b|밀리그램|그램|mg|g|ml|l', '', cleaned_query, flags=re.IGNORECASE).strip()
-    cleaned_query = cleaned_query.replace('_', '').replace(' ', '').strip() # 불필요한 문자 및 공백 제거
+    # 쿼리 전처리: 괄호, 함량/단위, 제형을 제거한 기본 이름 (load_data의 _base 컬럼과 같은 파서)
+    cleaned_query = parse_product_name(drug_query).base
     
     if not cleaned_query: return set()
 
     try:
-        # 데이터프레임 제품명 전처리 함수
-        def preprocess_product_name_for_match(name):
-             if pd.isna(name): return ''
-             name_str = str(name).lower()
-             name_str = re.sub(r'\((.*?)\)|\[.*?\]', '', name_str).strip() 
-             # 숫자 및 용량/제형 단어 제거
-             name_str = re.sub(r'\d+[a-zA-Z]+|\d+|주사제|정제|캡슐|시럽|시럽액|정|주|액|제\b|밀리그램|그램|mg|g|ml|l', '', name_str, flags=re.IGNORECASE)
-             name_str = name_str.replace('_', '').replace(' ', '')
-             return name_str.strip()
-
-        # 캐싱된 전처리 결과가 없으므로 임시로 .apply() 사용
-        # (성능 개선을 위해 실제 앱에서는 이 전처리 결과를 미리 df에 저장하는 것이 좋습니다.)
-        product_names_a = df['제품명A'].apply(preprocess_product_name_for_match)
-        product_names_b = df['제품명B'].apply(preprocess_product_name_for_match)
+        product_names_a = df['제품명A_base']
+        product_names_b = df['제품명B_base']
         
         # 쿼리 전처리 결과와 전처리된 제품명이 정확히 일치하는 행을 찾습니다.
         search_condition = (product_names_a == cleaned_query) | (product_names_b == cleaned_query)
@@ -132,27 +118,14 @@ def get_product_list(df, drug_query):
 def get_main_component(df, drug_query):
     """사용자 쿼리로부터 주성분을 정확히 추출합니다. (단일 제품 선택 시 사용)"""
     
-    # 쿼리 전처리 (get_product_list와 동일하게 수정)
-    cleaned_query = re.sub(r'\(.*?\)|\[.*?\]', '', drug_query, flags=re.IGNORECASE).strip().lower()
-    # 숫자 및 용량/제형 단어를 제거합니다.
-    cleaned_query = re.sub(r'\d+[a-zA-Z]+|\d+|주사제|정제|캡슐|시럽|시럽액|정|주|액|제\b|밀리그램|그램|mg|g|ml|l', '', cleaned_query, flags=re.IGNORECASE).strip()
-    cleaned_query = cleaned_query.replace('_', '').replace(' ', '')
+    # 쿼리 전처리: 괄호, 함량/단위, 제형을 제거한 기본 이름 (load_data의 _base 컬럼과 같은 파서)
+    cleaned_query = parse_product_name(drug_query).base
     
     if not cleaned_query: return set()
 
     try:
-        # 제품명 전처리 함수 (get_product_list와 동일하게 수정)
-        def preprocess_product_name_for_match(name):
-             if pd.isna(name): return ''
-             name_str = str(name).lower()
-             name_str = re.sub(r'\((.*?)\)|\[.*?\]', '', name_str).strip() 
-             # 숫자 및 용량/제형 단어 제거
-             name_str = re.sub(r'\d+[a-zA-Z]+|\d+|주사제|정제|캡슐|시럽|시럽액|정|주|액|제\b|밀리그램|그램|mg|g|ml|l', '', name_str, flags=re.IGNORECASE)
-             name_str = name_str.replace('_', '').replace(' ', '')
-             return name_str.strip()
-
-        product_names_a = df['제품명A'].apply(preprocess_product_name_for_match)
-        product_names_b = df['제품명B'].apply(preprocess_product_name_for_match)
+        product_names_a = df['제품명A_base']
+        product_names_b = df['제품명B_base']
         
         valid_components = set()
 
@@ -317,7 +290,7 @@ if "messages" not in st.session_state:
 if "waiting_for_product_selection" not in st.session_state:
     st.session_state.waiting_for_product_selection = False
 if "product_options" not in st.session_state:
-    st.session_state.product_options = set()
+    st.session_state.product_options = ()   # 제품명 대신 이름 ID (drug_session.NAMES, 정렬된 순서)
 if "initial_query" not in st.session_state:
       st.session_state.initial_query = ""
 
@@ -327,9 +300,7 @@ if not st.session_state.messages:
         {"role": "assistant", "content": "안녕하세요! 약물 상호작용 챗봇입니다.\n\n[질문 예시]\n1. 타이레놀 주성분이 뭐야?\n2. 타이레놀과 부루펜을 같이 복용해도 돼?"}
     )
 
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+render_chat_history(st.session_state.messages)
 
 # 🌟 버튼 클릭 시 호출될 콜백 함수 정의 (st.experimental_rerun -> st.rerun 변경)
 def handle_selection(product_name):
@@ -347,7 +318,7 @@ def handle_selection(product_name):
     
     # 꼬리 질문 상태를 종료하고 옵션을 초기화합니다.
     st.session_state.waiting_for_product_selection = False
-    st.session_state.product_options = set()
+    st.session_state.product_options = ()
     st.session_state.initial_query = ""
     
     # st.rerun()으로 변경하여 안정성 확보
@@ -378,13 +349,10 @@ else:
         st.session_state.initial_query = prompt # 초기 쿼리 저장
         
         # 1. 성분 질문
-        # 🌟 RegEx 수정: "뭐야?/알려줘"로 끝남
-        match_component = re.match(r'(.+?)\s*(?:주성분|성분)[이]?\s*(?:뭐야|알려줘)?\??$', prompt.strip())
+        # 🌟 RegEx 수정: "뭐야?/알려줘"로 끝남 (미리 컴파일된 패턴, 끝의 조사 '의' 제거)
+        drug_name = parse_component_question(prompt)
 
-        if match_component:
-            drug_name = match_component.group(1).strip('() ')
-            drug_name = re.sub(r'[의]$', '', drug_name).strip() # 불필요한 조사 '의' 제거
-            
+        if drug_name is not None:
             if drug_name:
                 # 🌟 get_product_list를 사용하여 모든 관련 제품 목록을 가져옵니다.
                 products = get_product_list(df, drug_name) 
@@ -394,7 +362,7 @@ else:
                 
                 elif len(products) > 1:
                     # 🌟 제품이 여러 개일 경우, 선택 버튼을 위한 세션 상태를 저장합니다.
-                    st.session_state.product_options = products
+                    st.session_state.product_options = NAMES.ids(sorted(products))
                     st.session_state.waiting_for_product_selection = True
                     reply_message = f"✅ '{drug_name}'과(와) 관련된 여러 제품이 검색되었습니다. **찾으시는 제품을 선택**해 주세요."
                     
@@ -411,22 +379,10 @@ else:
                 reply_message = "❌ 어떤 약물의 성분을 알고 싶으신가요? 약물 이름을 입력해주세요."
         
         # 2. 상호작용 질문 (bot_v9.11.py 로직 유지)
-        match_interaction = re.match(r'(.+?)\s*(?:이랑|랑|과|와|하고)\s+(.+?)(?:를|을)?\s+(?:같이|함께)\s+(?:복용해도|먹어도)\s+(?:돼|되나|될까|되나요)\??', prompt.strip())
-        
-        if not match_interaction:
-            match_interaction_sep = re.match(r'^\s*(.+?)\s*(?:이랑|랑|과|와|하고)\s+(.+?)\s*$', prompt.strip())
-            if match_interaction_sep:
-                 match_interaction = match_interaction_sep
-
-        if not match_interaction:
-             match_interaction_simple = re.match(r'^\s*([^\s].*?)\s+([^\s].*?)\s*$', prompt.strip())
-             if match_interaction_simple:
-                 match_interaction = match_interaction_simple
-
+        match_interaction = parse_interaction_question(prompt)
 
         if match_interaction and not reply_message: # reply_message가 비어있을 때만 실행
-            drug_A_query = match_interaction.group(1).strip('() ')
-            drug_B_query = match_interaction.group(2).strip('() ')
+            drug_A_query, drug_B_query = match_interaction
             
             if drug_A_query and drug_B_query:
                 with st.spinner(f"🔄 '{drug_A_query}'와 '{drug_B_query}' 상호작용 검색 중..."):
@@ -442,7 +398,7 @@ else:
                 reply_message = "❌ 두 약물 이름을 정확히 입력해주세요. 예: (A)약물과 (B)약물을 같이 복용해도 돼?"
         
         # 3. 일반적인 응답
-        elif not match_component and not match_interaction:
+        elif drug_name is None and not match_interaction:
             reply_message = "🤔 죄송합니다. 질문 형식을 이해하지 못했습니다.\n\n   **[질문 예시]**\n   * 타이레놀과 부루펜\n   * 타이레놀 주성분이 뭐야?"
 
         st.session_state.messages.append({"role": "assistant", "content": reply_message})
@@ -457,10 +413,11 @@ else:
                 cols = st.columns(2) 
                 
                 # 제품 목록을 순회하며 버튼을 생성합니다.
-                for i, product in enumerate(sorted(list(st.session_state.product_options))):
+                for i, product_id in enumerate(st.session_state.product_options):
+                    product = NAMES.name(product_id)
                     cols[i % 2].button(
                         product, 
-                        key=f"select_{product}", 
+                        key=f"select_{product_id}", 
                         on_click=handle_selection, 
                         args=(product,)
                     )
\ No newline at end of file
@@ -0,0 +1,263 @@
+# drug_delta.py
+# 주간 변경분(추가/삭제/변경 행)만 현재 스냅샷에 반영하여 새 스냅샷 버전을 만듭니다.
+# 전체 CSV를 다시 읽거나 모든 성분 쌍을 다시 계산하지 않습니다.
+#
+#   python drug_delta.py apply delta.csv
+#
+# 변경분 파일 형식 (UTF-8 CSV): 작업,제품명A,성분명A,제품명B,성분명B,상세정보
+#   추가(add)    : 행을 추가
+#   삭제(remove) : 네 이름이 같은 행을 삭제 (상세정보를 적으면 상세정보까지 같은 행만)
+#   변경(change) : 네 이름이 같은 행의 상세정보를 새 값으로 바꿈
+#
+# 출처 컬럼이 있는 스냅샷(--stream, 여러 원본)이면 변경분 파일도 원본 하나(파일 이름)로 출처 목록에 추가하고,
+# 추가/변경된 행에 그 출처 비트를 기록합니다.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from drug_bloom import BloomFilter
+from drug_engine import (BASE_COLUMNS, NAME_COLUMNS, PAIR_FILTER_FP_RATE, SOURCE_COLUMN, compute_pair_keys,
+                         normalize_base_columns, prepare_dataframe)
+from drug_index import AliasTable, IngredientSets
+from drug_ingest import MAX_SOURCES, source_name
+from drug_kvstore import PairStore, iter_pair_answers, normalize_key_name
+from drug_names import load_alias_groups
+from drug_snapshot import (SNAPSHOT_KEEP, SNAPSHOT_ROOT, file_sha256, read_manifest, read_snapshot, source_names,
+                           write_snapshot)
+OPERATIONS = {'추가': 'add', 'add': 'add', '삭제': 'remove', 'remove': 'remove', '변경': 'change', 'change': 'change'}
+
+
+def read_delta(delta_path):
+    delta = pd.read_csv(delta_path, encoding='utf-8', dtype=str)
+    missing = [col for col in ['작업'] + NAME_COLUMNS if col not in delta.columns]
+    if missing:
+        raise ValueError(f"변경분 파일에 컬럼이 없습니다: {', '.join(missing)}")
+    if '상세정보' not in delta.columns:
+        delta['상세정보'] = None
+    delta = normalize_base_columns(delta)  # 원본 CSV 로드와 같은 기준으로 공백 정리
+    delta['작업'] = delta['작업'].str.strip().str.lower().map(OPERATIONS)
+    if delta['작업'].isna().any():
+        raise ValueError("'작업' 컬럼은 추가/삭제/변경(add/remove/change) 중 하나여야 합니다.")
+    return delta
+
+
+def _row_keys(df, columns):
+    """여러 컬럼을 하나의 비교용 키로 묶습니다. (NaN도 같은 값으로 취급)"""
+    return pd.MultiIndex.from_frame(df[columns].fillna('\0'))
+
+
+def _side_names(df):
+    """키-값 파일과 같은 기준의 (A쪽 성분, B쪽 성분) 이름"""
+    side_a = df['성분명A_lower'].fillna(df['제품명A_lower']).str.strip()
+    side_b = df['성분명B_lower'].fillna(df['제품명B_lower']).str.strip()
+    return side_a, side_b
+
+
+def _canonical_pairs(df):
+    side_a, side_b = _side_names(df)
+    return {tuple(sorted((normalize_key_name(a), normalize_key_name(b))))
+            for a, b in zip(side_a, side_b) if pd.notna(a) and pd.notna(b)}
+
+
+def apply_delta(df, delta, source_bit=None):
+    """데이터프레임에 변경분을 반영합니다. (새 df, 삭제된 행, 추가된 행, 변경된 행, 통계)를 반환합니다.
+
+    df에 출처 컬럼이 있으면 source_bit(변경분 원본의 출처 비트)를 추가된 행, 상세정보가 바뀐 행,
+    추가하려던 행과 같은 기존 행에 기록합니다. 변경된 행에는 출처만 바뀐 행도 포함됩니다. (이름 인덱스는 그대로, 설명만 바뀜)
+    변경으로 서로 같아진 행은 전체 재생성(load_dataframe)처럼 처음 행 하나만 남기고 출처 비트를 합칩니다.
+    """
+    removes = delta[delta['작업'] == 'remove']
+    changes = delta[delta['작업'] == 'change']
+    adds = delta[delta['작업'] == 'add'][BASE_COLUMNS].copy()
+    track_source = SOURCE_COLUMN in df.columns and source_bit is not None
+    source_mask = np.uint32(1 << source_bit) if track_source else np.uint32(0)
+
+    keys = _row_keys(df, NAME_COLUMNS)
+    keys_with_detail = _row_keys(df, BASE_COLUMNS)
+
+    # 삭제: 상세정보가 있으면 5개 컬럼 모두, 없으면 이름 4개만 일치하는 행
+    has_detail = removes['상세정보'].notna()
+    drop_mask = keys_with_detail.isin(_row_keys(removes[has_detail], BASE_COLUMNS)) | \
+        keys.isin(_row_keys(removes[~has_detail], NAME_COLUMNS))
+
+    # 변경: 이름 4개가 일치하는 행의 상세정보만 교체
+    change_detail = dict(zip(_row_keys(changes, NAME_COLUMNS), changes['상세정보']))
+    change_mask = keys.isin(_row_keys(changes, NAME_COLUMNS)) & ~drop_mask
+
+    removed_rows = df[drop_mask]
+    new_df = df.copy()
+
+    # 변경된 행은 제자리에서 상세정보/위험도만 다시 계산 (이름 관련 컬럼은 그대로)
+    if change_mask.any():
+        details = [change_detail[k] for k in keys[change_mask]]
+        updated = prepare_dataframe(df.loc[change_mask, BASE_COLUMNS].assign(상세정보=details))
+        new_df.loc[change_mask, '상세정보'] = updated['상세정보'].values
+        new_df.loc[change_mask, '위험도'] = updated['위험도'].values
+        if track_source:
+            new_df.loc[change_mask, SOURCE_COLUMN] |= source_mask
+    new_df = new_df[~drop_mask]
+    change_mask = change_mask[~drop_mask]
+
+    # 변경으로 같아진 행 합치기 (데이터는 항상 중복 없는 상태로 유지)
+    row_keys = _row_keys(new_df, BASE_COLUMNS)
+    merged = row_keys.duplicated()
+    if merged.any():
+        if SOURCE_COLUMN in new_df.columns:
+            codes, _ = pd.factorize(row_keys)
+            provenance = pd.Series(new_df[SOURCE_COLUMN].to_numpy()).groupby(codes).agg(np.bitwise_or.reduce)
+            new_df[SOURCE_COLUMN] = provenance.to_numpy()[codes].astype(np.uint32)
+        new_df, row_keys, change_mask = new_df[~merged], row_keys[~merged], change_mask[~merged]
+
+    # 이미 있는 행(또는 변경분 안에서 중복된 행)은 추가하지 않고, 기존 행에 변경분 출처만 더함
+    adds = adds.drop_duplicates()
+    add_keys = _row_keys(adds, BASE_COLUMNS)
+    existing = row_keys.isin(add_keys)
+    if track_source and existing.any():
+        new_df.loc[existing, SOURCE_COLUMN] |= source_mask
+        change_mask = change_mask | existing
+    adds = adds[~add_keys.isin(row_keys)]
+
+    # 추가된 행만 검색용 컬럼/위험도를 계산
+    added_rows = prepare_dataframe(adds.reset_index(drop=True))
+    if SOURCE_COLUMN in df.columns:
+        added_rows[SOURCE_COLUMN] = np.full(len(added_rows), source_mask, dtype=np.uint32)
+    changed_rows = new_df[change_mask]
+    new_df = pd.concat([new_df, added_rows], ignore_index=True)
+
+    stats = {'added': int(len(adds)), 'removed': int(drop_mask.sum()), 'changed': int(len(changed_rows)),
+             'merged': int(merged.sum())}
+    return new_df, removed_rows, added_rows, changed_rows, stats
+
+
+def delta_sources(parent_manifest, delta_path, df):
+    """변경분 파일을 출처 목록의 원본 하나로 등록합니다. (새 출처 목록, 변경분 출처 비트)
+
+    같은 이름의 원본이 이미 있으면 그 비트를 다시 씁니다. 데이터에 출처 컬럼이 없으면 (목록, None)입니다.
+    """
+    sources = [dict(source) for source in parent_manifest.get('sources', [])]
+    if SOURCE_COLUMN not in df.columns:
+        return sources or None, None
+    name = source_name(delta_path)
+    for source in sources:
+        if source['name'] == name:
+            return sources, source['bit']
+    if len(sources) >= MAX_SOURCES:
+        raise ValueError(f"원본은 최대 {MAX_SOURCES}개까지 합칠 수 있습니다.")
+    sources.append({'name': name, 'bit': len(sources), 'format': 'delta', 'path': os.path.abspath(delta_path)})
+    return sources, len(sources) - 1
+
+
+def update_indexes(indexes, new_df, removed_rows, new_rows):
+    """이름 ID / 상호작용 쌍 키 / 블룸 필터 / 오타 보정 이름을 변경된 행 기준으로 갱신합니다."""
+    vocab = list(indexes['name_vocab'])
+    known = set(vocab)
+    for col in ('제품명A_lower', '성분명A_lower', '제품명B_lower', '성분명B_lower'):
+        for name in new_rows[col].dropna().unique():
+            if name not in known:
+                known.add(name)
+                vocab.append(name)   # 기존 이름 ID는 그대로 유지
+
+    pair_keys = indexes['pair_keys']
+    if len(removed_rows):
+        # 삭제된 행의 쌍 중, 남은 행에 여전히 있는 쌍만 다시 살림
+        removed_keys = compute_pair_keys(removed_rows, vocab)
+        touched = set(removed_rows[['제품명A_lower', '성분명A_lower', '제품명B_lower', '성분명B_lower']].stack().unique())
+        candidates = new_df[new_df[['제품명A_lower', '성분명A_lower']].isin(touched).any(axis=1)]
+        still_present = np.intersect1d(compute_pair_keys(candidates, vocab), removed_keys)
+        pair_keys = np.union1d(np.setdiff1d(pair_keys, removed_keys), still_present)
+    if len(new_rows):
+        pair_keys = np.union1d(pair_keys, compute_pair_keys(new_rows, vocab))
+    pair_keys = pair_keys.astype(np.uint64)
+
+    bloom = BloomFilter.from_keys(pair_keys, PAIR_FILTER_FP_RATE)
+    # 새로 생긴 이름이 별칭 그룹에 들어갈 수 있으므로 별칭 표도 새 이름 ID로 다시 만듦 (그룹은 기존 것 사용)
+    alias_table = indexes.get('alias_table')
+    alias_groups = alias_table.groups if alias_table is not None else load_alias_groups()
+    all_names = pd.concat([new_df[col] for col in NAME_COLUMNS]).dropna().unique()
+    return {
+        'all_names': sorted({str(name) for name in all_names if len(str(name)) > 1}),
+        'name_vocab': vocab,
+        'pair_keys': pair_keys,
+        'pair_filter': (bloom.num_bits, bloom.num_hashes, bloom.bits, bloom.count),
+        # 행 번호가 바뀌므로 복합제 성분 색인은 새 데이터로 다시 만듦 (성분명 종류별 분리라 빠름)
+        'ingredient_sets': IngredientSets(new_df),
+        'alias_table': AliasTable(alias_groups, {name: i for i, name in enumerate(vocab)}),
+    }
+
+
+def update_pair_answers(pair_path, new_df, *touched_rows, names=None):
+    """영향을 받은 성분 쌍만 다시 계산하고, 나머지는 기존 키-값 파일에서 그대로 가져옵니다."""
+    affected = set().union(*(_canonical_pairs(rows) for rows in touched_rows))
+    affected_names = {name for pair in affected for name in pair}
+
+    side_a, side_b = _side_names(new_df)
+    subset = new_df[side_a.isin(affected_names) & side_b.isin(affected_names)]
+    recomputed = {}
+    for a, b, risk_label, explanation in iter_pair_answers(subset, names):
+        key = tuple(sorted((normalize_key_name(a), normalize_key_name(b))))
+        if key in affected:
+            recomputed[key] = (a, b, risk_label, explanation)
+
+    store = PairStore(pair_path)
+    try:
+        answers = [entry for entry in store if tuple(sorted(entry[:2])) not in affected]
+    finally:
+        store.close()
+    answers.extend(recomputed.values())
+    return answers, len(affected)
+
+
+def apply_delta_file(delta_path, root=SNAPSHOT_ROOT, make_current=True, keep=SNAPSHOT_KEEP):
+    """현재 스냅샷에 변경분 파일을 반영하여 새 스냅샷 버전을 만듭니다."""
+    started = time.perf_counter()
+    parent, df, indexes, pair_path = read_snapshot(root=root)
+    delta = read_delta(delta_path)
+
+    parent_manifest = read_manifest(parent, root)
+    sources, source_bit = delta_sources(parent_manifest, delta_path, df)
+    names = source_names({'sources': sources or []})
+
+    new_df, removed_rows, added_rows, changed_rows, stats = apply_delta(df, delta, source_bit)
+    # 변경(상세정보/출처만 바뀜)은 이름/쌍 인덱스에 영향이 없음
+    new_indexes = update_indexes(indexes, new_df, removed_rows, added_rows)
+    if len(source_names(parent_manifest)) <= 1 < len(names):
+        # 원본이 하나뿐이던 스냅샷은 설명에 출처를 붙이지 않았으므로 모든 쌍을 다시 계산
+        answers = list(iter_pair_answers(new_df, names))
+        affected_pairs = len(answers)
+    else:
+        answers, affected_pairs = update_pair_answers(pair_path, new_df, removed_rows, added_rows, changed_rows,
+                                                      names=names)
+
+    extra = {'parent': parent, 'delta': dict(stats, source=delta_path, sha256=file_sha256(delta_path),
+                                             affected_ingredient_pairs=affected_pairs)}
+    if sources:
+        extra['sources'] = sources
+    version = write_snapshot(new_df, root, started=started, make_current=make_current, keep=keep,
+                             extra=extra, indexes=new_indexes, pair_answers=answers)
+    print(f"✅ 변경분 반영: 추가 {stats['added']} / 삭제 {stats['removed']} / 변경 {stats['changed']}행 "
+          f"(같아져 합친 행 {stats['merged']}), "
+          f"성분 쌍 {affected_pairs}개 재계산 ({parent} → {version})")
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="변경분(추가/삭제/변경)만 스냅샷에 반영")
+    parser.add_argument('--root', default=SNAPSHOT_ROOT)
+    sub = parser.add_subparsers(dest='command', required=True)
+    apply = sub.add_parser('apply', help="현재 스냅샷에 변경분 파일 반영")
+    apply.add_argument('delta')
+    apply.add_argument('--keep', type=int, default=SNAPSHOT_KEEP)
+    apply.add_argument('--no-switch', action='store_true', help="CURRENT는 바꾸지 않음")
+    args = parser.parse_args(argv)
+
+    apply_delta_file(args.delta, args.root, make_current=not args.no_switch, keep=args.keep)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
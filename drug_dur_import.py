@@ -0,0 +1,281 @@
+# drug_dur_import.py
+# 식약처 DUR 병용금기 원본 파일(XML / JSON / XLSX)을 스트리밍으로 읽어 스냅샷용 컬럼 파일로 바로 씁니다.
+# 문서 전체를 메모리에 올리지 않고 레코드 단위로 읽으므로, druglist.csv로 손으로 변환할 필요가 없습니다.
+#
+#   python drug_dur_import.py import dur_export.xml out_dir
+#   python drug_dur_import.py check samples         # 샘플 파일들을 읽어 결과 일치 여부와 초당 행 수 출력
+#   python drug_snapshot.py build dur_export.xlsx   # CSV가 아니면 자동으로 이 모듈을 사용
+#
+# 원본 필드 이름은 공공데이터 API 필드(ITEM_NAME 등), 엑셀 한글 헤더, druglist.csv 컬럼을 모두 인식합니다.
+
+import argparse
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+
+import pandas as pd
+
+from drug_engine import BASE_COLUMNS
+from drug_ingest import INGEST_CHUNK_MEM_MB, ingest_chunks, iter_csv_chunks, source_name
+
+RECORD_CHUNK_ROWS = 50000
+JSON_READ_SIZE = 1 << 20
+
+# 원본 필드 이름 → druglist.csv 컬럼
+FIELD_ALIASES = {
+    '제품명A': ('제품명A', 'ITEM_NAME', '제품명'),
+    '성분명A': ('성분명A', 'INGR_KOR_NAME', 'INGR_NAME', '성분명'),
+    '제품명B': ('제품명B', 'MIXTURE_ITEM_NAME', '병용제품명', '병용금기제품명'),
+    '성분명B': ('성분명B', 'MIXTURE_INGR_KOR_NAME', 'MIXTURE_INGR_NAME', '병용성분명', '병용금기성분명'),
+    '상세정보': ('상세정보', 'PROHBT_CONTENT', '금기내용', '상세내용'),
+}
+_FIELD_INDEX = {alias.upper(): BASE_COLUMNS.index(col) for col, aliases in FIELD_ALIASES.items() for alias in aliases}
+
+
+def _to_row(record):
+    """원본 레코드(dict)를 BASE_COLUMNS 순서의 값 목록으로 바꿉니다. 모르는 필드는 무시합니다."""
+    row = [None] * len(BASE_COLUMNS)
+    for key, value in record.items():
+        idx = _FIELD_INDEX.get(str(key).strip().upper())
+        if idx is not None and row[idx] is None and value is not None:
+            row[idx] = str(value)
+    return row
+
+
+def records_to_chunks(records, chunk_rows=RECORD_CHUNK_ROWS):
+    """레코드 iterator를 chunk_rows행짜리 데이터프레임 청크로 묶습니다."""
+    rows = []
+    for record in records:
+        rows.append(_to_row(record))
+        if len(rows) >= chunk_rows:
+            yield pd.DataFrame(rows, columns=BASE_COLUMNS, dtype=str)
+            rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=BASE_COLUMNS, dtype=str)
+
+
+# --------------------------------------------------------------------------------------------------
+# 1. 형식별 레코드 읽기
+# --------------------------------------------------------------------------------------------------
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _iter_elements(source, tag):
+    """태그 이름이 tag인 요소가 완성될 때마다 반환하고, 처리 후 부모에서 떼어 냅니다.
+
+    떼어 내지 않으면 iterparse도 결국 문서 전체를 트리로 들고 있게 됩니다.
+    """
+    parents = []
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        if _local(elem.tag) == tag:
+            yield elem
+            if parents:
+                parents[-1].remove(elem)
+
+
+def _text(elem):
+    return ''.join(t.text or '' for t in elem.iter() if _local(t.tag) == 't')
+
+
+def iter_xml_records(path, record_tag='item'):
+    """<item><ITEM_NAME>..</ITEM_NAME>...</item> 형태의 레코드를 하나씩 읽습니다."""
+    for elem in _iter_elements(path, record_tag):
+        yield {_local(child.tag): (child.text or '').strip() or None for child in elem}
+
+
+_JSON_ITEMS_RE = re.compile(r'"items?"\s*:\s*\[')
+
+
+def iter_json_records(path, read_size=JSON_READ_SIZE):
+    """최상위 배열 또는 "items": [...] 배열의 객체를 하나씩 읽습니다."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        buffer = f.read(read_size).lstrip('\ufeff')
+        eof = not buffer
+
+        # 레코드 배열의 시작 위치 찾기
+        if buffer.lstrip().startswith('['):
+            pos = buffer.index('[') + 1
+        else:
+            while True:
+                match = _JSON_ITEMS_RE.search(buffer)
+                if match:
+                    pos = match.end()
+                    break
+                if eof:
+                    raise ValueError(f"'{path}'에서 레코드 배열(\"items\": [...])을 찾지 못했습니다.")
+                more = f.read(read_size)
+                eof = not more
+                buffer = buffer[-64:] + more   # 키가 읽기 경계에 걸친 경우를 위해 끝부분 유지
+
+        while True:
+            # 공백/쉼표를 건너뛰고 객체 하나를 해석 (버퍼가 모자라면 더 읽음)
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(read_size)
+                eof = not more
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            yield record
+            pos = end
+
+
+_CELL_REF_RE = re.compile(r'([A-Z]+)')
+
+
+def _column_index(cell_ref):
+    index = 0
+    for ch in _CELL_REF_RE.match(cell_ref).group(1):
+        index = index * 26 + ord(ch) - ord('A') + 1
+    return index - 1
+
+
+def iter_xlsx_records(path, sheet=None):
+    """엑셀 파일의 첫 시트(또는 sheet)를 첫 행을 헤더로 하여 한 행씩 읽습니다. (openpyxl 불필요)"""
+    with zipfile.ZipFile(path) as z:
+        shared = []
+        if 'xl/sharedStrings.xml' in z.namelist():
+            with z.open('xl/sharedStrings.xml') as f:
+                shared = [_text(si) for si in _iter_elements(f, 'si')]
+
+        sheets = sorted(name for name in z.namelist() if re.match(r'xl/worksheets/sheet\d+\.xml$', name))
+        sheet_path = sheet or (sheets[0] if sheets else None)
+        if sheet_path is None:
+            raise ValueError(f"'{path}'에 시트가 없습니다.")
+
+        header = None
+        with z.open(sheet_path) as f:
+            for row in _iter_elements(f, 'row'):
+                values = {}
+                for cell in row:
+                    kind = cell.get('t')
+                    if kind == 'inlineStr':
+                        text = _text(cell)
+                    else:
+                        v = next((c for c in cell if _local(c.tag) == 'v'), None)
+                        text = v.text if v is not None else None
+                        if kind == 's' and text is not None:
+                            text = shared[int(text)]
+                    values[_column_index(cell.get('r'))] = text
+
+                if header is None:
+                    header = values
+                    continue
+                yield {header[i]: value for i, value in values.items() if i in header}
+
+
+READERS = {
+    '.xml': iter_xml_records,
+    '.json': iter_json_records,
+    '.xlsx': iter_xlsx_records,
+}
+
+
+def iter_source_chunks(path, chunk_mem_mb=INGEST_CHUNK_MEM_MB, chunk_rows=None):
+    """파일 확장자에 맞는 방식으로 데이터프레임 청크를 읽습니다. (CSV는 drug_ingest와 동일)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return iter_csv_chunks(path, chunk_mem_mb, chunk_rows)
+    if ext not in READERS:
+        raise ValueError(f"지원하지 않는 형식입니다: {ext} (csv/xml/json/xlsx)")
+    return records_to_chunks(READERS[ext](path), chunk_rows or RECORD_CHUNK_ROWS)
+
+
+def import_sources(paths, out_dir, chunk_mem_mb=INGEST_CHUNK_MEM_MB, chunk_rows=None, names=None):
+    """여러 원본 파일을 차례로 읽어 하나로 합친 컬럼 파일을 씁니다. (중복 행은 출처 비트만 합침)
+
+    names를 주지 않으면 파일 이름을 원본 이름으로 씁니다. 통계 dict(초당 행 수 포함)를 반환합니다.
+    """
+    names = list(names or []) + [source_name(path) for path in paths[len(names or []):]]
+
+    def chunks():
+        for i, path in enumerate(paths):
+            for chunk in iter_source_chunks(path, chunk_mem_mb, chunk_rows):
+                yield i, chunk
+
+    stats = ingest_chunks(chunks(), out_dir, chunk_mem_mb, source_names=names)
+    for source, path in zip(stats['sources'], paths):
+        source['format'] = os.path.splitext(path)[1].lower().lstrip('.')
+    stats['rows_per_sec'] = round(stats['source_rows'] / stats['seconds']) if stats['seconds'] else None
+    return stats
+
+
+def import_file(path, out_dir, chunk_mem_mb=INGEST_CHUNK_MEM_MB, chunk_rows=None):
+    """원본 파일 하나를 out_dir에 컬럼 파일로 씁니다."""
+    stats = import_sources([path], out_dir, chunk_mem_mb, chunk_rows)
+    stats['format'] = stats['sources'][0]['format']
+    return stats
+
+
+# --------------------------------------------------------------------------------------------------
+# 2. 샘플 파일 확인
+# --------------------------------------------------------------------------------------------------
+def check_samples(sample_dir):
+    """sample_dir의 모든 원본 파일을 읽어, 형식과 관계없이 같은 행들이 나오는지 확인합니다."""
+    import tempfile
+
+    from drug_ingest import read_columnar
+
+    results = {}
+    for name in sorted(os.listdir(sample_dir)):
+        path = os.path.join(sample_dir, name)
+        if os.path.splitext(name)[1].lower() not in READERS and not name.lower().endswith('.csv'):
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            out_dir = os.path.join(tmp, 'columns')
+            stats = import_file(path, out_dir)
+            df = read_columnar(out_dir)[BASE_COLUMNS]
+        rows = sorted(map(tuple, df.fillna('').to_numpy().tolist()))
+        results[name] = (stats, rows)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DUR 원본 파일(XML/JSON/XLSX) 스트리밍 가져오기")
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help="원본 파일을 컬럼 파일로 변환")
+    imp.add_argument('source')
+    imp.add_argument('out_dir')
+    imp.add_argument('--chunk-mem-mb', type=int, default=INGEST_CHUNK_MEM_MB, help="CSV 한 청크에 쓸 메모리 목표 (청크 크기 힌트)")
+    chk = sub.add_parser('check', help="샘플 파일들의 결과 일치 여부와 처리 속도 확인")
+    chk.add_argument('sample_dir', nargs='?', default='samples')
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        s = import_file(args.source, args.out_dir, args.chunk_mem_mb)
+        print(f"✅ [{s['format']}] {s['source_rows']}행 → {s['rows']}행 (중복 {s['duplicates']}행 제거), "
+              f"{s['seconds']:.2f}초, 초당 {s['rows_per_sec']:,}행, 최대 RSS {s['peak_rss_mb']}MB")
+        return 0
+
+    results = check_samples(args.sample_dir)
+    if not results:
+        print(f"❌ '{args.sample_dir}'에 샘플 파일이 없습니다.")
+        return 1
+    expected = next(iter(results.values()))[1]
+    failed = 0
+    for name, (s, rows) in results.items():
+        ok = rows == expected and len(rows) > 0
+        failed += not ok
+        print(f"{'✅' if ok else '❌'} {name:<24} {s['source_rows']:>6}행 → {s['rows']:>6}행  "
+              f"초당 {s['rows_per_sec'] or 0:>9,}행")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,991 @@
+# drug_engine.py
+# Streamlit 없이도 사용할 수 있는 약물 상호작용 검색 엔진입니다.
+# app.py 등 UI 스크립트는 프로세스당 하나의 엔진을 만들어 공유합니다.
+
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import process, fuzz
+
+from drug_bloom import BloomFilter, pair_id
+from drug_index import (AliasTable, FuzzyIndex, IngredientSets, NgramIndex, RowPostings, build_adjacency,
+                        build_clean_product_map)
+from drug_names import (ALIAS_FILE, EMPTY_NAME, clean_query, load_alias_groups, moiety_key, normalize_name,
+                        parse_product_name)
+
+DATA_FILE = 'druglist.csv'
+NAME_COLUMNS = ['제품명A', '성분명A', '제품명B', '성분명B']
+BASE_COLUMNS = NAME_COLUMNS + ['상세정보']
+SOURCE_COLUMN = '출처'   # 여러 원본을 합친 경우 행별 출처 비트마스크 (uint32, 비트 i = i번째 원본)
+
+# 검색용 'clean' 컬럼 생성 규칙 (app.py와 동일)
+CLEAN_RULE = r'[\s\(\)\[\]_/\-\.]|주사제|정제|정|약|캡슐|시럽|약물'
+
+DANGEROUS_KEYWORDS = [
+    "금기", "투여 금지", "독성 증가", "치명적인", "심각한", "유산 산성증",
+    "고칼륨혈증", "심실성 부정맥", "위험성 증가", "위험 증가", "심장 부정맥",
+    "QT간격 연장 위험 증가", "QT연장", "심부정맥", "중대한", "심장 모니터링",
+    "병용금기", "Torsade de pointes 위험 증가", "위험이 증가함",
+    "약물이상반응 발생 위험", "독성", "허혈", "혈관경련",
+    "횡문근융해와 같은 중증의 근육이상 보고"
+]
+CAUTION_KEYWORDS = [
+    "치료 효과가 제한적", "중증의 위장관계 이상반응", "Alfuzosin 혈중농도 증가",
+    "양쪽 약물 모두 혈장농도 상승 가능", "Amiodarone 혈중농도 증가",
+    "혈중농도 증가", "혈장 농도 증가",
+    "Finerenone 혈중농도의 현저한 증가가 예상됨"
+]
+
+RISK_LABELS = {2: "위험", 1: "주의", 0: "정보 확인"}
+RISK_RANKS = {label: level for level, label in RISK_LABELS.items()}   # 그 외 라벨(정보 없음, 오류)은 -1
+
+PAIR_FILTER_FP_RATE = 0.01   # 블룸 필터 목표 오탐률
+PAIR_FILTER_MAX_PROBES = 20000  # 자유 입력 검색에서 필터로 확인할 최대 이름 쌍 수
+PRESCRIPTION_MODES = ('product', 'text', 'ingredient')  # check_prescriptions의 이름 종류
+CLOSE_JOIN_TIMEOUT = 5.0     # close()가 백그라운드 작업(인덱스 생성/캐시 워밍)이 멈추기를 기다리는 최대 시간 (초)
+
+# 백그라운드에서 만드는 인덱스 (만들어지는 순서대로 해당 기능이 인덱스 검색으로 전환)
+INDEX_NAMES = ('ngram', 'postings', 'adjacency', 'fuzzy', 'ingredients', 'aliases')
+# 답 자체를 바꾸는 인덱스 → 스냅샷 저장 키. 스냅샷 생성 시, CSV 로드 시에는 엔진 생성 시 만들어 두므로
+# 백그라운드 인덱스 준비 여부에 따라 같은 질문의 답이 달라지지 않음
+BUILD_TIME_INDEXES = {'ingredients': 'ingredient_sets', 'aliases': 'alias_table'}
+SIDE_A = ('제품명A_lower', '성분명A_lower')
+SIDE_B = ('제품명B_lower', '성분명B_lower')
+PRODUCT_COLUMNS = ('제품명A', '제품명B')
+PARSED_FIELDS = ('base', 'strength', 'unit', 'form')  # 제품명 구조화 컬럼: 제품명A_base, 제품명A_strength, ...
+
+_MISSING = object()
+
+
+# --------------------------------------------------------------------------------------------------
+# 1. 데이터 로드
+# --------------------------------------------------------------------------------------------------
+def load_dataframe(file_path=DATA_FILE):
+    """CSV 파일을 읽고 검색용 '_lower' / '_clean' 컬럼을 미리 생성합니다.
+
+    중복 행은 여기서 한 번만 제거하므로, 검색 시에는 중복 제거가 필요 없습니다.
+    """
+    df = normalize_base_columns(pd.read_csv(file_path, encoding='utf-8', dtype=str))
+    return prepare_dataframe(df.drop_duplicates(subset=BASE_COLUMNS, ignore_index=True))
+
+
+def normalize_base_columns(df):
+    """원본 5개 컬럼 값의 앞뒤 공백을 없애고 빈 문자열은 결측으로 바꿉니다.
+
+    CSV 로드, 스트리밍 적재(drug_ingest), 델타 파일(drug_delta)이 모두 이 함수를 거쳐야
+    같은 원본에서 같은 행 집합이 나옵니다. (중복 판정도 정리된 값 기준)
+    """
+    for col in BASE_COLUMNS:
+        if col in df.columns:
+            df[col] = _map_distinct(df[col], _strip_values)
+    return df
+
+
+def _strip_values(values):
+    stripped = values.str.strip()
+    return stripped.mask(stripped == '')
+
+
+def prepare_dataframe(df):
+    """원본 5개 컬럼만 있는 데이터프레임에 검색용 컬럼과 위험도 컬럼을 추가합니다."""
+    df['상세정보'] = df['상세정보'].fillna('상호작용 정보 없음')
+
+    # 같은 이름/문구가 수없이 반복되므로 값 종류별로 한 번만 계산
+    # '_lower'는 검색어와 같은 normalize_name(NFKC/casefold/공백 통일)을 거친 비교용 이름
+    for col in NAME_COLUMNS:
+        df[col + '_lower'] = _map_distinct(df[col], lambda s: s.map(normalize_name))
+        df[col + '_clean'] = _map_distinct(
+            df[col], lambda s: s.astype(str).map(normalize_name).str.replace(CLEAN_RULE, '', regex=True))
+
+    # 제품명은 (기본 이름, 함량, 단위, 제형)으로 한 번만 나눠 둠 (drug_names)
+    for col in PRODUCT_COLUMNS:
+        codes, uniques = pd.factorize(df[col])
+        parsed = [parse_product_name(name) for name in uniques] + [EMPTY_NAME]
+        for field in PARSED_FIELDS:
+            values = np.array([getattr(p, field) for p in parsed], dtype=float if field == 'strength' else object)
+            df[f'{col}_{field}'] = pd.Series(values[codes], index=df.index,
+                                             dtype=float if field == 'strength' else str)
+
+    # [속도 향상] 상세정보별 위험 등급은 로드 시 한 번만 계산
+    df['위험도'] = _map_distinct(df['상세정보'], lambda s: s.map(classify_detail)).astype('int8')
+    return df
+
+
+def _map_distinct(series, func):
+    """series의 서로 다른 값(결측 포함)에만 func를 적용하고 행 단위로 펼칩니다."""
+    codes, uniques = pd.factorize(series)
+    table = func(pd.Series(list(uniques) + [None], dtype=series.dtype))
+    return pd.Series(table.to_numpy()[codes], index=series.index, dtype=table.dtype)
+
+
+def compute_pair_keys(df, name_vocab):
+    """각 행의 A쪽 이름(제품명/성분명) × B쪽 이름 조합을 순서 무관 64비트 키로 만듭니다."""
+    codes = {col: pd.Categorical(df[col], categories=name_vocab).codes.astype(np.int64)
+             for col in ('제품명A_lower', '성분명A_lower', '제품명B_lower', '성분명B_lower')}
+    keys = []
+    for side_a in ('제품명A_lower', '성분명A_lower'):
+        for side_b in ('제품명B_lower', '성분명B_lower'):
+            a, b = codes[side_a], codes[side_b]
+            valid = (a >= 0) & (b >= 0)
+            lo, hi = np.minimum(a[valid], b[valid]), np.maximum(a[valid], b[valid])
+            keys.append((lo.astype(np.uint64) << np.uint64(32)) | hi.astype(np.uint64))
+    return np.unique(np.concatenate(keys))
+
+
+def classify_detail(detail):
+    """상세정보 문구의 위험 등급을 반환합니다. (2=위험, 1=주의, 0=정보, -1=정보 없음)"""
+    detail_str = str(detail)
+    if detail_str == '상호작용 정보 없음':
+        return -1
+    if any(keyword in detail_str for keyword in DANGEROUS_KEYWORDS):
+        return 2
+    if any(keyword in detail_str for keyword in CAUTION_KEYWORDS):
+        return 1
+    return 0
+
+
+def summarize_product_details(details):
+    """확정된 두 제품 간 상호작용 행의 상세정보들(행 순서, 중복 없음)로 (위험도, 설명)을 만듭니다. (app.py 방식)"""
+    risk, msgs = "안전", []
+    for d in details:
+        d_str = str(d)
+        found = False
+        for k in DANGEROUS_KEYWORDS:
+            if k in d_str:
+                risk = "위험"; msgs.append(f"🚨 **위험**: {d_str}"); found = True; break
+        if not found:
+            for k in CAUTION_KEYWORDS:
+                if k in d_str:
+                    if risk != "위험": risk = "주의"
+                    msgs.append(f"⚠️ **주의**: {d_str}"); break
+
+    if not msgs:
+        risk = "정보 확인"
+        msgs.append(f"ℹ️ **정보**: {details[0]}")
+    return risk, "\n\n".join(msgs)
+
+
+def describe_sources(mask, source_names):
+    """출처 비트마스크를 '식약처 DUR, 병원 규칙' 같은 이름 목록으로 바꿉니다."""
+    mask = int(mask)
+    return ", ".join(name for bit, name in enumerate(source_names) if mask >> bit & 1)
+
+
+def summarize_interactions(rows, source_names=None, shared_ingredient=False):
+    """상호작용 행들로부터 (최고 위험도 라벨, 설명 문자열)을 만듭니다.
+
+    표시할 내용이 없으면 (None, "")을 반환합니다.
+    원본이 둘 이상(source_names)이고 행에 출처 컬럼이 있으면 각 설명 뒤에 출처를 붙입니다.
+    shared_ingredient=True면 검색한 약이 아니라 같은 성분이 든 다른 제품의 행이므로, 라벨에 성분을 앞세워 그렇게 표시합니다.
+    """
+    show_sources = bool(source_names) and len(source_names) > 1 and SOURCE_COLUMN in rows.columns
+    return summarize_records(rows.to_dict('records'), source_names if show_sources else None, shared_ingredient)
+
+
+def summarize_records(records, source_names=None, shared_ingredient=False):
+    """summarize_interactions의 행 단위 본체. records는 행 dict 목록이며, source_names를 주면 출처를 붙입니다.
+
+    성분 쌍 전체를 미리 계산할 때(drug_kvstore)처럼 묶음이 아주 많으면 묶음마다 데이터프레임을 만드는 비용이 커서,
+    dict 목록으로 바로 호출합니다.
+    """
+    highest_risk_level = -1
+    reasons = []
+    for row in records:
+        level = row['위험도'] if '위험도' in row else classify_detail(row['상세정보'])
+        if level < 0:
+            continue
+
+        prod_A = row['제품명A'] if pd.notna(row['제품명A']) else row['성분명A']
+        prod_B = row['제품명B'] if pd.notna(row['제품명B']) else row['성분명B']
+        if not pd.notna(prod_A): prod_A = "?"
+        if not pd.notna(prod_B): prod_B = "?"
+        label = f"({prod_A} / {prod_B})"
+        if shared_ingredient:
+            ing_A = row['성분명A'] if pd.notna(row['성분명A']) else prod_A
+            ing_B = row['성분명B'] if pd.notna(row['성분명B']) else prod_B
+            label = f"(같은 성분 {ing_A} / {ing_B}, {prod_A} / {prod_B}의 정보)"
+
+        detail_str = str(row['상세정보'])
+        if source_names:
+            sources = describe_sources(row[SOURCE_COLUMN], source_names)
+            if sources:
+                detail_str += f" _(출처: {sources})_"
+        if level == 2:
+            reasons.append(f"🚨 **위험 {label}**: {detail_str}")
+        elif level == 1:
+            reasons.append(f"⚠️ **주의 {label}**: {detail_str}")
+        else:
+            reasons.append(f"ℹ️ **정보 {label}**: {detail_str}")
+        highest_risk_level = max(highest_risk_level, level)
+
+    if highest_risk_level < 0:
+        return None, ""
+    return RISK_LABELS[highest_risk_level], "\n\n".join(reasons)
+
+
+# --------------------------------------------------------------------------------------------------
+# 2. 캐시
+# --------------------------------------------------------------------------------------------------
+class LRUCache:
+    """스레드 안전한 LRU 캐시입니다. (UI 스레드와 워밍 스레드가 함께 사용)"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# --------------------------------------------------------------------------------------------------
+# 3. 엔진
+# --------------------------------------------------------------------------------------------------
+class DrugEngine:
+    """데이터프레임과 검색 결과 캐시를 함께 들고 있는 검색 엔진입니다."""
+
+    def __init__(self, df, cache_size=4096, pair_store=None, indexes=None, source_names=None, alias_file=ALIAS_FILE):
+        # df는 load_dataframe / 스냅샷처럼 중복 행이 이미 제거된 데이터여야 함
+        self.df = df
+        self.pair_store = pair_store  # 미리 계산된 성분 쌍 키-값 파일 (drug_kvstore.PairStore)
+        self.version = None           # 스냅샷에서 불러온 경우 스냅샷 버전 이름
+        self.source_names = list(source_names or [])  # 출처 비트 순서대로의 원본 이름
+        self.alias_file = alias_file  # 상품명 ↔ 성분명 ↔ 영문 INN 별칭 파일 (drug_names.load_alias_groups)
+
+        prebuilt = {}
+        if indexes is not None:
+            # 스냅샷에서 불러온 인덱스는 다시 만들지 않음
+            self._load_indexes(indexes)
+            prebuilt = {name: indexes[key] for name, key in BUILD_TIME_INDEXES.items() if key in indexes}
+        else:
+            # 오타 보정용 전체 이름 리스트 (너무 짧은 단어 제외)
+            combined_names = pd.concat([df[col] for col in NAME_COLUMNS]).dropna().unique()
+            self.all_names = {str(name) for name in combined_names if len(str(name)) > 1}
+
+            # [속도 향상] 이름 ID와 상호작용 쌍 블룸 필터 (등록되지 않은 조합은 테이블 검색 없이 '안전')
+            self._build_pair_filter()
+        self.use_pair_filter = True
+
+        # 성분 ID 집합 / 별칭 표는 스냅샷에 없으면 여기서 바로 만듦 (이름 수에 비례, 데이터 행 수와는 무관)
+        self.index_build_seconds = {}
+        builders = {'ingredients': lambda: IngredientSets(df), 'aliases': self._build_alias_table}
+        for name in BUILD_TIME_INDEXES:
+            if name not in prebuilt:
+                start = time.perf_counter()
+                prebuilt[name] = builders[name]()
+                self.index_build_seconds[name] = time.perf_counter() - start
+
+        # [추가] 나머지 인덱스는 start_index_build()로 백그라운드에서 생성, 준비 전에는 기존 검색(scan)으로 응답
+        self.indexes = dict(prebuilt)
+        self.index_status = {name: 'ready' if name in prebuilt else 'pending' for name in INDEX_NAMES}
+        self._index_thread = None
+        self._background_threads = []     # start_background로 시작한 스레드 (close()가 멈추고 기다림)
+        self._closing = threading.Event()  # close()가 설정, 백그라운드 작업은 항목 사이마다 확인하고 멈춤
+        self.mode_counts = Counter()      # (기능, 처리 방식) 별 요청 수
+        self._mode_lock = threading.Lock()
+        self._served = threading.local()  # 이 스레드의 마지막 요청 처리 방식
+
+        self.caches = {
+            'info': LRUCache(cache_size),         # find_drug_info
+            'flexible': LRUCache(cache_size),     # check_drug_interaction_flexible
+            'search': LRUCache(cache_size),       # search_products
+            'ingredients': LRUCache(cache_size),  # get_ingredients
+            'interaction': LRUCache(cache_size),  # check_interaction
+            'ingredient_pair': LRUCache(cache_size),  # check_ingredient_pair (키-값 파일이 없을 때)
+            'report': LRUCache(cache_size),       # interaction_report / 끝까지 읽은 iter_interactions
+        }
+
+    @classmethod
+    def from_csv(cls, file_path=DATA_FILE, cache_size=4096, pair_path=None):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        pair_store = None
+        # CSV보다 오래된 키-값 파일은 이전 데이터 기준이므로 사용하지 않음
+        if pair_path and os.path.exists(pair_path) and os.path.getmtime(pair_path) >= os.path.getmtime(file_path):
+            from drug_kvstore import PairStore
+            pair_store = PairStore(pair_path)
+        engine = cls(load_dataframe(file_path), cache_size=cache_size, pair_store=pair_store)
+        print(f"✅ (engine) 데이터 로드 완료! (총 {len(engine.all_names)}개 약물명)")
+        return engine
+
+    def _build_pair_filter(self):
+        df = self.df
+        lower_cols = [col + '_lower' for col in NAME_COLUMNS]
+        self.name_vocab = pd.Series(pd.concat([df[col] for col in lower_cols]).dropna().unique())
+        self.name_ids = {name: i for i, name in enumerate(self.name_vocab)}
+        self.pair_keys = compute_pair_keys(df, self.name_vocab)
+        self.pair_filter = BloomFilter.from_keys(self.pair_keys, PAIR_FILTER_FP_RATE)
+
+    def export_indexes(self):
+        """스냅샷 저장용으로 미리 계산된 인덱스를 내보냅니다."""
+        bloom = self.pair_filter
+        return {
+            'all_names': sorted(self.all_names),
+            'name_vocab': self.name_vocab.tolist(),
+            'pair_keys': self.pair_keys,
+            'pair_filter': (bloom.num_bits, bloom.num_hashes, bloom.bits, bloom.count),
+            'ingredient_sets': self.indexes['ingredients'],
+            'alias_table': self.indexes['aliases'],
+        }
+
+    def _load_indexes(self, indexes):
+        self.all_names = set(indexes['all_names'])
+        self.name_vocab = pd.Series(indexes['name_vocab'], dtype=object)
+        self.name_ids = {name: i for i, name in enumerate(self.name_vocab)}
+        self.pair_keys = indexes['pair_keys']
+        num_bits, num_hashes, bits, count = indexes['pair_filter']
+        self.pair_filter = BloomFilter(num_bits, num_hashes, bits=bits, count=count)
+
+    # ---- 백그라운드 인덱스 ----
+    @property
+    def closed(self):
+        """close()가 호출되었으면 True. 백그라운드 작업은 이 값을 보고 멈춥니다."""
+        return self._closing.is_set()
+
+    def start_background(self, target, name, *args):
+        """엔진에 딸린 백그라운드 작업(인덱스 생성, 캐시 워밍)을 데몬 스레드로 시작합니다.
+
+        target은 engine.closed를 주기적으로 확인해야 하며, close()가 멈추기를 기다립니다.
+        """
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        self._background_threads.append(thread)
+        thread.start()
+        return thread
+
+    def start_index_build(self):
+        """인덱스 생성을 백그라운드 스레드에서 시작합니다. 그동안은 기존 검색으로 응답합니다."""
+        if self._index_thread is None:
+            self._index_thread = self.start_background(self.build_indexes, 'drug-index-build')
+        return self._index_thread
+
+    def wait_for_indexes(self, timeout=None):
+        if self._index_thread is not None:
+            self._index_thread.join(timeout)
+        return all(name in self.indexes for name in INDEX_NAMES)
+
+    def build_indexes(self):
+        """인덱스를 하나씩 만들고, 완성되는 즉시 등록하여 해당 기능이 바로 사용하게 합니다."""
+        builders = {
+            'ngram': self._build_ngram_index,
+            'postings': lambda: RowPostings(self.df, PRODUCT_COLUMNS + SIDE_A + SIDE_B
+                                            + tuple(col + '_base' for col in PRODUCT_COLUMNS)),
+            'adjacency': lambda: build_adjacency(self.pair_keys, len(self.name_vocab)),
+            'fuzzy': lambda: FuzzyIndex(self.all_names),
+        }
+        for name in INDEX_NAMES:
+            if self.closed:
+                print("DEBUG: 엔진이 닫혀 인덱스 생성을 중단합니다.")
+                return
+            if name in self.indexes:
+                continue
+            self.index_status[name] = 'building'
+            start = time.perf_counter()
+            try:
+                self.indexes[name] = builders[name]()
+                self.index_status[name] = 'ready'
+            except Exception as e:
+                self.index_status[name] = 'failed'
+                print(f"❌ (engine) '{name}' 인덱스 생성 실패, 기존 검색으로 계속 응답: {e}")
+            self.index_build_seconds[name] = time.perf_counter() - start
+        print("✅ (engine) 인덱스 생성 완료: " + ", ".join(
+            f"{name} {self.index_build_seconds.get(name, 0):.2f}초" for name in INDEX_NAMES if name in self.indexes))
+
+    def _build_ngram_index(self):
+        clean_map = build_clean_product_map(self.df)
+        clean_names = sorted(clean_map)
+        return {
+            'names': NgramIndex(self.name_vocab.tolist()),  # 소문자 제품명/성분명 (name_vocab 순서 = 이름 ID)
+            'clean': NgramIndex(clean_names),               # 검색용 '_clean' 제품명
+            'clean_names': clean_names,
+            'clean_map': clean_map,
+        }
+
+    def _build_alias_table(self):
+        return AliasTable(load_alias_groups(self.alias_file), self.name_ids)
+
+    def _ready(self, *names):
+        indexes = self.indexes
+        return all(name in indexes for name in names)
+
+    def _serve(self, op, mode):
+        with self._mode_lock:
+            self.mode_counts[(op, mode)] += 1
+        setattr(self._served, op, mode)
+
+    def served_by(self, op):
+        """이 스레드에서 마지막으로 처리한 op 요청의 방식('index' / 'scan' / 'cache' / 'filter' / 'alias' ...)"""
+        return getattr(self._served, op, None)
+
+    def index_report(self):
+        return {name: self.index_status[name] for name in INDEX_NAMES}
+
+    def _expand_name_ids(self, literals):
+        """literals 중 하나를 부분 문자열로 포함하는 소문자 이름의 ID 배열"""
+        if self._ready('ngram'):
+            return self.indexes['ngram']['names'].find_any(literals)
+        pattern = "|".join(re.escape(item) for item in literals if item)
+        if not pattern:
+            return np.array([], dtype=np.int64)
+        return np.flatnonzero(self.name_vocab.str.contains(pattern, na=False, case=False).to_numpy())
+
+    def _maybe_pair(self, name_a, name_b):
+        """두 이름(소문자)이 같은 상호작용 행에 나타날 가능성이 있으면 True. False면 확실히 없음."""
+        id_a, id_b = self.name_ids.get(name_a), self.name_ids.get(name_b)
+        if id_a is None or id_b is None:
+            return False
+        return pair_id(id_a, id_b) in self.pair_filter
+
+    def _ingredient_set_rows(self, drug_A_query, drug_B_query):
+        """두 이름이 모두 성분 단위로 확정되고, 둘 중 하나가 복합제이거나 염/에스터 표기만 다른 이름
+        (데이터에 그대로는 없고 기본 성분 키로만 찾은 이름)이면 성분 ID 집합의 교집합으로 찾은 행 번호.
+
+        해당하지 않으면 None (기존 검색으로 처리).
+        """
+        sets = self.indexes['ingredients']
+        ids_A, literal_A = self._query_ingredient_ids(sets, drug_A_query)
+        ids_B, literal_B = self._query_ingredient_ids(sets, drug_B_query)
+        if ids_A is None or ids_B is None:
+            return None
+        if len(ids_A) < 2 and len(ids_B) < 2 and literal_A and literal_B:
+            return None
+        return sets.rows_between(ids_A, ids_B)
+
+    def _query_ingredient_ids(self, sets, query):
+        """(성분 ID 집합 또는 None, 데이터에 있는 표기(또는 그 별칭)인지 여부)"""
+        name = normalize_name(str(query))
+        ids = sets.resolve(name)
+        if ids is not None:
+            return ids, sets.is_literal(name)
+        # 데이터에 없는 별칭이면 별칭이 가리키는 이름들의 성분 ID를 합침
+        found = [sets.resolve(alias) for alias in self._alias_names(query) or ()]
+        return frozenset().union(*(f for f in found if f)) or None, True
+
+    def _alias_names(self, query):
+        """데이터에 없는 별칭(상품명/영문 INN 등)이면 같은 약의 데이터상 이름(정규화) 목록, 아니면 None"""
+        if not query:
+            return None
+        name = normalize_name(str(query))
+        ids = self.indexes['aliases'].resolve(name)
+        if ids is None and name not in self.name_ids:
+            ids = self.indexes['aliases'].resolve(moiety_key(name))   # 'amlodipine besylate' → 'amlodipine'
+        return None if ids is None else self.name_vocab.iloc[list(ids)].tolist()
+
+    def _definitely_no_interaction(self, set_A, set_B):
+        """두 검색어 집합에 걸리는 모든 이름 쌍이 상호작용 행에 없으면 True (테이블 검색 불필요)."""
+        ids_A = self._expand_name_ids(set_A)
+        ids_B = self._expand_name_ids(set_B)
+        if self._ready('adjacency'):
+            # 인접 목록이 있으면 오탐 없이 정확하게 판정
+            adjacency = self.indexes['adjacency']
+            targets = set(ids_B.tolist())
+            return not any(adjacency[a] & targets for a in ids_A.tolist())
+        if len(ids_A) * len(ids_B) > PAIR_FILTER_MAX_PROBES:
+            return False
+        bloom = self.pair_filter
+        return not any(pair_id(a, b) in bloom for a in ids_A.tolist() for b in ids_B.tolist())
+
+    def _cached(self, cache_name, key, func, *args):
+        cache = self.caches[cache_name]
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = func(*args)
+            if not self._closing.is_set():   # 닫힌(교체된) 엔진의 캐시는 다시 채우지 않음
+                cache.put(key, result)
+        else:
+            self._serve(cache_name, 'cache')
+        return result
+
+    def is_cached(self, cache_name, key):
+        return key in self.caches[cache_name]
+
+    def cache_stats(self):
+        """캐시별 항목 수와 적중/미스 횟수를 반환합니다."""
+        return {name: {'size': len(c), 'hits': c.hits, 'misses': c.misses} for name, c in self.caches.items()}
+
+    def clear_caches(self):
+        for cache in self.caches.values():
+            cache.clear()
+
+    def close(self, timeout=CLOSE_JOIN_TIMEOUT):
+        """백그라운드 작업을 멈추고 키-값 파일(mmap과 파일 핸들)을 닫습니다. 다시 로드로 교체된 엔진에 호출합니다.
+
+        인덱스 생성/캐시 워밍은 지금 하던 항목만 마치고 멈춥니다. timeout 안에 끝나지 않은 스레드는
+        기다리지 않고 버려 둡니다 (데몬 스레드이며, 다음 항목 전에 멈춤).
+        닫은 뒤에도 처리 중이던 요청은 데이터프레임으로 같은 답을 계산합니다. (캐시에는 넣지 않음)
+        """
+        self._closing.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._background_threads:
+            if thread is not threading.current_thread():
+                thread.join(max(deadline - time.monotonic(), 0))
+        self._background_threads = [thread for thread in self._background_threads if thread.is_alive()]
+        store, self.pair_store = self.pair_store, None
+        if store is not None:
+            store.close()
+
+    # ---- 제품 검색 / 성분 / 제품 간 상호작용 (app.py) ----
+    def search_products(self, query):
+        """약물 이름으로 '제품명' 리스트를 검색합니다."""
+        return list(self._cached('search', query, self._search_products, query))
+
+    def resolve_names(self, queries):
+        """입력 이름 여러 개를 한 번에 해석합니다. 이름마다 (제품명 후보 목록, 후보가 없을 때의 오타 보정 제안 또는 None)
+
+        같은 이름은 한 번만 검색하고, 오타 보정은 후보가 없는 이름에만 실행합니다.
+        """
+        results = {}
+        for query in dict.fromkeys(queries):
+            candidates = self.search_products(query)
+            results[query] = (candidates, None if candidates else self.get_fuzzy_match(query))
+        return [results[query] for query in queries]
+
+    def _search_products(self, query):
+        df = self.df
+        aliases = self._alias_names(query)
+        if aliases:
+            return self._products_by_alias(aliases)
+
+        # 함량이 들어간 검색어('타이레놀 500mg')는 구조화 컬럼으로 바로 찾음
+        # (제형만 있는 '레일라정'은 '레일라서방정'도 찾도록 기존 부분 문자열 검색으로)
+        parsed = parse_product_name(query)
+        if parsed.base and parsed.unit:
+            products = self._products_by_parsed_name(parsed)
+            if products:
+                return products
+
+        clean_q = re.sub(CLEAN_RULE, '', normalize_name(query))
+        if len(clean_q) < 2:
+            return ()
+
+        if self._ready('ngram'):
+            ngram = self.indexes['ngram']
+            products = set()
+            for i in ngram['clean'].find(clean_q).tolist():
+                products.update(ngram['clean_map'][ngram['clean_names'][i]])
+            self._serve('search', 'index')
+            return tuple(sorted(products))
+
+        self._serve('search', 'scan')
+        try:
+            pattern = re.escape(clean_q)
+            res_a = df.loc[df['제품명A_clean'].str.contains(pattern, na=False), '제품명A']
+            res_b = df.loc[df['제품명B_clean'].str.contains(pattern, na=False), '제품명B']
+            return tuple(sorted(set(res_a).union(set(res_b))))
+        except Exception as e:
+            print(f"DEBUG: search_products에서 오류 발생 - {e}")
+            return ()
+
+    def _products_by_parsed_name(self, parsed):
+        """기본 이름이 같고, 검색어에 함량/단위/제형이 있으면 그것까지 같은 제품명들"""
+        df = self.df
+        products = set()
+        for col in PRODUCT_COLUMNS:
+            if self._ready('postings'):
+                rows = df.iloc[self.indexes['postings'].rows(col + '_base', [parsed.base])]
+            else:
+                rows = df[df[col + '_base'] == parsed.base]
+            if parsed.unit:
+                rows = rows[(rows[col + '_strength'] == parsed.strength) & (rows[col + '_unit'] == parsed.unit)]
+            if parsed.form:
+                rows = rows[rows[col + '_form'] == parsed.form]
+            products.update(rows[col].dropna())
+        self._serve('search', 'parsed')
+        return tuple(sorted(products))
+
+    def _products_by_alias(self, names):
+        """별칭이 가리키는 이름이 제품명이거나 같은 쪽 성분명인 제품명들"""
+        df = self.df
+        products = set()
+        for product_col, side in zip(PRODUCT_COLUMNS, (SIDE_A, SIDE_B)):
+            if self._ready('postings'):
+                rows = self.indexes['postings'].side_rows(side, names)
+            else:
+                rows = np.flatnonzero(df[list(side)].isin(names).any(axis=1).to_numpy())
+            products.update(df[product_col].iloc[rows].dropna())
+        self._serve('search', 'alias')
+        return tuple(sorted(products))
+
+    def get_ingredients(self, exact_product_name):
+        """확정된 제품명의 성분을 가져옵니다."""
+        return set(self._cached('ingredients', exact_product_name, self._get_ingredients, exact_product_name))
+
+    def _get_ingredients(self, exact_product_name):
+        df = self.df
+        if self._ready('postings'):
+            postings = self.indexes['postings']
+            ingredients = set(df['성분명A'].iloc[postings.rows('제품명A', [exact_product_name])])
+            ingredients.update(df['성분명B'].iloc[postings.rows('제품명B', [exact_product_name])])
+            self._serve('ingredients', 'index')
+            return frozenset(x for x in ingredients if pd.notna(x) and x != 'nan')
+
+        self._serve('ingredients', 'scan')
+        try:
+            ingredients = set(df.loc[df['제품명A'] == exact_product_name, '성분명A'])
+            ingredients.update(df.loc[df['제품명B'] == exact_product_name, '성분명B'])
+            return frozenset(x for x in ingredients if pd.notna(x) and x != 'nan')
+        except Exception as e:
+            print(f"DEBUG: get_ingredients에서 오류 발생 - {e}")
+            return frozenset()
+
+    def check_interaction(self, prod_A, prod_B):
+        """확정된 두 제품 간의 상호작용을 확인합니다."""
+        return self._cached('interaction', (prod_A, prod_B), self._check_interaction, prod_A, prod_B)
+
+    def _check_interaction(self, prod_A, prod_B):
+        df = self.df
+        if self.use_pair_filter and not self._maybe_pair(normalize_name(str(prod_A)), normalize_name(str(prod_B))):
+            self._serve('interaction', 'filter')
+            return "안전", f"'{prod_A}'와 '{prod_B}' 간의 보고된 상호작용 정보가 없습니다."
+        try:
+            if self._ready('postings'):
+                postings = self.indexes['postings']
+                rows = np.union1d(
+                    np.intersect1d(postings.rows('제품명A', [prod_A]), postings.rows('제품명B', [prod_B])),
+                    np.intersect1d(postings.rows('제품명A', [prod_B]), postings.rows('제품명B', [prod_A])))
+                interactions = df.iloc[rows]
+                self._serve('interaction', 'index')
+            else:
+                mask = ((df['제품명A'] == prod_A) & (df['제품명B'] == prod_B)) | \
+                       ((df['제품명A'] == prod_B) & (df['제품명B'] == prod_A))
+                interactions = df[mask]
+                self._serve('interaction', 'scan')
+
+            if interactions.empty:
+                return "안전", f"'{prod_A}'와 '{prod_B}' 간의 보고된 상호작용 정보가 없습니다."
+            return summarize_product_details(interactions['상세정보'].unique())
+        except Exception as e:
+            print(f"DEBUG: check_interaction에서 오류 발생 - {e}")
+            return "오류", "분석 중 오류 발생"
+
+    # ---- 처방 단위 일괄 확인 ----
+    def check_prescriptions(self, prescriptions, mode='product'):
+        """여러 처방(약물 이름 목록)의 모든 약물 쌍을 한 번에 확인합니다.
+
+        mode: 'product'(확정된 제품명, check_interaction과 같은 답) / 'text'(자유 입력) / 'ingredient'(성분명)
+        처방 전체에서 같은 쌍은 한 번만 계산합니다. 'product'는 쌍 수와 관계없이 데이터를 한 번만 걸러 답합니다.
+        처방별로 [(a, b, 위험도, 설명), ...] 목록을 반환합니다. (처방 안의 중복 이름은 한 번만 사용)
+        """
+        if mode not in PRESCRIPTION_MODES:
+            raise ValueError(f"mode는 {', '.join(PRESCRIPTION_MODES)} 중 하나여야 합니다.")
+        drug_lists = [list(dict.fromkeys(d for d in drugs if d)) for drugs in prescriptions]
+        ordered_pairs = [[(a, b) for i, a in enumerate(drugs) for b in drugs[i + 1:]] for drugs in drug_lists]
+
+        if mode == 'product':
+            answers = self._product_pair_answers({tuple(sorted(p)) for pairs in ordered_pairs for p in pairs})
+            results = []
+            for pairs in ordered_pairs:
+                rows = []
+                for a, b in pairs:
+                    answer = answers[tuple(sorted((a, b)))]
+                    rows.append((a, b) + (answer or ("안전", f"'{a}'와 '{b}' 간의 보고된 상호작용 정보가 없습니다.")))
+                results.append(rows)
+            self._serve('prescriptions', 'batch')
+            return results
+
+        # 자유 입력/성분명: 서로 다른 쌍만 계산 (이름 해석은 엔진 캐시에서 한 번만)
+        check = self.check_drug_interaction_flexible if mode == 'text' else self.check_ingredient_pair
+        answers = {}
+        for pairs in ordered_pairs:
+            for pair in pairs:
+                if pair not in answers:
+                    answers[pair] = check(*pair)
+        self._serve('prescriptions', 'pairs')
+        return [[pair + tuple(answers[pair]) for pair in pairs] for pairs in ordered_pairs]
+
+    def _product_pair_answers(self, pairs):
+        """(제품명, 제품명) 정렬 쌍 → (위험도, 설명) 또는 None(상호작용 없음). 한 번의 필터로 모든 쌍을 답합니다."""
+        details, _ = self._product_pair_details(pairs)
+        return {pair: summarize_product_details(list(details[pair])) if pair in details else None
+                for pair in pairs}
+
+    def _product_pair_details(self, pairs):
+        """정렬 쌍 → 상세정보(행 순서, 중복 없음)와, 정렬 쌍 → 행들의 미리 계산된 최고 위험도('위험도' 컬럼)"""
+        df = self.df
+        names = sorted({name for pair in pairs for name in pair})
+        if self._ready('postings'):
+            postings = self.indexes['postings']
+            rows = np.intersect1d(postings.rows('제품명A', names), postings.rows('제품명B', names))
+        else:
+            rows = np.flatnonzero((df['제품명A'].isin(names) & df['제품명B'].isin(names)).to_numpy())
+
+        # 행 순서를 유지한 채 쌍별로 상세정보 모으기 (check_interaction의 unique()와 같은 순서)
+        details, levels = defaultdict(dict), {}
+        sub = df.iloc[rows]
+        sub_levels = sub['위험도'] if '위험도' in sub.columns else sub['상세정보'].map(classify_detail)
+        for a, b, detail, level in zip(sub['제품명A'], sub['제품명B'], sub['상세정보'], sub_levels):
+            pair = (a, b) if a <= b else (b, a)
+            if pair in pairs:
+                details[pair][detail] = None
+                levels[pair] = max(levels.get(pair, -1), int(level))
+        return details, levels
+
+    def iter_interactions(self, drugs, mode='product', progress=None):
+        """약물 목록의 모든 쌍 중 '안전'이 아닌 쌍을 위험한 것부터 (a, b, 위험도, 설명)으로 하나씩 내보냅니다.
+
+        'product'는 한 번의 필터 후 행마다 미리 계산된 위험도 순으로 바로 내보냅니다.
+        'text'/'ingredient'는 쌍마다 계산하며 '위험'은 찾는 즉시, 나머지는 모든 쌍을 본 뒤 위험도 순으로 내보냅니다.
+        (같은 위험도 안에서는 입력 순서) progress(확인한 쌍 수, 전체 쌍 수)가 있으면 진행 중에 호출합니다.
+        """
+        if mode not in PRESCRIPTION_MODES:
+            raise ValueError(f"mode는 {', '.join(PRESCRIPTION_MODES)} 중 하나여야 합니다.")
+        drugs = list(dict.fromkeys(d for d in drugs if d))
+        rows = []
+        for row in self._iter_interactions(drugs, mode, progress):
+            rows.append(row)
+            yield row
+        # 끝까지 읽은 결과는 보고서 캐시에 저장 (화면을 다시 그릴 때 interaction_report가 그대로 사용)
+        self.caches['report'].put((tuple(drugs), mode), tuple(rows))
+
+    def interaction_report(self, drugs, mode='product'):
+        """iter_interactions의 전체 결과(위험한 것부터)를 tuple로 반환합니다. 엔진 캐시에 보관되어 세션끼리 공유합니다."""
+        drugs = tuple(dict.fromkeys(d for d in drugs if d))
+        return self._cached('report', (drugs, mode), lambda: tuple(self.iter_interactions(drugs, mode)))
+
+    def _iter_interactions(self, drugs, mode, progress):
+        pairs = [(a, b) for i, a in enumerate(drugs) for b in drugs[i + 1:]]
+        total = len(pairs)
+
+        if mode == 'product':
+            details, levels = self._product_pair_details({tuple(sorted(p)) for p in pairs})
+            ranked = sorted((p for p in pairs if tuple(sorted(p)) in details),
+                            key=lambda p: -levels[tuple(sorted(p))])
+            self._serve('prescriptions', 'stream')
+            done = total - len(ranked)   # 상호작용 행이 없는 쌍은 필터에서 이미 확인됨
+            for a, b in ranked:
+                yield (a, b) + summarize_product_details(list(details[tuple(sorted((a, b)))]))
+                done += 1
+                if progress:
+                    progress(done, total)
+            if progress and not ranked:
+                progress(total, total)
+            return
+
+        check = self.check_drug_interaction_flexible if mode == 'text' else self.check_ingredient_pair
+        held = []
+        for done, (a, b) in enumerate(pairs, 1):
+            risk, explanation = check(a, b)
+            if risk == "위험":
+                yield a, b, risk, explanation
+            elif risk != "안전":
+                held.append((a, b, risk, explanation))
+            if progress:
+                progress(done, total)
+        self._serve('prescriptions', 'stream')
+        yield from sorted(held, key=lambda row: -RISK_RANKS.get(row[2], -1))
+
+    def get_fuzzy_match(self, query, score_cutoff=65):
+        """사용자 입력과 가장 유사한 약물명을 찾습니다."""
+        if not query or not self.all_names:
+            return None
+        aliases = self._alias_names(query)
+        if aliases:
+            self._serve('fuzzy', 'alias')
+            return aliases[0]
+        try:
+            if self._ready('fuzzy'):
+                choices = self.indexes['fuzzy'].candidates(query)
+                self._serve('fuzzy', 'index')
+            else:
+                choices = self.all_names
+                self._serve('fuzzy', 'scan')
+            if not choices:
+                return None
+            best_match = process.extractOne(normalize_name(query), choices, scorer=fuzz.partial_ratio)
+            if best_match and best_match[1] >= score_cutoff:
+                return best_match[0]
+        except Exception as e:
+            print(f"DEBUG: Fuzzy matching error - {e}")
+        return None
+
+    def check_ingredient_pair(self, ing_A, ing_B):
+        """확정된 두 성분 간의 상호작용을 반환합니다.
+
+        키-값 파일이 있으면 데이터프레임을 건드리지 않고 한 번의 조회로 끝납니다.
+        """
+        name_A, name_B = self._single_alias(ing_A), self._single_alias(ing_B)
+        store, answer = self.pair_store, _MISSING
+        if store is not None:
+            try:
+                answer = store.get(name_A, name_B)
+            except ValueError:   # 조회 중에 close()됨 (다시 로드로 교체된 엔진)
+                pass
+        if answer is _MISSING:
+            answer = self._cached('ingredient_pair', tuple(sorted((name_A, name_B))), self._ingredient_pair_from_df,
+                                  name_A, name_B)
+        if answer is None:
+            return "안전", f"'{ing_A}'와 '{ing_B}' 간의 상호작용 정보가 없습니다."
+        return answer
+
+    def _single_alias(self, name):
+        """별칭이 데이터상 이름 하나만 가리키면 그 이름, 아니면 그대로"""
+        aliases = self._alias_names(name)
+        return aliases[0] if aliases and len(aliases) == 1 else name
+
+    def _ingredient_pair_from_df(self, ing_A, ing_B):
+        df = self.df
+        a, b = normalize_name(str(ing_A)), normalize_name(str(ing_B))
+        side_a = df['성분명A_lower'].fillna(df['제품명A_lower']).str.strip()
+        side_b = df['성분명B_lower'].fillna(df['제품명B_lower']).str.strip()
+        rows = df[((side_a == a) & (side_b == b)) | ((side_a == b) & (side_b == a))]
+        risk_label, explanation = summarize_interactions(rows, self.source_names)
+        return None if risk_label is None else (risk_label, explanation)
+
+    # ---- 자유 입력 상호작용 검색 (drug_functions_251118.py) ----
+    def find_drug_info(self, query):
+        """(상호작용 검색용) 쿼리한 약물 '자체'의 제품명/성분명만 검색합니다."""
+        result = self._cached('info', query, self._find_drug_info, query)
+        return set(result) if result is not None else None
+
+    def _find_drug_info(self, query):
+        df = self.df
+        # 데이터에 없는 별칭이면 별칭이 가리키는 이름들도 함께 검색 (검색어 자체가 부분 문자열로 걸리는 행도 유지)
+        names = [query] + (self._alias_names(query) or [])
+        search_patterns = {p for name in names for p in (clean_query(name), normalize_name(str(name)))}
+        search_patterns.discard('')
+
+        valid_patterns = [re.escape(item) for item in search_patterns if item]
+        if not valid_patterns:
+            return None
+        search_pattern_re = "|".join(valid_patterns)
+
+        if self._ready('ngram', 'postings'):
+            # 패턴에 걸리는 이름 → 그 이름이 있는 행 → 같은 쪽(A/B)의 제품명/성분명
+            names = self.name_vocab.iloc[self._expand_name_ids(search_patterns)].tolist()
+            postings = self.indexes['postings']
+            drugs_set = set()
+            for side in (SIDE_A, SIDE_B):
+                rows = postings.side_rows(side, names)
+                for col in side:
+                    drugs_set.update(df[col].iloc[rows].dropna())
+            self._serve('info', 'index')
+            final_set = frozenset(item for item in drugs_set if item and str(item) != 'nan')
+            return final_set or None
+
+        self._serve('info', 'scan')
+        drugs_set = set()
+        try:
+            mask_A = df['제품명A_lower'].str.contains(search_pattern_re, na=False) | df['성분명A_lower'].str.contains(search_pattern_re, na=False)
+            results_A = df[mask_A]
+            if not results_A.empty:
+                drugs_set.update(results_A['제품명A_lower'].dropna())
+                drugs_set.update(results_A['성분명A_lower'].dropna())
+
+            mask_B = df['제품명B_lower'].str.contains(search_pattern_re, na=False) | df['성분명B_lower'].str.contains(search_pattern_re, na=False)
+            results_B = df[mask_B]
+            if not results_B.empty:
+                drugs_set.update(results_B['제품명B_lower'].dropna())
+                drugs_set.update(results_B['성분명B_lower'].dropna())
+        except re.error as e:
+            print(f"DEBUG: RegEx error in find_drug_info - {e} (Pattern: {search_pattern_re})")
+            return None
+
+        final_set = frozenset(item for item in drugs_set if item and pd.notna(item) and str(item) != 'nan')
+        return final_set or None
+
+    def check_drug_interaction_flexible(self, drug_A_query, drug_B_query):
+        """[V8] 자유 입력 두 약물 간의 상호작용 위험도와 설명을 반환합니다."""
+        return self._cached('flexible', (drug_A_query, drug_B_query),
+                            self._check_drug_interaction_flexible, drug_A_query, drug_B_query)
+
+    def _check_drug_interaction_flexible(self, drug_A_query, drug_B_query):
+        df = self.df
+        # 복합제 / 염 표기만 다른 성분명은 정규식 대신 성분 ID 집합의 교집합으로 확인
+        # 교집합이 비면 (SALT_WORDS에 없는 염 표기 등으로 기본 성분 키가 어긋났을 수 있으므로) 부분 문자열 검색으로 다시 확인
+        rows = self._ingredient_set_rows(drug_A_query, drug_B_query)
+        if rows is not None and len(rows):
+            self._serve('flexible', 'ingredients')
+            return self._summarize_flexible(df.iloc[rows], drug_A_query, drug_B_query, by_ingredient=True)
+
+        set_A = self.find_drug_info(drug_A_query)
+        set_B = self.find_drug_info(drug_B_query)
+
+        if set_A is None:
+            return "정보 없음", f"'{drug_A_query}'에 대한 약물 정보를 DB에서 찾을 수 없습니다."
+        if set_B is None:
+            return "정보 없음", f"'{drug_B_query}'에 대한 약물 정보를 DB에서 찾을 수 없습니다."
+
+        pattern_A = "|".join(re.escape(item) for item in set_A if item)
+        pattern_B = "|".join(re.escape(item) for item in set_B if item)
+        if not pattern_A or not pattern_B:
+            return "정보 없음", f"'{drug_A_query}' 또는 '{drug_B_query}'의 유효한 검색어를 생성하지 못했습니다."
+
+        if self.use_pair_filter and self._definitely_no_interaction(set_A, set_B):
+            self._serve('flexible', 'filter')
+            return "안전", f"'{drug_A_query}'와 '{drug_B_query}' 간의 상호작용 정보가 없습니다."
+
+        if self._ready('ngram', 'postings'):
+            postings = self.indexes['postings']
+            names_A = self.name_vocab.iloc[self._expand_name_ids(set_A)].tolist()
+            names_B = self.name_vocab.iloc[self._expand_name_ids(set_B)].tolist()
+            rows = np.union1d(
+                np.intersect1d(postings.side_rows(SIDE_A, names_A), postings.side_rows(SIDE_B, names_B)),
+                np.intersect1d(postings.side_rows(SIDE_A, names_B), postings.side_rows(SIDE_B, names_A)))
+            self._serve('flexible', 'index')
+            return self._summarize_flexible(df.iloc[rows], drug_A_query, drug_B_query)
+
+        self._serve('flexible', 'scan')
+        try:
+            cols_A = (df['제품명A_lower'].str.contains(pattern_A, na=False, case=False) | df['성분명A_lower'].str.contains(pattern_A, na=False, case=False))
+            cols_B = (df['제품명B_lower'].str.contains(pattern_B, na=False, case=False) | df['성분명B_lower'].str.contains(pattern_B, na=False, case=False))
+            cols_C = (df['제품명A_lower'].str.contains(pattern_B, na=False, case=False) | df['성분명A_lower'].str.contains(pattern_B, na=False, case=False))
+            cols_D = (df['제품명B_lower'].str.contains(pattern_A, na=False, case=False) | df['성분명B_lower'].str.contains(pattern_A, na=False, case=False))
+        except re.error as e:
+            print(f"DEBUG: RegEx error in check_interaction - {e}")
+            return "정보 없음", f"검색어 처리 중 오류 발생: {e}"
+
+        return self._summarize_flexible(df[(cols_A & cols_B) | (cols_C & cols_D)], drug_A_query, drug_B_query)
+
+    def _summarize_flexible(self, interactions, drug_A_query, drug_B_query, by_ingredient=False):
+        """by_ingredient: 성분 ID 집합으로 찾은 행 (검색한 이름이 들어 있는 행이 없으면 같은 성분 행으로 표시)"""
+        if interactions.empty:
+            return "안전", f"'{drug_A_query}'와 '{drug_B_query}' 간의 상호작용 정보가 없습니다."
+
+        # 쿼리 자체에 대한 Specific 필터링
+        pattern_A_specific = "|".join(re.escape(clean_query(name)) for name in [drug_A_query] + (self._alias_names(drug_A_query) or []))
+        pattern_B_specific = "|".join(re.escape(clean_query(name)) for name in [drug_B_query] + (self._alias_names(drug_B_query) or []))
+
+        mask_A_specific = (interactions['제품명A_lower'].str.contains(pattern_A_specific, na=False) | interactions['성분명A_lower'].str.contains(pattern_A_specific, na=False)
+                           | interactions['제품명B_lower'].str.contains(pattern_A_specific, na=False) | interactions['성분명B_lower'].str.contains(pattern_A_specific, na=False))
+        mask_B_specific = (interactions['제품명B_lower'].str.contains(pattern_B_specific, na=False) | interactions['성분명B_lower'].str.contains(pattern_B_specific, na=False)
+                           | interactions['제품명A_lower'].str.contains(pattern_B_specific, na=False) | interactions['성분명A_lower'].str.contains(pattern_B_specific, na=False))
+
+        specific_interactions = interactions[mask_A_specific & mask_B_specific]
+        shared = specific_interactions.empty
+        interactions_to_display = interactions if shared else specific_interactions
+
+        risk_label, explanation = summarize_interactions(interactions_to_display, self.source_names,
+                                                         shared_ingredient=shared and by_ingredient)
+        if risk_label is None:
+            return "안전", f"'{drug_A_query}'와 '{drug_B_query}' 간의 상호작용 정보가 없습니다."
+        return risk_label, explanation
@@ -0,0 +1,214 @@
+# drug_index.py
+# 엔진이 백그라운드에서 만드는 검색 인덱스들입니다.
+# 인덱스가 준비되기 전에는 엔진이 기존 str.contains 검색으로 응답하고,
+# 준비되는 대로 기능별로 인덱스 검색으로 넘어갑니다.
+
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from drug_names import moiety_key, normalize_name
+
+NGRAM_SIZE = 2
+FUZZY_CANDIDATES = 300  # 오타 보정 시 유사도를 직접 계산할 최대 후보 수
+INGREDIENT_SEPARATOR_RE = re.compile(r'\s*[/,+]\s*')  # 복합제 성분명 구분자
+
+_EMPTY = np.array([], dtype=np.int64)
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex:
+    """이름 목록에 대한 n-gram 역색인 (부분 문자열 검색의 후보를 줄임)"""
+
+    def __init__(self, names, n=NGRAM_SIZE):
+        self.names = [name if isinstance(name, str) else '' for name in names]
+        self.n = n
+        postings = defaultdict(list)
+        for i, name in enumerate(self.names):
+            for gram in ngrams(name, n):
+                postings[gram].append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+    def find(self, literal):
+        """literal을 부분 문자열로 포함하는 이름 ID 배열을 반환합니다."""
+        names = self.names
+        if len(literal) < self.n:
+            return np.array([i for i, name in enumerate(names) if literal in name], dtype=np.int64)
+
+        grams = sorted(ngrams(literal, self.n), key=lambda g: len(self.postings.get(g, _EMPTY)))
+        candidates = self.postings.get(grams[0], _EMPTY)
+        for gram in grams[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, self.postings.get(gram, _EMPTY), assume_unique=True)
+        return np.array([i for i in candidates.tolist() if literal in names[i]], dtype=np.int64)
+
+    def find_any(self, literals):
+        """literals 중 하나라도 포함하는 이름 ID 배열 (정규식 'a|b|c'와 같은 결과)"""
+        found = [self.find(literal) for literal in literals if literal]
+        return np.unique(np.concatenate(found)) if found else _EMPTY
+
+
+class RowPostings:
+    """컬럼 값 → 그 값을 가진 행 번호 배열"""
+
+    def __init__(self, df, columns):
+        self.columns = {col: df.groupby(col, sort=False, dropna=True).indices for col in columns}
+
+    def rows(self, column, values):
+        postings = self.columns[column]
+        found = [postings[v] for v in values if v in postings]
+        return np.unique(np.concatenate(found)) if found else _EMPTY
+
+    def side_rows(self, side_columns, values):
+        found = [self.rows(col, values) for col in side_columns]
+        return np.unique(np.concatenate(found))
+
+
+def build_adjacency(pair_keys, size):
+    """상호작용 쌍 키(uint64, lo<<32|hi)로부터 이름 ID → 상대 이름 ID 집합을 만듭니다."""
+    lo = (pair_keys >> np.uint64(32)).astype(np.int64)
+    hi = (pair_keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+    src = np.concatenate([lo, hi])
+    dst = np.concatenate([hi, lo])
+    order = np.argsort(src, kind='stable')
+    src, dst = src[order], dst[order]
+    starts = np.searchsorted(src, np.arange(size + 1))
+    return [frozenset(dst[starts[i]:starts[i + 1]].tolist()) for i in range(size)]
+
+
+class FuzzyIndex:
+    """오타 보정용 후보 축소 인덱스: 쿼리와 n-gram을 많이 공유하는 이름만 유사도를 계산합니다."""
+
+    def __init__(self, names, n=NGRAM_SIZE):
+        self.names = sorted(names)
+        self.ngram = NgramIndex([normalize_name(name) for name in self.names], n)
+
+    def candidates(self, query, limit=FUZZY_CANDIDATES):
+        grams = ngrams(normalize_name(str(query)), self.ngram.n)
+        if not grams:
+            return self.names
+        found = [self.ngram.postings[g] for g in grams if g in self.ngram.postings]
+        if not found:
+            return []
+        ids, counts = np.unique(np.concatenate(found), return_counts=True)
+        top = ids[np.argsort(-counts, kind='stable')[:limit]]
+        return [self.names[i] for i in top.tolist()]
+
+
+def build_clean_product_map(df):
+    """검색용 '_clean' 제품명 → 원래 제품명 집합"""
+    mapping = defaultdict(set)
+    for col in ('제품명A', '제품명B'):
+        pairs = df[[col + '_clean', col]].dropna().drop_duplicates()
+        for clean, name in zip(pairs[col + '_clean'], pairs[col]):
+            mapping[clean].add(name)
+    return dict(mapping)
+
+
+
+def split_ingredients(text):
+    """복합제 성분명('아세트아미노펜/카페인무수물')을 성분 목록으로 나눕니다. (소문자, 공백 제거)"""
+    if not isinstance(text, str):
+        return ()
+    return tuple(part for part in INGREDIENT_SEPARATOR_RE.split(text.strip().lower()) if part)
+
+
+class IngredientSets:
+    """복합제를 성분 ID 목록으로 나눈 색인
+
+    성분 ID는 염/에스터 표기를 뗀 기본 성분 키(drug_names.moiety_key)마다 하나이므로,
+    '암로디핀베실산염'과 '암로디핀'은 같은 ID로 정수 비교됩니다.
+    - products: 소문자 제품명 → 성분 ID 집합 (제품→성분 매핑)
+    - strings:  소문자 성분명 문자열(복합제 표기 그대로) → 성분 ID 집합
+    - postings: A쪽/B쪽별 성분 ID → 그 성분이 들어 있는 행 번호 배열
+    성분명이 비어 있는 행은 제품명을 성분으로 취급합니다. (drug_kvstore와 같은 기준)
+    """
+
+    def __init__(self, df):
+        self.ids = {}
+        self.strings = {}
+        self.products = defaultdict(set)
+        self.postings = []
+        for product_col, ingredient_col in (('제품명A_lower', '성분명A_lower'), ('제품명B_lower', '성분명B_lower')):
+            side = df[ingredient_col].fillna(df[product_col])
+            rows_by_id = defaultdict(list)
+            for text, rows in side.groupby(side, sort=False).indices.items():
+                for ingredient_id in self._encode(text):
+                    rows_by_id[ingredient_id].append(rows)
+            self.postings.append({i: np.unique(np.concatenate(r)) for i, r in rows_by_id.items()})
+
+            pairs = df[[product_col]].assign(side=side).dropna().drop_duplicates()
+            for product, text in zip(pairs[product_col], pairs['side']):
+                self.products[product].update(self.strings[text])
+        self.products = {name: frozenset(ids) for name, ids in self.products.items()}
+
+    def _encode(self, text):
+        ids = self.strings.get(text)
+        if ids is None:
+            ids = frozenset(self.ids.setdefault(moiety_key(part), len(self.ids)) for part in split_ingredients(text))
+            self.strings[text] = ids
+        return ids
+
+    def resolve(self, name):
+        """소문자 제품명 또는 성분명(복합제 표기 포함)의 성분 ID 집합. 모르는 이름이면 None."""
+        ids = self.products.get(name) or self.strings.get(name)
+        if ids:
+            return ids
+        parts = [moiety_key(part) for part in split_ingredients(name)]
+        if parts and all(part in self.ids for part in parts):
+            return frozenset(self.ids[part] for part in parts)
+        return None
+
+    def is_literal(self, name):
+        """데이터에 그대로 있는 제품명/성분명 표기이면 True (기본 성분 키로만 찾은 이름이면 False)"""
+        return name in self.products or name in self.strings
+
+    def _side_rows(self, side, ids):
+        postings = self.postings[side]
+        found = [postings[i] for i in ids if i in postings]
+        return np.unique(np.concatenate(found)) if found else _EMPTY
+
+    def rows_between(self, ids_a, ids_b):
+        """한쪽에 ids_a의 성분, 다른 쪽에 ids_b의 성분이 들어 있는 행 번호 배열 (집합 교집합)"""
+        return np.union1d(
+            np.intersect1d(self._side_rows(0, ids_a), self._side_rows(1, ids_b), assume_unique=True),
+            np.intersect1d(self._side_rows(0, ids_b), self._side_rows(1, ids_a), assume_unique=True))
+
+
+class AliasTable:
+    """별칭(상품명/영문 INN 등) → 데이터에 있는 같은 약의 이름 ID들 (drug_names.load_alias_groups)
+
+    전이 폐쇄는 만들 때 미리 계산해 두므로, 검색 시에는 해시 조회 한 번으로 끝납니다.
+    데이터에 이미 있는 이름은 별칭으로 바꾸지 않도록 표에 넣지 않습니다.
+    """
+
+    def __init__(self, groups, name_ids):
+        self.groups = list(groups)
+        self.targets = {}
+        # 별칭과 기본 성분 키가 같은 데이터상 이름도 대상 ('amlodipine' → '암로디핀' → '암로디핀베실산염')
+        by_moiety = defaultdict(list)
+        for name, i in name_ids.items():
+            by_moiety[moiety_key(name)].append(i)
+        for members in self.groups:
+            ids = {name_ids[name] for name in members if name in name_ids}
+            for name in members:
+                ids.update(by_moiety.get(moiety_key(name), ()))
+            if not ids:
+                continue
+            ids = tuple(sorted(ids))
+            for name in members:
+                for key in (name, moiety_key(name)):
+                    if key not in name_ids:
+                        self.targets.setdefault(key, ids)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def resolve(self, name):
+        """정규화된 이름(또는 기본 성분 키)의 이름 ID 튜플. 별칭이 아니면 None."""
+        return self.targets.get(name)
@@ -0,0 +1,312 @@
+# drug_ingest.py
+# 아주 큰 원본 CSV를 청크 단위로 읽어 스냅샷용 컬럼 파일로 바로 씁니다.
+# 전체 파일을 한 번에 읽지 않으며, --chunk-mem-mb는 CSV 한 청크(파싱 버퍼 포함)의 크기만 정합니다.
+# 메모리 상한을 강제하지는 않습니다. 중복 제거 해시(남긴 행마다 약 40바이트)와 문자열 사전은 입력에 비례해 늘어나고,
+# 스냅샷을 만들 때(drug_snapshot build --stream)는 그 뒤에 중복 제거된 데이터 전체를 읽어
+# 인덱스와 성분 쌍 답을 계산하므로, 전체 최대 메모리는 중복 제거 후 행 수에 비례합니다.
+# (예: 40만 행 → 약 540MB, 약 20초. 실제 최대 RSS는 meta.json의 peak_rss_mb에 기록)
+#
+#   python drug_ingest.py big_druglist.csv out_dir --chunk-mem-mb 128
+#   python drug_snapshot.py build big_druglist.csv --stream --chunk-mem-mb 128
+#
+# 컬럼 형식 (columns/):
+#   dictionary.pkl        ← 모든 컬럼이 함께 쓰는 문자열 사전 (중복 없이 한 번씩만)
+#   <컬럼 번호>.i32       ← 행별 문자열 번호 (int32 little-endian, -1 = 빈 값)
+#   provenance.u32        ← 행별 출처 비트마스크 (같은 행이 여러 원본에 있으면 비트가 여러 개)
+#   meta.json             ← 컬럼 이름, 행 수, 원본 목록, 수집 통계
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from drug_engine import BASE_COLUMNS, SOURCE_COLUMN, normalize_base_columns, prepare_dataframe
+
+COLUMNS_DIR = 'columns'
+MAX_SOURCES = 32              # 출처 비트마스크가 uint32
+INGEST_CHUNK_MEM_MB = 256     # CSV 한 청크(파싱 버퍼 포함)에 쓸 메모리 목표 (청크 크기 힌트)
+INGEST_PROBE_ROWS = 5000      # 행당 메모리 추정용 첫 청크 크기
+INGEST_MAX_CHUNK_ROWS = 500000
+
+
+def current_rss_mb():
+    """현재 프로세스의 RSS (MB). 측정할 수 없으면 None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # /proc이 없으면 지금까지의 최대값으로 대신함 (Linux는 KB, macOS는 바이트)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+class StringTable:
+    """문자열 → 번호. 같은 문자열은 한 번만 저장됩니다."""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def encode(self, values):
+        """문자열 배열을 int32 번호 배열로 바꿉니다. (결측 = -1)"""
+        codes, uniques = pd.factorize(values)
+        ids = self.ids
+        mapping = np.empty(len(uniques) + 1, dtype=np.int32)
+        for i, value in enumerate(uniques):
+            code = ids.get(value)
+            if code is None:
+                code = ids[value] = len(self.strings)
+                self.strings.append(value)
+            mapping[i] = code
+        mapping[-1] = -1
+        return mapping[codes]
+
+
+class ColumnarWriter:
+    """문자열 번호로 인코딩한 컬럼을 청크마다 파일 끝에 이어 씁니다. (encode로 번호를 만들고 append로 씀)"""
+
+    def __init__(self, out_dir, columns=BASE_COLUMNS):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.columns = list(columns)
+        self.table = StringTable()
+        self.rows = 0
+        self._files = [open(os.path.join(out_dir, f'{i}.i32'), 'wb') for i in range(len(self.columns))]
+
+    def encode(self, chunk):
+        """청크를 (행 수, 컬럼 수) int32 문자열 번호 배열로 바꿉니다."""
+        return np.column_stack([self.table.encode(chunk[col]) for col in self.columns]).astype(np.int32)
+
+    def append(self, codes):
+        for f, column in zip(self._files, codes.T):
+            f.write(column.astype('<i4').tobytes())
+        self.rows += len(codes)
+
+    def close(self, provenance, stats=None):
+        for f in self._files:
+            f.close()
+        provenance.astype('<u4').tofile(os.path.join(self.out_dir, 'provenance.u32'))
+        with open(os.path.join(self.out_dir, 'dictionary.pkl'), 'wb') as f:
+            pickle.dump(self.table.strings, f, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = {'columns': self.columns, 'rows': self.rows, 'strings': len(self.table.strings)}
+        meta.update(stats or {})
+        with open(os.path.join(self.out_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+class RowDeduplicator:
+    """이미 본 행(5개 컬럼 모두 같은 행)을 걸러내고, 남긴 행마다 출처 비트마스크를 모읍니다.
+
+    행은 ColumnarWriter.encode의 문자열 번호로 받습니다. (같은 번호 = 같은 문자열)
+    남긴 행마다 64비트 해시, 문자열 번호, 출처 비트마스크만 보관하며, 해시가 같으면 문자열 번호까지 비교해
+    실제로 같은 행일 때만 버립니다. 해시는 크기가 비슷한 것끼리만 합치는 정렬된 구간들로 두어
+    (구간 수는 log N 이하) 청크마다 지금까지의 해시 전체를 다시 정렬하지 않습니다.
+    """
+
+    def __init__(self, width=len(BASE_COLUMNS)):
+        self.runs = []                                     # [(정렬된 해시, 해시별 행 번호)], 뒤로 갈수록 작은 구간
+        self.rows = 0
+        self._codes = np.empty((1024, width), dtype=np.int32)  # 행 번호 → 문자열 번호 (앞 self.rows행만 유효)
+        self._provenance = np.zeros(1024, dtype=np.uint32)
+
+    @property
+    def provenance(self):
+        return self._provenance[:self.rows]
+
+    def filter(self, codes, source_bit=1):
+        """codes 중 처음 보는 행이면 True인 마스크. 이미 있는 행은 버리고 그 행의 출처 비트만 추가합니다."""
+        # 청크 안의 중복: 문자열 번호 행 전체를 하나의 값으로 보고 첫 행만 남김
+        codes = np.ascontiguousarray(codes, dtype=np.int32)
+        row_view = codes.view(np.dtype((np.void, codes.itemsize * codes.shape[1]))).ravel()
+        _, first_idx = np.unique(row_view, return_index=True)
+        keep = np.zeros(len(codes), dtype=bool)
+        keep[first_idx] = True
+
+        # 이전 청크에 있던 행: 해시로 후보를 찾고 문자열 번호로 확인
+        hashes = pd.util.hash_pandas_object(pd.DataFrame(codes), index=False).to_numpy()
+        candidates = np.flatnonzero(keep)
+        for run_hashes, run_rows in self.runs:
+            if not len(candidates):
+                break
+            pos = np.searchsorted(run_hashes, hashes[candidates])
+            hit = pos < len(run_hashes)
+            hit[hit] = run_hashes[pos[hit]] == hashes[candidates[hit]]
+            for i, p in zip(candidates[hit].tolist(), pos[hit].tolist()):
+                row = self._find(run_hashes, run_rows, p, codes[i])
+                if row is not None:
+                    keep[i] = False
+                    self._provenance[row] |= np.uint32(source_bit)
+            candidates = candidates[keep[candidates]]
+
+        new_rows = np.arange(self.rows, self.rows + keep.sum(), dtype=np.int64)
+        self._store(codes[keep], source_bit)
+        order = np.argsort(hashes[keep], kind='stable')
+        self._add_run(hashes[keep][order], new_rows[order])
+        return keep
+
+    def _find(self, run_hashes, run_rows, pos, row_codes):
+        """해시가 같은 구간(pos부터)에서 문자열 번호까지 같은 행 번호. 없으면 None (해시 충돌)"""
+        target = run_hashes[pos]
+        while pos < len(run_hashes) and run_hashes[pos] == target:
+            row = int(run_rows[pos])
+            if np.array_equal(self._codes[row], row_codes):
+                return row
+            pos += 1
+        return None
+
+    def _store(self, codes, source_bit):
+        end = self.rows + len(codes)
+        if end > len(self._codes):   # 두 배씩 늘림
+            size = max(end, 2 * len(self._codes))
+            self._codes = np.concatenate([self._codes[:self.rows], np.empty((size - self.rows, self._codes.shape[1]),
+                                                                           dtype=np.int32)])
+            self._provenance = np.concatenate([self._provenance[:self.rows],
+                                               np.zeros(size - self.rows, dtype=np.uint32)])
+        self._codes[self.rows:end] = codes
+        self._provenance[self.rows:end] = source_bit
+        self.rows = end
+
+    def _add_run(self, hashes, rows):
+        if not len(hashes):
+            return
+        self.runs.append((hashes, rows))
+        # 바로 앞 구간이 새 구간보다 크지 않으면 합침 (이진 카운터처럼 각 해시는 log N번만 다시 정렬됨)
+        while len(self.runs) > 1 and len(self.runs[-2][0]) <= len(self.runs[-1][0]):
+            (h1, r1), (h2, r2) = self.runs.pop(), self.runs.pop()
+            hashes, rows = np.concatenate([h2, h1]), np.concatenate([r2, r1])
+            order = np.argsort(hashes, kind='stable')
+            self.runs.append((hashes[order], rows[order]))
+
+
+def normalize_chunk(chunk):
+    """원본 5개 컬럼만 남기고 load_dataframe과 같은 기준으로 정리합니다. (앞뒤 공백 제거, 빈 문자열은 결측)"""
+    return normalize_base_columns(chunk[BASE_COLUMNS].copy())
+
+
+def _next_chunk_rows(row_bytes, chunk_mem_mb):
+    if not row_bytes:
+        return INGEST_PROBE_ROWS
+    return int(min(max(chunk_mem_mb * 2 ** 20 / row_bytes, INGEST_PROBE_ROWS // 5), INGEST_MAX_CHUNK_ROWS))
+
+
+def ingest_chunks(chunks, out_dir, chunk_mem_mb=INGEST_CHUNK_MEM_MB, source_names=('source',)):
+    """(원본 번호, 데이터프레임 청크)들을 정규화/중복 제거/인코딩하여 out_dir에 컬럼 파일로 씁니다.
+
+    여러 원본에 같은 행이 있으면 한 행만 남기고 출처 비트마스크에 모든 원본을 기록합니다.
+    통계 dict를 반환합니다.
+    """
+    if len(source_names) > MAX_SOURCES:
+        raise ValueError(f"원본은 최대 {MAX_SOURCES}개까지 합칠 수 있습니다.")
+    started = time.perf_counter()
+    writer = ColumnarWriter(out_dir)
+    dedup = RowDeduplicator()
+    source_rows = [0] * len(source_names)
+    new_rows = [0] * len(source_names)
+    count = 0
+    peak_rss = current_rss_mb() or 0.0
+
+    for source, chunk in chunks:
+        source_rows[source] += len(chunk)
+        count += 1
+        codes = writer.encode(normalize_chunk(chunk))
+        kept = codes[dedup.filter(codes, 1 << source)]
+        writer.append(kept)
+        new_rows[source] += len(kept)
+        del chunk
+        peak_rss = max(peak_rss, current_rss_mb() or 0.0)
+
+    rows_in = sum(source_rows)
+    stats = {
+        'source_rows': rows_in,
+        'duplicates': rows_in - writer.rows,
+        'chunks': count,
+        'sources': [{'name': name, 'bit': i, 'rows': source_rows[i], 'new_rows': new_rows[i],
+                     'rows_in_merged': int((dedup.provenance >> np.uint32(i) & np.uint32(1)).sum())}
+                    for i, name in enumerate(source_names)],
+        'chunk_mem_mb': chunk_mem_mb,
+        'peak_rss_mb': round(peak_rss, 1),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    writer.close(dedup.provenance, stats)
+    return dict(stats, rows=writer.rows, strings=len(writer.table.strings))
+
+
+def iter_csv_chunks(csv_path, chunk_mem_mb=INGEST_CHUNK_MEM_MB, chunk_rows=None):
+    """CSV를 청크 단위로 읽습니다.
+
+    chunk_rows를 주면 고정 크기로 읽고, 없으면 첫 청크로 잰 행당 메모리로 한 청크가 chunk_mem_mb쯤 되게 정합니다.
+    """
+    row_bytes = None
+    reader = pd.read_csv(csv_path, encoding='utf-8', dtype=str, usecols=BASE_COLUMNS, iterator=True)
+    try:
+        while True:
+            size = chunk_rows or (_next_chunk_rows(row_bytes, chunk_mem_mb) if row_bytes else INGEST_PROBE_ROWS)
+            try:
+                chunk = reader.get_chunk(size)
+            except StopIteration:
+                return
+            if row_bytes is None and len(chunk):
+                # 파싱 중 임시 버퍼까지 감안해 실제 크기의 3배로 잡음
+                row_bytes = 3 * chunk.memory_usage(deep=True).sum() / len(chunk)
+            yield chunk
+    finally:
+        reader.close()
+
+
+def ingest_csv(csv_path, out_dir, chunk_mem_mb=INGEST_CHUNK_MEM_MB, chunk_rows=None):
+    """CSV를 청크 단위로 읽어 out_dir에 컬럼 파일로 씁니다. 통계 dict를 반환합니다."""
+    chunks = ((0, chunk) for chunk in iter_csv_chunks(csv_path, chunk_mem_mb, chunk_rows))
+    return ingest_chunks(chunks, out_dir, chunk_mem_mb, source_names=[source_name(csv_path)])
+
+
+def source_name(path):
+    """출처 표시에 쓸 기본 원본 이름 (파일 이름에서 확장자를 뺀 것)"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def read_columnar(columns_dir):
+    """컬럼 파일로 원본 5개 컬럼을 복원하고 검색용 컬럼을 추가한 데이터프레임을 반환합니다.
+
+    같은 문자열은 사전의 같은 객체를 가리키므로, 행마다 문자열을 새로 만드는 CSV 파싱보다 메모리가 적게 듭니다.
+    """
+    with open(os.path.join(columns_dir, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    with open(os.path.join(columns_dir, 'dictionary.pkl'), 'rb') as f:
+        strings = np.array(pickle.load(f) + [None], dtype=object)   # 마지막 칸 = 결측(-1)
+
+    data = {}
+    for i, col in enumerate(meta['columns']):
+        codes = np.fromfile(os.path.join(columns_dir, f'{i}.i32'), dtype='<i4')
+        data[col] = pd.Series(strings[codes], dtype=str)
+    df = prepare_dataframe(pd.DataFrame(data))
+    df[SOURCE_COLUMN] = np.fromfile(os.path.join(columns_dir, 'provenance.u32'), dtype='<u4').astype(np.uint32)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="큰 CSV를 청크 단위로 컬럼 파일로 변환")
+    parser.add_argument('csv')
+    parser.add_argument('out_dir')
+    parser.add_argument('--chunk-mem-mb', type=int, default=INGEST_CHUNK_MEM_MB,
+                        help="CSV 한 청크에 쓸 메모리 목표 (청크 크기 힌트, 최대 RSS를 제한하지는 않음)")
+    parser.add_argument('--chunk-rows', type=int, default=None, help="고정 청크 크기 (기본: 메모리에 맞춰 자동)")
+    args = parser.parse_args(argv)
+
+    s = ingest_csv(args.csv, args.out_dir, args.chunk_mem_mb, args.chunk_rows)
+    print(f"✅ {s['source_rows']}행 → {s['rows']}행 (중복 {s['duplicates']}행 제거), 문자열 {s['strings']}개, "
+          f"청크 {s['chunks']}개, 최대 RSS {s['peak_rss_mb']}MB (청크 목표 {s['chunk_mem_mb']}MB), {s['seconds']:.2f}초")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
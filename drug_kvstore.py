@@ -0,0 +1,200 @@
+# drug_kvstore.py
+# 상호작용이 등록된 모든 성분 쌍의 최종 위험도/설명을 오프라인으로 미리 계산해
+# mmap으로 바로 읽을 수 있는 키-값 파일로 저장합니다.
+#
+#   python drug_kvstore.py build druglist.csv pairs.kv
+#   python drug_kvstore.py get pairs.kv 아스피린 와파린나트륨
+#
+# 파일 구조 (리틀 엔디언)
+#   헤더   : b'DKV1' | 항목 수(uint32) | 인덱스 시작(uint64) | 데이터 시작(uint64)
+#   인덱스 : 키 해시(uint64) | 데이터 위치(uint64) | 키 길이(uint32) | 값 길이(uint32)  ← 해시 순 정렬
+#   데이터 : 키(utf-8) + 값(utf-8, "위험도\0설명")
+# 파일에 없는 쌍은 "등록된 상호작용 없음"을 뜻합니다.
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+
+from drug_engine import BASE_COLUMNS, DATA_FILE, SOURCE_COLUMN, load_dataframe, summarize_records
+from drug_names import normalize_name
+
+MAGIC = b'DKV1'
+HEADER = struct.Struct('<4sIQQ')
+ENTRY = struct.Struct('<QQII')
+KEY_SEP = '\x1f'
+PAIR_FILE = 'pairs.kv'
+
+
+def normalize_key_name(name):
+    return normalize_name(str(name))
+
+
+def pair_key(name_a, name_b):
+    """순서와 무관한 성분 쌍 키를 만듭니다."""
+    a, b = sorted((normalize_key_name(name_a), normalize_key_name(name_b)))
+    return f"{a}{KEY_SEP}{b}".encode('utf-8')
+
+
+def key_hash(key_bytes):
+    return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), 'little')
+
+
+# --------------------------------------------------------------------------------------------------
+# 1. 빌드
+# --------------------------------------------------------------------------------------------------
+def iter_pair_answers(df, source_names=None):
+    """성분 쌍별로 묶어 check_drug_interaction_flexible과 같은 방식으로 위험도/설명을 계산합니다.
+
+    df는 load_dataframe / 스냅샷처럼 중복 행이 이미 제거된 데이터여야 합니다.
+    """
+    df = df[df['위험도'] >= 0]
+
+    # 성분명이 비어 있으면 제품명을 대신 사용
+    side_a = df['성분명A_lower'].fillna(df['제품명A_lower'])
+    side_b = df['성분명B_lower'].fillna(df['제품명B_lower'])
+    valid = side_a.notna() & side_b.notna()
+    df, side_a, side_b = df[valid], side_a[valid].str.strip(), side_b[valid].str.strip()
+
+    first = side_a.where(side_a <= side_b, side_b)
+    second = side_b.where(side_a <= side_b, side_a)
+
+    # 쌍마다 데이터프레임을 만들지 않고 행 dict를 쌍별로 모음 (수십만 쌍이면 groupby 반복이 대부분의 시간을 차지함)
+    show_sources = bool(source_names) and len(source_names) > 1 and SOURCE_COLUMN in df.columns
+    columns = BASE_COLUMNS + ['위험도'] + ([SOURCE_COLUMN] if show_sources else [])
+    groups = {}
+    for key, row in zip(zip(first.tolist(), second.tolist()), df[columns].to_dict('records')):
+        groups.setdefault(key, []).append(row)
+    for (a, b), records in groups.items():
+        risk_label, explanation = summarize_records(records, source_names if show_sources else None)
+        if risk_label is not None:
+            yield a, b, risk_label, explanation
+
+
+def write_pair_file(answers, out_path):
+    """(성분A, 성분B, 위험도, 설명) 목록을 키-값 파일로 씁니다. 임시 파일에 쓴 뒤 교체합니다."""
+    entries = {}
+    for a, b, risk_label, explanation in answers:
+        entries[pair_key(a, b)] = f"{risk_label}\0{explanation}".encode('utf-8')
+
+    keys = sorted(entries, key=lambda k: (key_hash(k), k))
+    index_offset = HEADER.size
+    data_offset = index_offset + ENTRY.size * len(keys)
+
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(keys), index_offset, data_offset))
+        position = data_offset
+        for key in keys:
+            f.write(ENTRY.pack(key_hash(key), position, len(key), len(entries[key])))
+            position += len(key) + len(entries[key])
+        for key in keys:
+            f.write(key)
+            f.write(entries[key])
+    os.replace(tmp_path, out_path)
+    return len(keys)
+
+
+def build_pair_file(csv_path=DATA_FILE, out_path=PAIR_FILE, df=None):
+    """CSV(또는 이미 로드된 df)로부터 성분 쌍 키-값 파일을 만듭니다."""
+    start = time.perf_counter()
+    if df is None:
+        df = load_dataframe(csv_path)
+    count = write_pair_file(iter_pair_answers(df), out_path)
+    duration = time.perf_counter() - start
+    print(f"✅ 성분 쌍 키-값 파일 생성 완료: {out_path} ({count}개 쌍, {duration:.2f}초)")
+    return count
+
+
+# --------------------------------------------------------------------------------------------------
+# 2. 조회
+# --------------------------------------------------------------------------------------------------
+class PairStore:
+    """키-값 파일을 mmap으로 열어 성분 쌍의 (위험도, 설명)을 조회합니다."""
+
+    def __init__(self, path=PAIR_FILE):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._index_offset, self._data_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}'는 성분 쌍 키-값 파일이 아닙니다.")
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self._mm, self._index_offset + ENTRY.size * i)
+
+    def get(self, name_a, name_b):
+        """등록된 상호작용이면 (위험도, 설명), 없으면 None을 반환합니다."""
+        key = pair_key(name_a, name_b)
+        h = key_hash(key)
+
+        # 해시 기준 이분 탐색
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        # 해시 충돌 대비: 같은 해시의 항목들 중 키가 일치하는 것을 찾음
+        while lo < self.count:
+            entry_hash, position, key_len, value_len = self._entry(lo)
+            if entry_hash != h:
+                break
+            if self._mm[position:position + key_len] == key:
+                value = self._mm[position + key_len:position + key_len + value_len].decode('utf-8')
+                risk_label, explanation = value.split('\0', 1)
+                return risk_label, explanation
+            lo += 1
+        return None
+
+    def __iter__(self):
+        """(성분A, 성분B, 위험도, 설명)을 차례로 반환합니다."""
+        for i in range(self.count):
+            _, position, key_len, value_len = self._entry(i)
+            a, b = self._mm[position:position + key_len].decode('utf-8').split(KEY_SEP, 1)
+            risk_label, explanation = self._mm[position + key_len:position + key_len + value_len].decode('utf-8').split('\0', 1)
+            yield a, b, risk_label, explanation
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="성분 쌍 상호작용 키-값 파일 생성/조회")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="CSV로부터 키-값 파일 생성")
+    build.add_argument('csv', nargs='?', default=DATA_FILE)
+    build.add_argument('out', nargs='?', default=PAIR_FILE)
+
+    get = sub.add_parser('get', help="성분 쌍 조회")
+    get.add_argument('kv')
+    get.add_argument('name_a')
+    get.add_argument('name_b')
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build_pair_file(args.csv, args.out)
+    else:
+        store = PairStore(args.kv)
+        answer = store.get(args.name_a, args.name_b)
+        if answer is None:
+            print(f"안전: '{args.name_a}'와 '{args.name_b}' 간의 상호작용 정보가 없습니다.")
+        else:
+            print(f"{answer[0]}: {answer[1]}")
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# drug_loadtest.py
+# drug_api 서버에 여러 연결로 동시에 요청을 보내 초당 처리 요청 수와 지연 시간을 측정합니다.
+#
+#   python drug_loadtest.py                                   # druglist.csv로 서버를 이 프로세스에 띄워 측정
+#   python drug_loadtest.py --url http://127.0.0.1:8080 --concurrency 64 --seconds 30
+#   python drug_loadtest.py --prescriptions 5000 --batch-size 500   # 처방 일괄 확인: 쌍별 호출 vs 배치 (처방/초)
+#
+# 요청은 데이터에 있는 제품명/성분명으로 만든 /search, /ingredients, /interaction, /polypharmacy를 섞어 보냅니다.
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from itertools import combinations
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from drug_engine import DATA_FILE
+
+LOADTEST_CONCURRENCY = 32
+LOADTEST_SECONDS = 10.0
+# 경로별 요청 비율
+REQUEST_MIX = (('search', 0.4), ('ingredients', 0.2), ('interaction', 0.3), ('polypharmacy', 0.1))
+POLYPHARMACY_SIZE = 5
+PRESCRIPTION_SIZE = (2, 8)        # 벤치마크용 처방 하나의 약물 수 범위
+PRESCRIPTION_BATCH = 500
+
+
+def build_requests(csv_path, count=2000, seed=0):
+    """데이터의 이름으로 (경로 이름, 메서드, 대상, 본문) 요청 목록을 만듭니다."""
+    df = pd.read_csv(csv_path, encoding='utf-8', dtype=str, usecols=['제품명A', '성분명A', '제품명B'])
+    products = pd.concat([df['제품명A'], df['제품명B']]).dropna().unique().tolist()
+    ingredients = df['성분명A'].dropna().unique().tolist()
+    pairs = df[['제품명A', '제품명B']].dropna().drop_duplicates().to_numpy().tolist()
+    rng = random.Random(seed)
+
+    requests = []
+    kinds = rng.choices([k for k, _ in REQUEST_MIX], weights=[w for _, w in REQUEST_MIX], k=count)
+    for kind in kinds:
+        if kind == 'search':
+            name = rng.choice(products + ingredients)
+            requests.append((kind, 'GET', f"/search?q={quote(name)}", b''))
+        elif kind == 'ingredients':
+            requests.append((kind, 'GET', f"/ingredients?product={quote(rng.choice(products))}", b''))
+        elif kind == 'interaction':
+            a, b = rng.choice(pairs)
+            requests.append((kind, 'GET', f"/interaction?a={quote(a)}&b={quote(b)}", b''))
+        else:
+            drugs = rng.sample(products, min(POLYPHARMACY_SIZE, len(products)))
+            body = json.dumps({'drugs': drugs}, ensure_ascii=False).encode('utf-8')
+            requests.append((kind, 'POST', '/polypharmacy', body))
+    return requests
+
+
+async def _send(reader, writer, host, method, target, body):
+    head = (f"{method} {target} HTTP/1.1\r\nHost: {host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        if key.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _worker(host, port, requests, deadline, latencies, statuses, seed):
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(seed)   # 연결마다 다른 순서로 요청 (같은 순서면 캐시가 방금 채운 요청만 측정됨)
+    try:
+        while time.perf_counter() < deadline:
+            kind, method, target, body = rng.choice(requests)
+            start = time.perf_counter()
+            status = await _send(reader, writer, host, method, target, body)
+            latencies.append((kind, time.perf_counter() - start))
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, requests, concurrency=LOADTEST_CONCURRENCY, seconds=LOADTEST_SECONDS, seed=0):
+    """동시 연결 concurrency개로 seconds초 동안 요청을 보내고 결과 dict를 반환합니다. (i번째 연결은 seed + i로 요청을 고름)"""
+    latencies, statuses = [], Counter()
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(_worker(host, port, requests, deadline, latencies, statuses, seed + i)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    result = {'requests': len(latencies), 'seconds': round(elapsed, 2),
+              'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+              'errors': sum(n for s, n in statuses.items() if s != 200), 'by_path': {}}
+    for kind in sorted({k for k, _ in latencies}):
+        ms = np.array([t for k, t in latencies if k == kind]) * 1000
+        result['by_path'][kind] = {'count': int(len(ms)), 'p50_ms': round(float(np.percentile(ms, 50)), 2),
+                                   'p95_ms': round(float(np.percentile(ms, 95)), 2)}
+    if latencies:
+        ms = np.array([t for _, t in latencies]) * 1000
+        result['p50_ms'] = round(float(np.percentile(ms, 50)), 2)
+        result['p95_ms'] = round(float(np.percentile(ms, 95)), 2)
+        result['p99_ms'] = round(float(np.percentile(ms, 99)), 2)
+    return result
+
+
+async def _run_local(csv_path, requests, concurrency, seconds, workers):
+    """이 프로세스 안에서 서버를 띄워(임의 포트) 측정합니다."""
+    from drug_api import DrugApi, DrugApiServer
+    from drug_engine import DrugEngine
+
+    engine = DrugEngine.from_csv(csv_path)
+    engine.start_index_build()
+    engine.wait_for_indexes()
+    api = DrugApi(engine, workers)
+    server = await DrugApiServer(api, '127.0.0.1', 0).start()
+    try:
+        return await run_load('127.0.0.1', server.port, requests, concurrency, seconds)
+    finally:
+        await server.stop()
+        api.close()
+
+
+def build_prescriptions(csv_path, count, seed=0):
+    """실제 상호작용 쌍 하나와 임의 제품명들로 이루어진 처방 count개를 만듭니다. (인기 약은 여러 처방에 반복)"""
+    df = pd.read_csv(csv_path, encoding='utf-8', dtype=str, usecols=['제품명A', '제품명B'])
+    pairs = df.dropna().drop_duplicates().to_numpy().tolist()
+    products = pd.concat([df['제품명A'], df['제품명B']]).dropna()
+    popular = products.value_counts().index[:200].tolist()
+    rng = random.Random(seed)
+    return [rng.choice(pairs) + rng.sample(popular, rng.randint(*PRESCRIPTION_SIZE) - 2) for _ in range(count)]
+
+
+def benchmark_prescriptions(engine, prescriptions, batch_size=PRESCRIPTION_BATCH):
+    """같은 처방들을 (1) 쌍마다 check_interaction 호출, (2) check_prescriptions 배치로 확인하여 처방/초를 비교합니다.
+
+    매번 캐시를 비운 상태에서 측정합니다.
+    """
+    engine.clear_caches()
+    started = time.perf_counter()
+    per_pair = [[(a, b) + tuple(engine.check_interaction(a, b))
+                 for a, b in combinations(list(dict.fromkeys(drugs)), 2)] for drugs in prescriptions]
+    per_pair_seconds = time.perf_counter() - started
+
+    engine.clear_caches()
+    started = time.perf_counter()
+    batched = []
+    for i in range(0, len(prescriptions), batch_size):
+        batched.extend(engine.check_prescriptions(prescriptions[i:i + batch_size]))
+    batch_seconds = time.perf_counter() - started
+
+    return {'prescriptions': len(prescriptions), 'pairs': sum(len(r) for r in batched),
+            'batch_size': batch_size, 'identical': per_pair == batched,
+            'per_pair_seconds': round(per_pair_seconds, 3), 'batch_seconds': round(batch_seconds, 3),
+            'per_pair_rx_per_sec': round(len(prescriptions) / per_pair_seconds, 1),
+            'batch_rx_per_sec': round(len(prescriptions) / batch_seconds, 1)}
+
+
+def print_result(result):
+    print(f"✅ {result['requests']:,}건 / {result['seconds']}초 → 초당 {result['rps']:,}건 "
+          f"(오류 {result['errors']}건, p50 {result.get('p50_ms', 0)}ms, p95 {result.get('p95_ms', 0)}ms, "
+          f"p99 {result.get('p99_ms', 0)}ms)")
+    for kind, r in result['by_path'].items():
+        print(f"   {kind:<13} {r['count']:>8,}건  p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="drug_api 부하 테스트 (초당 요청 수)")
+    parser.add_argument('--url', help="측정할 서버 주소 (없으면 이 프로세스에서 서버를 띄움)")
+    parser.add_argument('--csv', default=DATA_FILE, help="요청에 쓸 이름을 뽑을 데이터 (로컬 서버도 이 파일로 생성)")
+    parser.add_argument('--concurrency', type=int, default=LOADTEST_CONCURRENCY)
+    parser.add_argument('--seconds', type=float, default=LOADTEST_SECONDS)
+    parser.add_argument('--workers', type=int, default=None, help="로컬 서버의 작업 스레드 수")
+    parser.add_argument('--prescriptions', type=int, default=0, help="HTTP 대신 처방 N개로 일괄 확인 처리량 측정")
+    parser.add_argument('--batch-size', type=int, default=PRESCRIPTION_BATCH)
+    args = parser.parse_args(argv)
+
+    if args.prescriptions:
+        from drug_engine import DrugEngine
+        engine = DrugEngine.from_csv(args.csv)
+        engine.start_index_build()
+        engine.wait_for_indexes()
+        r = benchmark_prescriptions(engine, build_prescriptions(args.csv, args.prescriptions), args.batch_size)
+        print(f"{'✅' if r['identical'] else '❌'} 처방 {r['prescriptions']:,}개 ({r['pairs']:,}쌍), 배치 {r['batch_size']}개씩")
+        print(f"   쌍별 호출  {r['per_pair_seconds']:>8.3f}초  초당 {r['per_pair_rx_per_sec']:>10,}처방")
+        print(f"   배치       {r['batch_seconds']:>8.3f}초  초당 {r['batch_rx_per_sec']:>10,}처방")
+        return 0 if r['identical'] else 1
+
+    requests = build_requests(args.csv)
+    if args.url:
+        url = urlsplit(args.url)
+        result = asyncio.run(run_load(url.hostname, url.port or 80, requests, args.concurrency, args.seconds))
+    else:
+        from drug_api import API_WORKERS
+        result = asyncio.run(_run_local(args.csv, requests, args.concurrency, args.seconds,
+                                        args.workers or API_WORKERS))
+    print_result(result)
+    return 1 if result['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
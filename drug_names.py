@@ -0,0 +1,223 @@
+# drug_names.py
+# 이름 정규화와, 제품명을 (기본 이름, 함량, 단위, 제형)으로 나누는 파서입니다.
+# 데이터 로드 시 이름마다 한 번만 실행하여 컬럼으로 저장하고, 검색어에도 같은 함수를 씁니다.
+#
+#   normalize_name('ＡＳＰＩＲＩＮ　정')  → 'aspirin 정'   (전각 문자, NFD 한글도 저장된 이름과 같은 형태로)
+#   parse_product_name('타이레놀정500밀리그램') → ParsedName(base='타이레놀', text='타이레놀', strength=500.0, unit='mg', form='정')
+#   parse_product_name('타이레놀 500mg')        → ParsedName(base='타이레놀', text='타이레놀', strength=500.0, unit='mg', form=None)
+#
+# 별칭 파일(aliases.csv: 이름,별칭)은 상품명 ↔ 성분명 ↔ 영문 INN 연결을 한 줄에 하나씩 적습니다.
+# load_alias_groups가 연결을 따라가(전이 폐쇄) 같은 약을 가리키는 이름들을 하나의 그룹으로 묶습니다.
+#
+# 챗봇 질문 패턴('타이레놀 성분이 뭐야?', '타이레놀과 아스피린')도 여기서 한 번만 컴파일하여
+# Streamlit 스크립트가 다시 실행될 때마다 만들지 않습니다.
+
+import csv
+import os
+import re
+import unicodedata
+from collections import namedtuple
+
+# 기본 이름 뒤에 붙는 제형 (긴 것부터 확인)
+FORM_WORDS = sorted([
+    '필름코팅정', '서방정', '장용정', '구강붕해정', '츄어블정', '정제', '정',
+    '연질캡슐', '경질캡슐', '캡슐',
+    '주사제', '주사액', '주사', '주',
+    '시럽액', '시럽', '현탁액', '액', '과립', '산제', '크림', '연고', '겔', '패치', '점안액', '좌제',
+], key=len, reverse=True)
+
+# 함량 단위 표기 → 표준 단위
+UNIT_ALIASES = {
+    'mg': 'mg', '밀리그램': 'mg', '㎎': 'mg',
+    'g': 'g', '그램': 'g',
+    'mcg': 'mcg', 'μg': 'mcg', 'µg': 'mcg', '㎍': 'mcg', '마이크로그램': 'mcg',
+    'ml': 'ml', '밀리리터': 'ml', '㎖': 'ml',
+    'l': 'l', '리터': 'l',
+    'iu': 'iu', '단위': 'iu',
+    '%': '%',
+}
+
+# NFKC 이후에도 남는 문장부호 변형 → 대표 문자
+PUNCT_FOLD = str.maketrans({
+    '\u2010': '-', '\u2011': '-', '\u2012': '-', '\u2013': '-', '\u2014': '-', '\u2015': '-', '\u2212': '-',
+    '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
+    '\u30fb': '·', '\u2022': '·', '\u2219': '·', '\u22c5': '·',
+})
+
+BRACKETS_RE = re.compile(r'\(.*?\)|\[.*?\]')
+QUERY_CLEAN_RE = re.compile(r'\(.*?\)|\[.*?\]|(주사제|정제|캡슐|시럽)$')   # clean_query (괄호, 끝의 제형 단어)
+_UNIT_PATTERN = '|'.join(re.escape(unit) for unit in sorted(UNIT_ALIASES, key=len, reverse=True))
+STRENGTH_RE = re.compile(
+    rf'(\d[\d,]*(?:\.\d+)?)\s*({_UNIT_PATTERN})(?:\s*/\s*(\d[\d.]*)?\s*({_UNIT_PATTERN}))?(?![a-z])',
+    re.IGNORECASE)
+FORM_RE = re.compile(rf"({'|'.join(FORM_WORDS)})$")
+_SPACES_RE = re.compile(r'[\s_]+')
+
+# 성분명 끝의 염/에스터/수화물 표기 (기본 성분 키를 만들 때 제거, 긴 것부터 확인)
+SALT_WORDS = sorted([
+    '염산염', '염산', '황산염', '베실산염', '말레산염', '메실산염', '타르타르산염', '주석산염', '푸마르산염',
+    '시트르산염', '구연산염', '브롬화수소산염', '인산염', '아세트산염', '초산염', '숙신산염', '호박산염', '질산염',
+    '토실산염', '캄실산염', '에실산염', '이세티온산염', '나파디실산염',
+    '나트륨', '칼륨', '칼슘', '마그네슘', '수화물', '일수화물', '이수화물', '삼수화물', '반수화물', '무수물',
+    '프로피오네이트', '디프로피오네이트', '푸로에이트', '발레레이트',
+    'hydrochloride', 'hcl', 'besylate', 'besilate', 'maleate', 'mesylate', 'mesilate', 'tartrate', 'bitartrate',
+    'fumarate', 'citrate', 'hydrobromide', 'phosphate', 'acetate', 'succinate', 'sulfate', 'sulphate', 'nitrate',
+    'tosylate', 'camsylate', 'camsilate', 'esylate', 'esilate', 'isethionate', 'napadisylate', 'napadisilate',
+    'sodium', 'potassium', 'calcium', 'magnesium', 'hydrate', 'monohydrate', 'dihydrate', 'trihydrate',
+    'hemihydrate', 'anhydrous', 'propionate', 'dipropionate', 'furoate', 'valerate',
+], key=len, reverse=True)
+_SALT_WORD_SET = frozenset(SALT_WORDS)
+_SALT_SUFFIXES = tuple(SALT_WORDS)
+MIN_MOIETY_LEN = 3   # 염 표기를 떼고 남은 이름이 이보다 짧으면 떼지 않음 ('염화칼륨' 등)
+
+ALIAS_FILE = 'aliases.csv'
+
+# 챗봇 질문 패턴
+COMPONENT_QUESTION_RE = re.compile(r'(.+?)\s*(?:주성분|성분)[이]?\s*(?:뭐야|알려줘)?\??$')
+INTERACTION_QUESTION_RES = (   # 앞에서부터 시도 (질문 문장 → 'A와 B' → 'A B')
+    re.compile(r'(.+?)\s*(?:이랑|랑|과|와|하고)\s+(.+?)(?:를|을)?\s+(?:같이|함께)\s+(?:복용해도|먹어도)\s+(?:돼|되나|될까|되나요)\??'),
+    re.compile(r'^\s*(.+?)\s*(?:이랑|랑|과|와|하고)\s+(.+?)\s*$'),
+    re.compile(r'^\s*([^\s].*?)\s+([^\s].*?)\s*$'),
+)
+DRUG_LIST_SPLIT_RE = re.compile(r'[,\s]+|과|와|랑|하고')   # 'A, B와 C' → 약물 목록
+TRAILING_OF_RE = re.compile(r'[의]$')
+
+ParsedName = namedtuple('ParsedName', ['base', 'text', 'strength', 'unit', 'form'])
+EMPTY_NAME = ParsedName(None, None, float('nan'), None, None)
+
+
+def normalize_name(name):
+    """저장된 이름과 검색어에 똑같이 적용하는 정규화 (NFKC, casefold, 공백/문장부호 통일).
+
+    macOS 등에서 들어오는 NFD 한글(자모 분리)과 전각 영숫자도 인덱스의 이름과 같은 문자열이 됩니다.
+    문자열이 아니면 None을 반환합니다.
+    """
+    if not isinstance(name, str):
+        return None
+    if not name.isascii():
+        name = unicodedata.normalize('NFKC', name).translate(PUNCT_FOLD)
+    return ' '.join(name.split()).casefold()
+
+
+def parse_product_name(name):
+    """제품명(또는 검색어)을 구조화합니다.
+
+    base     : 비교용 기본 이름 (소문자, 괄호/함량/제형/공백 제거)
+    text     : 공백을 유지한 기본 이름 (부분 문자열 검색용)
+    strength : 함량 숫자 (없으면 NaN)
+    unit     : 표준 단위 ('mg', 'mg/5ml' 등, 없으면 None)
+    form     : 제형 ('정', '서방정', '주사제' 등, 없으면 None)
+    """
+    if not isinstance(name, str):
+        return EMPTY_NAME
+    text = BRACKETS_RE.sub(' ', normalize_name(name))
+
+    strength, unit = float('nan'), None
+    matches = list(STRENGTH_RE.finditer(text))
+    if matches:
+        m = matches[-1]
+        strength = float(m.group(1).replace(',', ''))
+        unit = UNIT_ALIASES[m.group(2).lower()]
+        if m.group(4):
+            unit += '/' + (m.group(3) or '') + UNIT_ALIASES[m.group(4).lower()]
+        text = text[:m.start()] + ' ' + text[m.end():]
+
+    text = _SPACES_RE.sub(' ', text).strip(' -_')
+    form = None
+    m = FORM_RE.search(text)
+    if m and m.start() > 0:   # 이름 전체가 제형 단어인 경우는 그대로 둠
+        form = m.group(1)
+        text = text[:m.start()].strip(' -_')
+
+    return ParsedName(_SPACES_RE.sub('', text) or None, text or None, strength, unit, form)
+
+
+def moiety_key(name):
+    """성분명에서 염/에스터/수화물 표기를 떼어 낸 기본 성분(모이어티) 키.
+
+    'amlodipine besylate' → 'amlodipine', '와파린나트륨' → '와파린',
+    '아토르바스타틴칼슘삼수화물' → '아토르바스타틴'. 'calcium carbonate', '탄산칼슘', '글루콘산칼슘'처럼
+    양이온 쪽이 성분인 경우('…산' + 금속)나 남는 이름이 너무 짧은 경우는 그대로 둡니다.
+    """
+    text = normalize_name(name)
+    if not text:
+        return text
+    words = text.split(' ')
+    while len(words) > 1 and words[-1] in _SALT_WORD_SET:
+        words.pop()
+    last = words[-1]
+    stripped = True
+    while stripped and last.endswith(_SALT_SUFFIXES):   # 염 표기로 끝나지 않는 이름은 접미사를 하나씩 보지 않음
+        stripped = False
+        for suffix in SALT_WORDS:
+            if last.endswith(suffix):
+                stem = last[:-len(suffix)]
+                if len(stem) >= MIN_MOIETY_LEN and not stem.endswith('산'):
+                    last, stripped = stem, True
+                    break
+    words[-1] = last
+    return ' '.join(words)
+
+
+def clean_query(query):
+    """검색어 정제: 괄호와 끝의 제형 단어(주사제/정제/캡슐/시럽)를 제거하고 정규화(소문자)합니다.
+
+    자유 입력 검색과 특정 제품 필터에 쓰므로 함량과 '정' 등은 남겨 둡니다. (기본 이름은 parse_product_name)
+    """
+    if not query:
+        return ""
+    return normalize_name(QUERY_CLEAN_RE.sub('', str(query)).strip())
+
+
+def parse_component_question(prompt):
+    """'타이레놀 성분이 뭐야?' → '타이레놀' (성분 질문이 아니면 None, 이름이 비었으면 '')"""
+    match = COMPONENT_QUESTION_RE.match(prompt.strip())
+    if not match:
+        return None
+    return TRAILING_OF_RE.sub('', match.group(1).strip('() ')).strip()
+
+
+def parse_interaction_question(prompt):
+    """'타이레놀과 아스피린 같이 먹어도 돼?' → ('타이레놀', '아스피린') (알아볼 수 없으면 None)"""
+    prompt = prompt.strip()
+    for pattern in INTERACTION_QUESTION_RES:
+        match = pattern.match(prompt)
+        if match:
+            return match.group(1).strip('() '), match.group(2).strip('() ')
+    return None
+
+
+def split_drug_list(prompt):
+    """쉼표, 공백, 조사('과', '와', '랑', '하고')로 나눈 약물 이름 목록"""
+    return [part.strip() for part in DRUG_LIST_SPLIT_RE.split(prompt) if part.strip()]
+
+
+def load_alias_groups(path=ALIAS_FILE):
+    """별칭 파일을 읽어 서로 연결된 이름들(정규화된 이름)의 그룹 목록을 반환합니다.
+
+    A-B, B-C처럼 이어진 연결은 하나의 그룹 {A, B, C}가 됩니다. 파일이 없으면 빈 목록입니다.
+    """
+    if not path or not os.path.exists(path):
+        return []
+    parent = {}
+
+    def find(name):
+        root = parent.setdefault(name, name)
+        while parent[root] != root:
+            root = parent[root]
+        while parent[name] != root:   # 경로 압축
+            parent[name], name = root, parent[name]
+        return root
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for row in csv.reader(f):
+            names = [normalize_name(cell) for cell in row if cell.strip()]
+            if len(names) < 2 or row[0].strip() == '이름':   # 헤더 / 빈 줄
+                continue
+            for other in names[1:]:
+                parent[find(other)] = find(names[0])
+
+    groups = {}
+    for name in parent:
+        groups.setdefault(find(name), []).append(name)
+    return [tuple(sorted(members)) for members in groups.values()]
@@ -0,0 +1,97 @@
+# drug_reload.py
+# druglist.csv가 바뀌면 새 엔진을 백그라운드에서 만들고, 세션들이 쓰는 엔진 참조를 한 번에 교체합니다.
+# 각 요청(스크립트 실행)은 시작할 때 holder.current()를 한 번 받아 끝까지 사용하므로,
+# 교체 도중 처리 중이던 요청은 이전 버전으로 끝까지 처리됩니다.
+
+import os
+import threading
+import time
+
+RELOAD_INTERVAL = 5.0  # 파일 변경 확인 주기 (초)
+
+
+def file_signature(file_path):
+    """파일 변경 여부 판단용 (수정 시각, 크기). 파일이 없으면 None."""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class EngineHolder:
+    """현재 엔진 참조를 들고 있습니다. 교체는 참조 대입 한 번이라 읽는 쪽은 잠금이 필요 없습니다."""
+
+    def __init__(self, engine, version=1):
+        self._engine = engine
+        self.version = version
+        self.swapped_at = time.time()
+        self._lock = threading.Lock()
+
+    def current(self):
+        return self._engine
+
+    def swap(self, new_engine):
+        """새 엔진으로 교체하고 이전 엔진을 반환합니다."""
+        with self._lock:
+            old_engine = self._engine
+            self._engine = new_engine
+            self.version += 1
+            self.swapped_at = time.time()
+        return old_engine
+
+
+class PollingReloader(threading.Thread):
+    """데이터 파일을 주기적으로 확인하여 바뀌었으면 새 엔진을 만들어 교체합니다."""
+
+    def __init__(self, holder, file_path, build_engine, interval=RELOAD_INTERVAL):
+        super().__init__(name='drug-reloader', daemon=True)
+        self.holder = holder
+        self.file_path = file_path
+        self.build_engine = build_engine
+        self.interval = interval
+        self.last_error = None
+        self._signature = file_signature(file_path)
+        self._stop_event = threading.Event()
+
+    def check_once(self):
+        """변경이 있으면 다시 로드합니다. 교체했으면 True."""
+        signature = file_signature(self.file_path)
+        if signature is None or signature == self._signature:
+            return False
+
+        # 복사 중인 파일을 읽지 않도록, 한 주기 동안 변화가 없을 때만 로드
+        time.sleep(min(self.interval, 1.0))
+        if file_signature(self.file_path) != signature:
+            return False
+
+        start = time.perf_counter()
+        try:
+            new_engine = self.build_engine(self.file_path)
+        except Exception as e:
+            # 잘못된 파일이 올라와도 기존 엔진으로 계속 서비스
+            self.last_error = e
+            self._signature = signature
+            print(f"❌ 데이터 다시 로드 실패, 기존 버전 유지: {e}")
+            return False
+
+        old_engine = self.holder.swap(new_engine)
+        self._signature = signature
+        self.last_error = None
+        # 이전 엔진의 인덱스 생성/캐시 워밍을 멈추고 키-값 파일(mmap)을 닫은 뒤 캐시를 버림
+        # (멈추기 전에 채워진 항목까지 비우려고 close() 뒤에 비움, 처리 중인 요청은 자기 참조로 계속 진행)
+        if old_engine is not None:
+            old_engine.close()
+            old_engine.clear_caches()
+        print(f"✅ 데이터 다시 로드 완료 (버전 {self.holder.version}, {time.perf_counter() - start:.2f}초)")
+        return True
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check_once()
+            except Exception as e:
+                print(f"DEBUG: 다시 로드 감시 중 오류 - {e}")
+
+    def stop(self):
+        self._stop_event.set()
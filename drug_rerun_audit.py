@@ -0,0 +1,135 @@
+# drug_rerun_audit.py
+# Streamlit 스크립트를 여러 번 다시 실행하면서 최상위 문장(구역)별 실행 시간을 잽니다.
+# Streamlit은 클릭/입력마다 스크립트 전체를 다시 실행하므로, 여기서 보이는 '다시 실행' 시간이 매 상호작용의 고정 비용입니다.
+#
+#   python drug_rerun_audit.py drug_chatbot_v10.py --reruns 20
+#   python drug_rerun_audit.py app.py --prompt "타이레놀, 아스피린"
+#
+# 스크립트의 최상위 문장마다 시간 측정 코드를 끼워 넣은 사본(.audit_<이름>.py)을 같은 폴더에 만들어
+# streamlit.testing(AppTest)으로 실행하고, 끝나면 사본을 지웁니다.
+# 첫 실행(캐시 채우기), 입력 처리(--prompt), 이후 다시 실행을 따로 보고합니다.
+
+import argparse
+import ast
+import os
+import statistics
+import sys
+from time import perf_counter
+
+AUDIT_RERUNS = 10
+AUDIT_TIMEOUT = 120   # 실행 한 번의 최대 시간(초)
+AUDIT_TOP = 15        # 보고할 구역 수 (다시 실행 시간이 긴 순)
+
+_current = {}   # 구역 번호 → 이번 실행에서 걸린 시간 (실행마다 초기화)
+
+_WRAPPER = """
+__audit_t = __audit.perf_counter()
+try:
+    pass
+finally:
+    __audit.record({section}, __audit_t)
+"""
+
+
+def record(section, started):
+    """(측정용 사본에서 호출) 구역 하나의 실행 시간을 더합니다."""
+    _current[section] = _current.get(section, 0.0) + perf_counter() - started
+
+
+def instrument(source, filename='<script>'):
+    """최상위 문장마다 시간 측정 코드를 감싼 소스와 구역 목록 [(시작 줄, 끝 줄, 첫 줄 내용)]을 반환합니다."""
+    tree = ast.parse(source, filename)
+    lines = source.splitlines()
+    body, sections = [], []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module == '__future__':
+            body.insert(0, node)
+            continue
+        sections.append((node.lineno, node.end_lineno, lines[node.lineno - 1].strip()))
+        wrapper = ast.parse(_WRAPPER.format(section=len(sections) - 1)).body
+        wrapper[1].body = [node]
+        body.extend(wrapper)
+    header = ast.parse("import drug_rerun_audit as __audit").body
+    futures = sum(isinstance(node, ast.ImportFrom) and node.module == '__future__' for node in body)
+    tree.body = body[:futures] + header + body[futures:]
+    return ast.unparse(ast.fix_missing_locations(tree)), sections
+
+
+def audit_script(script, reruns=AUDIT_RERUNS, prompt=None, timeout=AUDIT_TIMEOUT):
+    """스크립트를 (첫 실행 + 입력 처리 + 다시 실행 reruns번) 실행하고 (구역 목록, 실행 목록)을 반환합니다.
+
+    실행 목록의 항목은 (종류, 전체 시간, {구역 번호: 시간})이며 종류는 'first' / 'prompt' / 'rerun'입니다.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    script = os.path.abspath(script)
+    with open(script, encoding='utf-8') as f:
+        code, sections = instrument(f.read(), script)
+    audit_path = os.path.join(os.path.dirname(script), f".audit_{os.path.basename(script)}")
+    with open(audit_path, 'w', encoding='utf-8') as f:
+        f.write(code)
+
+    kinds = ['first'] + (['prompt'] if prompt else []) + ['rerun'] * reruns
+    runs = []
+    try:
+        app = AppTest.from_file(audit_path, default_timeout=timeout)
+        for kind in kinds:
+            if kind == 'prompt':
+                if not app.chat_input:
+                    print("DEBUG: 입력창(chat_input)이 없어 --prompt를 건너뜁니다.", file=sys.stderr)
+                    continue
+                app.chat_input[0].set_value(prompt)
+            _current.clear()
+            started = perf_counter()
+            app.run()
+            runs.append((kind, perf_counter() - started, dict(_current)))
+            if app.exception:
+                print(f"DEBUG: 실행 중 예외 ({kind}) - {app.exception[0].value}", file=sys.stderr)
+    finally:
+        os.remove(audit_path)
+    return sections, runs
+
+
+def print_report(script, sections, runs, top=AUDIT_TOP):
+    by_kind = {}
+    for kind, total, _ in runs:
+        by_kind.setdefault(kind, []).append(total * 1000)
+    reruns = [times for kind, _, times in runs if kind == 'rerun']
+    summary = ", ".join(f"{kind} {statistics.median(ms):,.1f}ms" + (f" (x{len(ms)})" if len(ms) > 1 else "")
+                        for kind, ms in by_kind.items())
+    print(f"✅ {os.path.basename(script)}: {summary}")
+
+    first = next((times for kind, _, times in runs if kind == 'first'), {})
+    rows = []
+    for i, (start, end, text) in enumerate(sections):
+        rerun_ms = [times.get(i, 0.0) * 1000 for times in reruns]
+        rows.append((statistics.median(rerun_ms) if rerun_ms else 0.0, max(rerun_ms, default=0.0),
+                     first.get(i, 0.0) * 1000, start, end, text))
+    rows.sort(reverse=True)
+    print(f"   {'다시 실행(중앙값)':>14} {'최대':>9} {'첫 실행':>10}  구역")
+    for median_ms, max_ms, first_ms, start, end, text in rows[:top]:
+        lines = f"{start}" if start == end else f"{start}-{end}"
+        print(f"   {median_ms:>12.2f}ms {max_ms:>7.2f}ms {first_ms:>8.1f}ms  {lines:>9}: {text[:60]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit 스크립트의 다시 실행(rerun) 비용을 구역별로 측정")
+    parser.add_argument('script')
+    parser.add_argument('--reruns', type=int, default=AUDIT_RERUNS)
+    parser.add_argument('--prompt', help="첫 실행 뒤 입력창에 넣을 문장 (입력 처리 시간도 따로 측정)")
+    parser.add_argument('--timeout', type=float, default=AUDIT_TIMEOUT)
+    parser.add_argument('--top', type=int, default=AUDIT_TOP)
+    args = parser.parse_args(argv)
+
+    # 측정용 사본이 'import drug_rerun_audit'로 이 모듈(기록 저장소)을 그대로 쓰도록 등록
+    sys.modules.setdefault('drug_rerun_audit', sys.modules[__name__])
+    # 스크립트는 데이터 파일을 상대 경로로 읽으므로 스크립트 폴더에서 실행
+    script = os.path.abspath(args.script)
+    os.chdir(os.path.dirname(script))
+    sections, runs = audit_script(script, args.reruns, args.prompt, args.timeout)
+    print_report(script, sections, runs, args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
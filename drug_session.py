@@ -0,0 +1,320 @@
+# drug_session.py
+# Streamlit 세션 상태를 작게 유지하기 위한 도구입니다.
+# 세션에는 제품명 대신 프로세스 전체가 공유하는 이름 ID(int)를, 긴 분석 결과 문자열 대신 (역할, 종류, 인자) 참조를
+# 저장하고 화면에 그릴 때만 문자열로 바꿉니다. 인자에는 분석 당시 엔진 캐시(프로세스당 하나)의 결과 객체를 그대로 담으므로
+# 메모리에서는 세션마다 복사되지 않고, 엔진을 다시 로드하거나 캐시에서 밀려나도 지난 답은 그대로입니다.
+#
+#   ids = NAMES.ids(['타이레놀정500밀리그램', '아스피린정'])    → (0, 1)
+#   NAMES.names(ids)                                             → ['타이레놀정500밀리그램', '아스피린정']
+#   message = ('assistant', 'report', (len(ids), engine.interaction_report(NAMES.names(ids))))
+#                                                                # 화면에 그릴 때 render_message(message, renderers)
+#
+# SessionStore는 세션별 상태를 프로세스 전체 메모리 예산 안에서 보관합니다.
+# 오래 쓰지 않은 세션은 내보내고(디스크 보관소가 있으면 파일로 옮겼다가 다시 오면 불러옴), 세션별 크기를 보고합니다.
+#
+#   store = SessionStore(budget_bytes=64 << 20, idle_timeout=1800, spill=DiskSpill('sessions'))
+#   state = store.get(session_id)          # SessionData (dict, 속성으로도 접근: state.messages)
+#   store.stats(), store.session_sizes()
+
+import os
+import pickle
+import tempfile
+import threading
+import time
+import warnings
+
+TEXT = 'text'   # 인자가 그대로 표시할 문자열인 메시지 종류
+
+SESSION_BUDGET_BYTES = 256 << 20   # 메모리에 두는 전체 세션 상태의 크기 한도
+SESSION_IDLE_TIMEOUT = 1800.0      # 이 시간(초) 동안 요청이 없으면 메모리에서 내보냄
+SESSION_MIN_IDLE = 30.0            # 예산 초과로 내보낼 때도 이 시간 안에 쓴 세션(실행 중일 수 있음)은 건드리지 않음
+SESSION_SWEEP_INTERVAL = 5.0       # 크기 측정/내보내기 확인 주기 (초)
+SESSION_SPILL_TTL = 86400.0        # 디스크로 옮긴 세션을 지우기까지의 시간 (초)
+
+
+class NameTable:
+    """이름 ↔ 정수 ID. 추가만 하므로 한 번 받은 ID는 엔진이 다시 로드되어도 프로세스가 끝날 때까지 같은 이름입니다.
+
+    데이터에 있는 이름(검색 결과, 오타 보정 제안)만 넣어 크기가 데이터 어휘 수로 제한되게 합니다.
+    사용자가 입력한 문자열은 넣지 않습니다.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._lock = threading.Lock()
+
+    def id(self, name):
+        name_id = self._ids.get(name)
+        if name_id is None:
+            with self._lock:
+                name_id = self._ids.get(name)
+                if name_id is None:
+                    name_id = len(self._names)
+                    self._names.append(name)
+                    self._ids[name] = name_id
+        return name_id
+
+    def ids(self, names):
+        return tuple(self.id(name) for name in names)
+
+    def name(self, name_id):
+        return self._names[name_id]
+
+    def names(self, ids):
+        return [self._names[name_id] for name_id in ids]
+
+    def __len__(self):
+        return len(self._names)
+
+
+NAMES = NameTable()
+
+
+def text_message(role, text):
+    return role, TEXT, text
+
+
+def render_message(message, renderers):
+    """(역할, 종류, 인자) 메시지를 (역할, 마크다운)으로 바꿉니다. renderers: 종류 → 인자를 받아 마크다운을 만드는 함수"""
+    role, kind, arg = message
+    return role, arg if kind == TEXT else renderers[kind](arg)
+
+
+# --------------------------------------------------------------------------------------------------
+# 세션 보관소
+# --------------------------------------------------------------------------------------------------
+class SessionData(dict):
+    """세션 하나의 상태. dict이며 state.messages처럼 속성으로도 읽고 쓸 수 있습니다. (st.session_state와 같은 사용법)"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class DiskSpill:
+    """메모리에서 내보낸 세션을 로컬 디스크에 pickle 파일로 보관합니다.
+
+    save / load / delete / expire 네 메서드만 있으면 다른 보관소(공유 스토리지 등)로 바꿔 끼울 수 있습니다.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id):
+        safe = ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(session_id))
+        return os.path.join(self.directory, f"{safe}.pkl")
+
+    def save(self, session_id, payload):
+        # 임시 파일에 쓴 뒤 교체 (쓰는 도중 읽혀도 깨진 파일을 보지 않음)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, self._path(session_id))
+
+    def load(self, session_id):
+        """저장된 바이트를 읽고 파일을 지웁니다. 없으면 None."""
+        path = self._path(session_id)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        os.remove(path)
+        return payload
+
+    def delete(self, session_id):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def expire(self, ttl):
+        """ttl초보다 오래된 파일을 지우고 지운 개수를 반환합니다."""
+        cutoff = time.time() - ttl
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(('.pkl', '.tmp')) and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        return removed
+
+
+class SessionStore:
+    """세션 ID별 상태를 메모리 예산 안에서 보관합니다. (스레드 안전)
+
+    - get은 세션 상태 객체를 그대로 돌려주므로 스크립트는 평소처럼 고치기만 하면 됩니다.
+    - 크기는 주기적으로(sweep) 바뀐 세션만 pickle 크기로 다시 잽니다.
+      pickle과 디스크 쓰기는 잠금 밖에서 하므로, 그동안에도 다른 세션의 get은 기다리지 않습니다.
+    - idle_timeout 동안 쓰지 않은 세션, 그리고 예산을 넘으면 가장 오래 쓰지 않은 세션부터 내보냅니다.
+      spill이 있으면 파일로 옮기고 다음 get에서 다시 불러오며, 없으면 버립니다. (해당 사용자는 새 대화로 시작)
+    """
+
+    def __init__(self, budget_bytes=SESSION_BUDGET_BYTES, idle_timeout=SESSION_IDLE_TIMEOUT, spill=None,
+                 min_idle=SESSION_MIN_IDLE, sweep_interval=SESSION_SWEEP_INTERVAL, spill_ttl=SESSION_SPILL_TTL):
+        self.budget_bytes = budget_bytes
+        self.idle_timeout = idle_timeout
+        self.spill = spill
+        self.min_idle = min_idle
+        self.sweep_interval = sweep_interval
+        self.spill_ttl = spill_ttl
+        self._sessions = {}     # 세션 ID → SessionData
+        self._last_used = {}    # 세션 ID → 마지막 get 시각
+        self._sizes = {}        # 세션 ID → 마지막으로 잰 크기 (bytes)
+        self._dirty = set()     # 마지막 측정 뒤 get된 세션
+        self._spilled = set()
+        self._evicting = {}     # 세션 ID → (상태, 표식): 내보내는 중(디스크에 쓰는 중). 그 사이 get하면 그대로 되살림
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._over_budget = False
+        self.counts = {'created': 0, 'evicted_idle': 0, 'evicted_budget': 0, 'spilled': 0, 'restored': 0,
+                       'dropped': 0}
+
+    def get(self, session_id):
+        """세션 상태를 반환합니다. 없으면 (디스크에 있으면 불러오고, 아니면) 새로 만듭니다."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                evicting = self._evicting.pop(session_id, None)
+                state = evicting[0] if evicting is not None else self._restore(session_id)
+                if state is None:
+                    state = SessionData()
+                    self.counts['created'] += 1
+                self._sessions[session_id] = state
+            self._last_used[session_id] = now
+            self._dirty.add(session_id)
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(keep=session_id)
+        return state
+
+    def drop(self, session_id):
+        """세션을 메모리와 디스크에서 지웁니다."""
+        with self._lock:
+            self._forget(session_id)
+            self._spilled.discard(session_id)
+        if self.spill is not None:
+            self.spill.delete(session_id)
+
+    def sweep(self, keep=None):
+        """바뀐 세션의 크기를 다시 재고, 오래 쓰지 않은 세션과 예산을 넘는 세션을 내보냅니다.
+
+        잠금 안에서는 대상만 고르고, 크기 측정(pickle)과 디스크 보관은 잠금 밖에서 합니다.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._last_sweep = now
+            # 방금 get한 세션(keep)은 이제 고쳐질 것이므로 다음 측정에서
+            dirty = [(sid, self._sessions[sid], self._last_used[sid]) for sid in self._dirty
+                     if sid != keep and sid in self._sessions]
+
+        sizes = {}
+        for session_id, state, _ in dirty:
+            try:
+                sizes[session_id] = len(_dump(state))
+            except RuntimeError:   # 실행 중인 스크립트가 고치는 중 → 다음 측정에서
+                continue
+
+        with self._lock:
+            for session_id, _, used in dirty:
+                if session_id in sizes and session_id in self._sessions:
+                    self._sizes[session_id] = sizes[session_id]
+                    if self._last_used.get(session_id) == used:   # 잰 뒤에 다시 get되지 않았으면 측정 완료
+                        self._dirty.discard(session_id)
+
+            evict = [(sid, 'evicted_idle') for sid, used in self._last_used.items()
+                     if now - used >= self.idle_timeout and sid != keep]
+            idle = {sid for sid, _ in evict}
+            total = sum(size for sid, size in self._sizes.items() if sid not in idle)
+            if total > self.budget_bytes:
+                for session_id in sorted(self._last_used, key=self._last_used.get):
+                    if total <= self.budget_bytes:
+                        break
+                    if session_id in idle or session_id == keep or now - self._last_used[session_id] < self.min_idle:
+                        continue
+                    total -= self._sizes.get(session_id, 0)
+                    evict.append((session_id, 'evicted_budget'))
+            for session_id, reason in evict:
+                self._evicting[session_id] = (self._sessions[session_id], object())
+                self._forget(session_id)
+                self.counts[reason] += 1
+            over_budget = total > self.budget_bytes
+            started_over = over_budget and not self._over_budget
+            self._over_budget = over_budget
+
+        if started_over:   # 넘기 시작할 때 한 번만 알림
+            warnings.warn(f"세션 상태 {total:,}B가 예산 {self.budget_bytes:,}B를 넘지만 모두 사용 중입니다.",
+                          RuntimeWarning, stacklevel=2)
+        for session_id, _ in evict:
+            self._spill_out(session_id)
+        if self.spill is not None:
+            self.spill.expire(self.spill_ttl)
+
+    def session_size(self, session_id):
+        """마지막으로 잰 세션 크기 (bytes, 아직 재지 않았으면 0)"""
+        return self._sizes.get(session_id, 0)
+
+    def session_sizes(self):
+        """메모리에 있는 세션별 크기(bytes)와 마지막 사용 후 지난 시간(초)"""
+        now = time.monotonic()
+        with self._lock:
+            return {sid: {'bytes': self._sizes.get(sid, 0), 'idle_seconds': round(now - used, 1)}
+                    for sid, used in self._last_used.items()}
+
+    def stats(self):
+        with self._lock:
+            sizes = list(self._sizes.values())
+            return dict(self.counts, sessions=len(self._sessions), spilled_sessions=len(self._spilled),
+                        bytes=sum(sizes), max_session_bytes=max(sizes, default=0), budget_bytes=self.budget_bytes)
+
+    def _spill_out(self, session_id):
+        """내보내기로 고른 세션을 디스크에 씁니다. (잠금 밖에서 호출) 쓰는 동안 get되면 그 세션은 메모리에 남깁니다."""
+        with self._lock:
+            evicting = self._evicting.get(session_id)
+        if evicting is None:   # 쓰기 전에 이미 다시 get됨
+            return
+        saved = False
+        if self.spill is not None:
+            try:
+                self.spill.save(session_id, _dump(evicting[0]))
+                saved = True
+            except Exception as e:   # 저장할 수 없는 값이 있거나 디스크 오류 → 버림
+                warnings.warn(f"세션 디스크 보관 실패 - {e}", RuntimeWarning, stacklevel=3)
+        with self._lock:
+            revived = self._evicting.get(session_id) is not evicting
+            if not revived:
+                del self._evicting[session_id]
+                if saved:
+                    self._spilled.add(session_id)
+                self.counts['spilled' if saved else 'dropped'] += 1
+            # 쓰는 동안 다시 get됨 → 디스크 사본은 필요 없음 (그 사이 다시 내보내는 중이면 그쪽 파일이므로 둠)
+            stale = revived and saved and session_id not in self._evicting
+        if stale:
+            self.spill.delete(session_id)
+
+    # ---- 내부 (잠금 안에서 호출) ----
+    def _forget(self, session_id):
+        self._sessions.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        self._sizes.pop(session_id, None)
+        self._dirty.discard(session_id)
+
+    def _restore(self, session_id):
+        if self.spill is None or session_id not in self._spilled:
+            return None
+        self._spilled.discard(session_id)
+        payload = self.spill.load(session_id)
+        if payload is None:
+            return None
+        self.counts['restored'] += 1
+        return pickle.loads(payload)
+
+
+def _dump(state):
+    return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
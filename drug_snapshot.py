@@ -0,0 +1,293 @@
+# drug_snapshot.py
+# 데이터 + 인덱스 + 미리 계산된 위험도를 버전별 스냅샷 디렉터리로 저장하고,
+# 'CURRENT' 포인터 파일을 원자적으로 바꿔 서비스 버전을 전환/롤백합니다.
+#
+#   python drug_snapshot.py build druglist.csv      # 새 스냅샷 생성 후 CURRENT로 지정
+#   python drug_snapshot.py build big.csv --stream --chunk-mem-mb 128   # 청크 단위로 읽고 중복 제거 (drug_ingest)
+#                                                   # --chunk-mem-mb는 CSV 청크 크기 힌트일 뿐 최대 메모리를 제한하지 않음
+#                                                   # (중복 제거 상태와 인덱스 단계는 중복 제거 후 행 수에 비례)
+#   python drug_snapshot.py build dur_export.xml    # DUR 원본 XML/JSON/XLSX (drug_dur_import, 항상 스트리밍)
+#   python drug_snapshot.py build dur.xml hospital.csv manual.csv --source-name 식약처DUR --source-name 병원규칙
+#                                                   # 여러 원본을 합치고 중복 제거, 행별 출처 비트마스크 기록
+#   python drug_snapshot.py list                    # 스냅샷 목록과 매니페스트 비교
+#   python drug_snapshot.py rollback                # 직전 스냅샷으로 되돌리기
+#   python drug_snapshot.py use v0003-20261018-101500
+#
+# snapshots/
+#   CURRENT                       ← 현재 버전 이름 한 줄
+#   v0003-20261018-101500/
+#     data.pkl                    ← 검색용 컬럼과 위험도 컬럼이 포함된 데이터프레임
+#     columns/                    ← (--stream으로 만든 경우 data.pkl 대신) 문자열 사전 + 컬럼 파일
+#     indexes.pkl                 ← 이름 ID, 상호작용 쌍 키, 블룸 필터
+#     pairs.kv                    ← 성분 쌍별 최종 위험도/설명 (drug_kvstore)
+#     manifest.json               ← 행 수, 생성 시각, 해시, 생성 소요 시간
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import sys
+import time
+
+import pandas as pd
+
+from drug_engine import DATA_FILE, DrugEngine, load_dataframe
+from drug_dur_import import import_sources
+from drug_ingest import COLUMNS_DIR, INGEST_CHUNK_MEM_MB, read_columnar
+from drug_kvstore import PairStore, iter_pair_answers, write_pair_file
+
+SNAPSHOT_ROOT = 'snapshots'
+SNAPSHOT_KEEP = 5           # 보관할 최근 스냅샷 수 (CURRENT는 항상 보관)
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+_VERSION_RE = re.compile(r'^v(\d{4,})-\d{8}-\d{6}$')
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def list_versions(root=SNAPSHOT_ROOT):
+    """스냅샷 버전 이름을 오래된 순서로 반환합니다."""
+    if not os.path.isdir(root):
+        return []
+    versions = [name for name in os.listdir(root)
+                if _VERSION_RE.match(name) and os.path.exists(os.path.join(root, name, MANIFEST_FILE))]
+    return sorted(versions, key=lambda name: int(_VERSION_RE.match(name).group(1)))
+
+
+def current_version(root=SNAPSHOT_ROOT):
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def set_current(version, root=SNAPSHOT_ROOT):
+    """CURRENT 포인터를 임시 파일 + os.replace로 원자적으로 바꿉니다."""
+    if not os.path.exists(os.path.join(root, version, MANIFEST_FILE)):
+        raise FileNotFoundError(f"스냅샷 '{version}'이 없습니다.")
+    tmp_path = os.path.join(root, CURRENT_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def read_manifest(version, root=SNAPSHOT_ROOT):
+    with open(os.path.join(root, version, MANIFEST_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _next_version(root):
+    versions = list_versions(root)
+    number = int(_VERSION_RE.match(versions[-1]).group(1)) + 1 if versions else 1
+    return f"v{number:04d}-{time.strftime('%Y%m%d-%H%M%S')}"
+
+
+# --------------------------------------------------------------------------------------------------
+# 1. 생성
+# --------------------------------------------------------------------------------------------------
+def write_snapshot(df, root=SNAPSHOT_ROOT, source_path=None, source_sha256=None, started=None,
+                   make_current=True, keep=SNAPSHOT_KEEP, extra=None, indexes=None, pair_answers=None,
+                   columns_dir=None):
+    """로드된 데이터프레임으로 새 스냅샷 버전을 만듭니다. 만들어진 버전 이름을 반환합니다.
+
+    indexes / pair_answers를 넘기면 (증분 반영 등) 다시 계산하지 않고 그대로 저장합니다.
+    columns_dir(drug_ingest가 쓴 컬럼 파일)을 넘기면 data.pkl 대신 그 디렉터리를 옮겨 담습니다.
+    """
+    started = started if started is not None else time.perf_counter()
+    os.makedirs(root, exist_ok=True)
+    version = _next_version(root)
+    tmp_dir = os.path.join(root, '.' + version + '.tmp')
+    os.makedirs(tmp_dir)
+
+    try:
+        if indexes is None:
+            indexes = DrugEngine(df).export_indexes()
+        if pair_answers is None:
+            pair_answers = iter_pair_answers(df, source_names(extra))
+        if columns_dir is not None:
+            os.replace(columns_dir, os.path.join(tmp_dir, COLUMNS_DIR))
+        else:
+            df.to_pickle(os.path.join(tmp_dir, 'data.pkl'))
+        with open(os.path.join(tmp_dir, 'indexes.pkl'), 'wb') as f:
+            pickle.dump(indexes, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pair_count = write_pair_file(pair_answers, os.path.join(tmp_dir, 'pairs.kv'))
+
+        files = {}
+        for dirpath, _, names in os.walk(tmp_dir):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                files[os.path.relpath(path, tmp_dir)] = {'bytes': os.path.getsize(path), 'sha256': file_sha256(path)}
+        files = dict(sorted(files.items()))
+
+        manifest = {
+            'version': version,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'source': os.path.abspath(source_path) if source_path else None,
+            'source_sha256': source_sha256,
+            'rows': int(len(df)),
+            'names': int(len(indexes['name_vocab'])),
+            'interacting_name_pairs': int(len(indexes['pair_keys'])),
+            'aliases': int(len(indexes['alias_table'])) if 'alias_table' in indexes else 0,
+            'ingredient_pairs': int(pair_count),
+            'files': files,
+        }
+        manifest.update(extra or {})
+        manifest['build_seconds'] = round(time.perf_counter() - started, 3)
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # 완성된 디렉터리만 버전 이름으로 보이게 함
+        os.replace(tmp_dir, os.path.join(root, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if make_current:
+        set_current(version, root)
+    prune_snapshots(root, keep)
+    print(f"✅ 스냅샷 생성 완료: {version} ({manifest['rows']}행, {manifest['build_seconds']:.2f}초)")
+    return version
+
+
+def build_snapshot(csv_path=DATA_FILE, root=SNAPSHOT_ROOT, make_current=True, keep=SNAPSHOT_KEEP,
+                   stream=False, chunk_mem_mb=INGEST_CHUNK_MEM_MB, names=None):
+    """원본 파일(들)로부터 새 스냅샷을 만듭니다.
+
+    csv_path에 경로 목록을 주면 여러 원본을 합칩니다. 이때, 또는 stream=True이거나
+    CSV가 아닌 파일(DUR XML/JSON/XLSX)이면 청크 단위로 읽어 컬럼 파일로 저장합니다.
+    """
+    started = time.perf_counter()
+    paths = [csv_path] if isinstance(csv_path, str) else list(csv_path)
+    if len(paths) == 1 and not stream and paths[0].lower().endswith('.csv'):
+        df = load_dataframe(paths[0])
+        return write_snapshot(df, root, source_path=paths[0], source_sha256=file_sha256(paths[0]),
+                              started=started, make_current=make_current, keep=keep)
+
+    os.makedirs(root, exist_ok=True)
+    columns_dir = os.path.join(root, f'.ingest-{os.getpid()}.tmp')
+    try:
+        stats = import_sources(paths, columns_dir, chunk_mem_mb, names=names)
+        sources = stats.pop('sources')
+        hashes = [file_sha256(path) for path in paths]
+        for source, path, sha in zip(sources, paths, hashes):
+            source.update(path=os.path.abspath(path), sha256=sha)
+        # 원본이 여럿이면 각 원본 해시를 합친 값을 대표 해시로 사용
+        combined = hashes[0] if len(hashes) == 1 else hashlib.sha256(''.join(hashes).encode()).hexdigest()
+
+        df = read_columnar(columns_dir)
+        return write_snapshot(df, root, source_path=paths[0] if len(paths) == 1 else None,
+                              source_sha256=combined, started=started, make_current=make_current, keep=keep,
+                              extra={'ingest': stats, 'sources': sources}, columns_dir=columns_dir)
+    finally:
+        shutil.rmtree(columns_dir, ignore_errors=True)
+
+
+def source_names(manifest):
+    """매니페스트의 원본 이름 목록 (출처 비트 순서). 원본 정보가 없으면 빈 목록."""
+    return [source['name'] for source in sorted((manifest or {}).get('sources', []), key=lambda s: s['bit'])]
+
+
+def prune_snapshots(root=SNAPSHOT_ROOT, keep=SNAPSHOT_KEEP):
+    """최근 keep개와 CURRENT를 제외한 오래된 스냅샷을 지웁니다."""
+    versions = list_versions(root)
+    current = current_version(root)
+    for version in versions[:-keep] if keep > 0 else versions:
+        if version != current:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+# --------------------------------------------------------------------------------------------------
+# 2. 불러오기 / 롤백
+# --------------------------------------------------------------------------------------------------
+def read_snapshot(version=None, root=SNAPSHOT_ROOT):
+    """스냅샷(기본값: CURRENT)의 (버전, 데이터프레임, 인덱스, 키-값 파일 경로)를 반환합니다."""
+    version = version or current_version(root)
+    if not version:
+        raise FileNotFoundError(f"'{root}/{CURRENT_FILE}'이 없습니다.")
+    snapshot_dir = os.path.join(root, version)
+
+    columns_dir = os.path.join(snapshot_dir, COLUMNS_DIR)
+    if os.path.isdir(columns_dir):
+        df = read_columnar(columns_dir)
+    else:
+        df = pd.read_pickle(os.path.join(snapshot_dir, 'data.pkl'))
+    with open(os.path.join(snapshot_dir, 'indexes.pkl'), 'rb') as f:
+        indexes = pickle.load(f)
+    return version, df, indexes, os.path.join(snapshot_dir, 'pairs.kv')
+
+
+def load_snapshot_engine(version=None, root=SNAPSHOT_ROOT, cache_size=4096):
+    """스냅샷(기본값: CURRENT)으로 엔진을 만듭니다. CSV 파싱과 인덱스 생성이 필요 없습니다."""
+    version, df, indexes, pair_path = read_snapshot(version, root)
+    pair_store = PairStore(pair_path)
+
+    engine = DrugEngine(df, cache_size=cache_size, pair_store=pair_store, indexes=indexes,
+                        source_names=source_names(read_manifest(version, root)))
+    engine.version = version
+    print(f"✅ (engine) 스냅샷 {version} 로드 완료! (총 {len(df)}행)")
+    return engine
+
+
+def rollback(root=SNAPSHOT_ROOT):
+    """CURRENT를 바로 이전 버전으로 되돌립니다."""
+    versions = list_versions(root)
+    current = current_version(root)
+    if current not in versions or versions.index(current) == 0:
+        raise ValueError("되돌릴 이전 스냅샷이 없습니다.")
+    previous = versions[versions.index(current) - 1]
+    set_current(previous, root)
+    return previous
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="버전별 데이터 스냅샷 관리")
+    parser.add_argument('--root', default=SNAPSHOT_ROOT)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="CSV 또는 DUR 원본 파일(여러 개 가능)로 새 스냅샷 생성")
+    build.add_argument('csv', nargs='*', default=[DATA_FILE])
+    build.add_argument('--source-name', action='append', default=[], help="원본 이름 (원본 순서대로, 기본: 파일 이름)")
+    build.add_argument('--keep', type=int, default=SNAPSHOT_KEEP)
+    build.add_argument('--no-switch', action='store_true', help="CURRENT는 바꾸지 않음")
+    build.add_argument('--stream', action='store_true', help="원본을 청크 단위로 읽어 컬럼 파일로 변환 (전체 CSV를 한 번에 파싱하지 않음)")
+    build.add_argument('--chunk-mem-mb', type=int, default=INGEST_CHUNK_MEM_MB,
+                       help="CSV 한 청크에 쓸 메모리 목표 (청크 크기 힌트, 최대 RSS를 제한하지는 않음)")
+
+    sub.add_parser('list', help="스냅샷 목록")
+    sub.add_parser('rollback', help="직전 스냅샷으로 되돌리기")
+    use = sub.add_parser('use', help="지정한 스냅샷으로 전환")
+    use.add_argument('version')
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build_snapshot(args.csv, args.root, make_current=not args.no_switch, keep=args.keep,
+                       stream=args.stream, chunk_mem_mb=args.chunk_mem_mb, names=args.source_name)
+    elif args.command == 'list':
+        current = current_version(args.root)
+        for version in list_versions(args.root):
+            m = read_manifest(version, args.root)
+            mark = '*' if version == current else ' '
+            print(f"{mark} {version}  {m['rows']:>8}행  {m['ingredient_pairs']:>7}쌍  "
+                  f"{m['build_seconds']:>7.2f}초  {m['created_at']}  source={str(m['source_sha256'])[:12]}")
+    elif args.command == 'rollback':
+        print(f"✅ CURRENT → {rollback(args.root)}")
+    else:
+        set_current(args.version, args.root)
+        print(f"✅ CURRENT → {args.version}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# drug_warmup.py
+# 서버 시작 직후 자주 조회되는 약물/조합의 결과를 엔진 캐시에 미리 채워둡니다.
+# 워밍은 백그라운드 스레드에서 실행되므로 UI는 바로 사용할 수 있습니다.
+
+import os
+import threading
+import time
+from collections import Counter
+
+QUERY_LOG_PATH = 'query_log.txt'   # 조회 기록 파일 (사용자 동작 하나에 한 줄, 이름은 탭으로 구분)
+QUERY_LOG_MAX_BYTES = 4 << 20      # 이 크기를 넘으면 '.1'로 돌리고 새 파일로 (기록은 최대 두 파일)
+WARMUP_TOP_N = 200                 # 조회 기록에서 워밍할 상위 항목 수
+
+# 조회 기록이 없을 때도 항상 워밍할 인기 조합/약물 (필요시 추가)
+WARMUP_PAIRS = []                  # 예: [("타이레놀", "아스피린")]
+WARMUP_NAMES = []                  # 예: ["타이레놀"]
+
+_log_lock = threading.Lock()
+
+
+def append_query_log(entries, log_path=QUERY_LOG_PATH, max_bytes=QUERY_LOG_MAX_BYTES):
+    """사용자 동작 하나의 조회 기록을 한 번에 추가합니다.
+
+    entries: 이름 tuple 목록. 이름 1개 = 검색, 2개 이상 = 그 약물들의 상호작용 분석 (쌍마다 기록하지 않음)
+    파일이 max_bytes를 넘으면 '<log_path>.1'로 옮기고(이전 .1은 덮어씀) 새 파일에 씁니다.
+    """
+    lines = []
+    for names in entries:
+        names = [str(n).replace('\t', ' ').replace('\n', ' ').strip() for n in names]
+        if names and all(names):
+            lines.append('\t'.join(names) + '\n')
+    if not lines:
+        return
+    try:
+        with _log_lock:
+            try:
+                if os.path.getsize(log_path) >= max_bytes:
+                    os.replace(log_path, log_path + '.1')
+            except FileNotFoundError:
+                pass
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+    except OSError as e:
+        print(f"DEBUG: 조회 기록 저장 실패 - {e}")
+
+
+def read_query_log(log_path=QUERY_LOG_PATH):
+    """조회 기록 파일(과 돌려 둔 '.1' 파일)을 읽어 (이름,) 또는 (이름A, 이름B, ...) 별 조회 횟수를 셉니다."""
+    counts = Counter()
+    if not log_path:
+        return counts
+    for path in (log_path + '.1', log_path):
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                parts = tuple(p.strip() for p in line.rstrip('\n').split('\t') if p.strip())
+                if parts:
+                    counts[parts] += 1
+    return counts
+
+
+def select_warmup_targets(log_counts, top_n=WARMUP_TOP_N, pairs=WARMUP_PAIRS, names=WARMUP_NAMES):
+    """설정된 목록을 먼저, 그 다음 조회 기록 상위 N개를 중복 없이 고릅니다."""
+    targets = [tuple(p) for p in pairs] + [(n,) for n in names]
+    for entry, _ in log_counts.most_common(top_n):
+        targets.append(entry)
+    return list(dict.fromkeys(targets))
+
+
+def _warm_entry(engine, entry):
+    if len(entry) == 1:
+        engine.search_products(entry[0])
+        engine.find_drug_info(entry[0])
+        return
+    engine.interaction_report(list(entry))   # app.py 상호작용 분석 (약물 목록 단위)
+    if len(entry) == 2:
+        engine.check_interaction(*entry)
+        engine.check_drug_interaction_flexible(*entry)
+
+
+def run_warmup(engine, targets, log_counts=None, report=None):
+    """targets의 결과를 캐시에 채우고, 소요 시간과 커버리지를 report에 기록합니다."""
+    report = report if report is not None else {}
+    log_counts = log_counts or Counter()
+    report.update({'status': 'running', 'total': len(targets), 'done': 0, 'failed': 0,
+                   'duration': 0.0, 'coverage': 0.0})
+
+    start = time.perf_counter()
+    warmed = set()
+    for entry in targets:
+        if engine.closed:   # 다시 로드로 교체된 엔진이면 더 채우지 않고 멈춤
+            report['status'] = 'stopped'
+            print(f"DEBUG: 엔진이 닫혀 캐시 워밍을 중단합니다. ({report['done']}/{len(targets)}개)")
+            return report
+        try:
+            _warm_entry(engine, entry)
+            warmed.add(entry)
+        except Exception as e:
+            report['failed'] += 1
+            print(f"DEBUG: 캐시 워밍 실패 {entry} - {e}")
+        report['done'] += 1
+        report['duration'] = time.perf_counter() - start
+
+    # 커버리지: 조회 기록 전체 조회량 중 워밍된 항목이 차지하는 비율
+    total_queries = sum(log_counts.values())
+    if total_queries:
+        report['coverage'] = sum(c for e, c in log_counts.items() if e in warmed) / total_queries
+    report['status'] = 'done'
+
+    print(f"✅ 캐시 워밍 완료: {len(warmed)}/{len(targets)}개, "
+          f"조회량 기준 커버리지 {report['coverage']:.1%}, {report['duration']:.2f}초")
+    return report
+
+
+def start_warmup(engine, log_path=QUERY_LOG_PATH, top_n=WARMUP_TOP_N, pairs=WARMUP_PAIRS, names=WARMUP_NAMES):
+    """백그라운드 스레드에서 워밍을 시작하고 (스레드, 진행 상황 dict)를 반환합니다."""
+    log_counts = read_query_log(log_path)
+    targets = select_warmup_targets(log_counts, top_n, pairs, names)
+    report = {'status': 'pending', 'total': len(targets), 'done': 0, 'failed': 0,
+              'duration': 0.0, 'coverage': 0.0}
+
+    thread = engine.start_background(run_warmup, 'drug-warmup', engine, targets, log_counts, report)
+    return thread, report
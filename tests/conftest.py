@@ -0,0 +1,47 @@
+# tests/conftest.py
+# 저장소 루트의 모듈(drug_engine 등)을 그대로 import하고, 작은 데이터로 엔진을 만드는 도우미를 제공합니다.
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+import warnings
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = os.path.join(ROOT, 'samples')
+sys.path.insert(0, ROOT)
+
+warnings.filterwarnings('ignore', message='Using slow pure-python SequenceMatcher')
+
+from drug_engine import BASE_COLUMNS, DrugEngine, prepare_dataframe  # noqa: E402
+
+
+def make_engine(rows, build=False, alias_file=os.path.join(ROOT, 'aliases.csv')):
+    """(제품명A, 성분명A, 제품명B, 성분명B, 상세정보) 행 목록으로 엔진을 만듭니다.
+
+    build=True면 백그라운드 인덱스를 모두 만든 뒤 반환하고, False면 인덱스 없이(scan) 응답하는 엔진입니다.
+    """
+    df = pd.DataFrame(rows, columns=BASE_COLUMNS).drop_duplicates(ignore_index=True)
+    engine = DrugEngine(prepare_dataframe(df))
+    engine.alias_file = alias_file
+    if build:
+        engine.start_index_build()
+        engine.wait_for_indexes()
+    return engine
+
+
+def base_rows(df):
+    """원본 5개 컬럼을 순서 무관 비교용 (결측은 None) 튜플 목록으로"""
+    values = df[BASE_COLUMNS].astype(object).where(df[BASE_COLUMNS].notna(), None)
+    return sorted(map(tuple, values.itertuples(index=False)), key=lambda row: tuple(str(v) for v in row))
+
+
+@pytest.fixture
+def engine_pair():
+    """같은 행으로 만든 (인덱스 없는 엔진, 인덱스를 모두 만든 엔진)을 돌려주는 함수"""
+    def factory(rows):
+        return make_engine(rows), make_engine(rows, build=True)
+    return factory
@@ -0,0 +1,133 @@
+# tests/test_api.py
+# 임시 포트에 drug_api 서버를 띄우고, HTTP로 받은 답(JSON, SSE)이 DrugEngine을 직접 호출한 답과 같은지 확인합니다.
+
+import asyncio
+import http.client
+import json
+import os
+import socket
+import threading
+from urllib.parse import urlencode
+
+import pandas as pd
+import pytest
+
+from conftest import SAMPLES, make_engine
+from drug_api import DrugApi, DrugApiServer
+
+DRUGS = ['아스피린프로텍트정100밀리그램', '쿠마딘정2밀리그램', '리피토정10밀리그램', '클래리시드정250밀리그램',
+         '코다론정', '시프로바이정250밀리그램', '레일라정', '트라마돌캡슐']
+TEXT_DRUGS = ['아스피린', '와파린', '리피토', '클래리시드', '타이레놀']
+
+
+@pytest.fixture(scope='module')
+def sample_rows():
+    df = pd.read_csv(os.path.join(SAMPLES, 'dur_sample.csv'), encoding='utf-8', dtype=str)
+    return [tuple(row) for row in df.itertuples(index=False)]
+
+
+@pytest.fixture(scope='module')
+def engine(sample_rows):
+    """기대값 계산용 (서버와 캐시를 나눠 쓰지 않도록 따로 만든 엔진)"""
+    return make_engine(sample_rows, build=True)
+
+
+@pytest.fixture(scope='module')
+def server(sample_rows):
+    api = DrugApi(make_engine(sample_rows, build=True), workers=2)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(DrugApiServer(api, '127.0.0.1', 0).start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=10)
+    loop.close()
+    api.close()
+
+
+def request(server, method, path, params=None, data=None):
+    """(상태 코드, Content-Type, 본문 문자열)"""
+    conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=30)
+    try:
+        target = f"{path}?{urlencode(params)}" if params else path
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8') if data is not None else None
+        conn.request(method, target, body=body)
+        response = conn.getresponse()
+        return response.status, response.getheader('Content-Type'), response.read().decode('utf-8')
+    finally:
+        conn.close()
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@pytest.mark.parametrize('mode, a, b', [
+    ('product', '아스피린프로텍트정100밀리그램', '쿠마딘정2밀리그램'),
+    ('product', '쿠마딘정2밀리그램', '리피토정10밀리그램'),
+    ('text', '와파린', '아스피린'),
+    ('text', '비아그라정50밀리그램', '니트로글리세린'),
+    ('ingredient', '아토르바스타틴칼슘', '클래리트로마이신'),
+])
+def test_interaction_matches_engine(server, engine, mode, a, b):
+    status, content_type, body = request(server, 'GET', '/interaction', {'a': a, 'b': b, 'mode': mode})
+    assert status == 200 and content_type.startswith('application/json')
+    check = {'product': engine.check_interaction, 'text': engine.check_drug_interaction_flexible,
+             'ingredient': engine.check_ingredient_pair}[mode]
+    risk, explanation = check(a, b)
+    assert json.loads(body) == {'a': a, 'b': b, 'mode': mode, 'risk': risk, 'explanation': explanation}
+
+
+@pytest.mark.parametrize('mode, drugs', [('product', DRUGS), ('text', TEXT_DRUGS)])
+def test_polypharmacy_matches_engine(server, engine, mode, drugs):
+    status, _, body = request(server, 'POST', '/polypharmacy', data={'drugs': drugs, 'mode': mode})
+    assert status == 200
+    data = json.loads(body)
+    rows = engine.check_prescriptions([drugs], mode)[0]
+    assert data['pairs_checked'] == len(rows) == len(drugs) * (len(drugs) - 1) // 2
+    assert data['interactions'] == [{'a': a, 'b': b, 'risk': risk, 'explanation': exp}
+                                    for a, b, risk, exp in rows if risk != "안전"]
+    assert data['found_risk']
+
+
+@pytest.mark.parametrize('mode, drugs', [('product', DRUGS), ('text', TEXT_DRUGS)])
+def test_polypharmacy_stream_matches_engine(server, engine, mode, drugs):
+    status, content_type, body = request(server, 'GET', '/polypharmacy/stream',
+                                         {'drugs': ','.join(drugs), 'mode': mode})
+    assert status == 200 and content_type.startswith('text/event-stream')
+    events = parse_events(body)
+    assert [name for name, _ in events[:-1]] == ['interaction'] * (len(events) - 1)
+
+    expected = [{'a': a, 'b': b, 'risk': risk, 'explanation': exp}
+                for a, b, risk, exp in engine.iter_interactions(drugs, mode)]
+    assert [payload for _, payload in events[:-1]] == expected
+
+    name, summary = events[-1]
+    assert name == 'summary'
+    assert summary['pairs_checked'] == len(drugs) * (len(drugs) - 1) // 2
+    assert sum(summary['counts'].values()) == len(expected)
+
+
+def test_errors_are_json(server):
+    status, _, body = request(server, 'GET', '/interaction', {'a': '와파린'})
+    assert status == 400 and 'error' in json.loads(body)
+    status, _, body = request(server, 'GET', '/nowhere')
+    assert status == 404 and 'error' in json.loads(body)
+    for length in ('abc', '-5', '1.5'):
+        status, body = raw_request(server, f"POST /polypharmacy HTTP/1.1\r\nContent-Length: {length}\r\n\r\n")
+        assert status == 400 and 'Content-Length' in json.loads(body)['error']
+
+
+def raw_request(server, head):
+    """헤더를 그대로 보내고 (상태 코드, 본문 문자열)을 받습니다. (http.client가 막는 잘못된 헤더용)"""
+    with socket.create_connection(('127.0.0.1', server.port), timeout=30) as sock:
+        sock.sendall(head.encode('latin-1'))
+        response = http.client.HTTPResponse(sock)
+        response.begin()
+        return response.status, response.read().decode('utf-8')
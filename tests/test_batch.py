@@ -0,0 +1,136 @@
+# tests/test_batch.py
+# 처방 일괄 확인(drug_batch): 입력 형식별 읽기, 엔진과 같은 결과, 입력 순서대로 쓰기(맡겨 둔 묶음 수 제한)를 확인합니다.
+
+import csv
+import json
+import os
+
+import pytest
+
+import drug_batch
+from conftest import SAMPLES
+from drug_batch import PrescriptionReader, run_batch
+from drug_engine import DrugEngine
+
+SAMPLE_CSV = os.path.join(SAMPLES, 'dur_sample.csv')
+PRODUCTS = ['아스피린프로텍트정100밀리그램', '쿠마딘정2밀리그램', '리피토정10밀리그램', '클래리시드정250밀리그램',
+            '조코정20밀리그램', '이트라정', '딜라트렌정', '베라실정', '없는약정']
+
+
+def _prescriptions(count):
+    """서로 다른 약물 목록 count개 (결과가 처방마다 달라 순서가 틀리면 드러남)"""
+    return [(f'RX{i:03d}', [PRODUCTS[i % len(PRODUCTS)], PRODUCTS[(i * 5 + 1) % len(PRODUCTS)],
+                            PRODUCTS[(i * 7 + 3) % len(PRODUCTS)]]) for i in range(count)]
+
+
+def _write_jsonl(path, prescriptions):
+    with open(path, 'w', encoding='utf-8') as f:
+        for rx_id, drugs in prescriptions:
+            f.write(json.dumps({'id': rx_id, 'drugs': drugs}, ensure_ascii=False) + '\n')
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return DrugEngine.from_csv(SAMPLE_CSV)
+
+
+def test_jsonl_reader(tmp_path):
+    path = tmp_path / 'rx.jsonl'
+    path.write_text('{"id": "A", "drugs": ["x정", "y정"]}\n\n["z정", "w정"]\n{"drugs": null}\n', encoding='utf-8')
+    assert list(PrescriptionReader(str(path))) == [('A', ['x정', 'y정']), ('3', ['z정', 'w정']), ('4', [])]
+
+
+def test_csv_reader_drugs_column(tmp_path):
+    path = tmp_path / 'rx.csv'
+    path.write_text('id,drugs\nA,"x정, y정;z정 | w정"\nB,\n', encoding='utf-8-sig')
+    assert list(PrescriptionReader(str(path))) == [('A', ['x정', 'y정', 'z정', 'w정']), ('B', [])]
+
+
+def test_csv_reader_groups_consecutive_rows_by_id(tmp_path):
+    path = tmp_path / 'rx.csv'
+    path.write_text('처방번호,약물명\nA,x정\nA, y정 \nB,z정\nB,\nA,w정\n', encoding='utf-8')
+    # 같은 id라도 떨어져 있으면 다른 처방 (입력을 한 번만 훑음)
+    assert list(PrescriptionReader(str(path))) == [('A', ['x정', 'y정']), ('B', ['z정']), ('A', ['w정'])]
+
+
+def test_csv_reader_requires_columns(tmp_path):
+    path = tmp_path / 'rx.csv'
+    path.write_text('name\nx정\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(PrescriptionReader(str(path)))
+
+
+@pytest.mark.parametrize('mode', ['product', 'text'])
+def test_jsonl_output_matches_engine(tmp_path, engine, mode):
+    prescriptions = _prescriptions(25)
+    out = str(tmp_path / 'out.jsonl')
+    stats = run_batch(_write_jsonl(tmp_path / 'rx.jsonl', prescriptions), out, mode, workers=1, chunk_size=4,
+                      snapshot_root=str(tmp_path), csv_path=SAMPLE_CSV, progress=False)
+
+    expected = engine.check_prescriptions([drugs for _, drugs in prescriptions], mode)
+    with open(out, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [r['id'] for r in records] == [rx_id for rx_id, _ in prescriptions]
+    for record, (_, drugs), rows in zip(records, prescriptions, expected):
+        assert record['drugs'] == list(dict.fromkeys(drugs))
+        assert record['pairs_checked'] == len(rows)
+        assert record['interactions'] == [{'a': a, 'b': b, 'risk': r, 'explanation': e}
+                                          for a, b, r, e in rows if r != "안전"]
+        assert record['found_risk'] == bool(record['interactions'])
+    assert stats['prescriptions'] == len(prescriptions)
+    assert stats['flagged_pairs'] == sum(len(r['interactions']) for r in records)
+
+
+def test_csv_input_and_output(tmp_path, engine):
+    prescriptions = _prescriptions(12)
+    path = tmp_path / 'rx.csv'
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['id', 'drug'])
+        for rx_id, drugs in prescriptions:
+            w.writerows([rx_id, d] for d in drugs)
+    out = str(tmp_path / 'out.csv')
+    run_batch(str(path), out, workers=1, chunk_size=5, snapshot_root=str(tmp_path), csv_path=SAMPLE_CSV,
+              progress=False)
+
+    expected = engine.check_prescriptions([drugs for _, drugs in prescriptions])
+    with open(out, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['id', 'a', 'b', 'risk', 'explanation']
+    assert rows[1:] == [[rx_id, a, b, r, e] for (rx_id, _), result in zip(prescriptions, expected)
+                        for a, b, r, e in result if r != "안전"]
+
+
+def test_two_workers_keep_input_order_with_bounded_window(tmp_path, engine, monkeypatch):
+    written = []
+    in_flight = []
+
+    class SpyWriter(drug_batch.ResultWriter):
+        def write(self, rx_id, drugs, rows):
+            written.append(rx_id)
+            return super().write(rx_id, drugs, rows)
+
+    class SpyPool(drug_batch.ProcessPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            SpyPool.submitted += 1
+            in_flight.append(SpyPool.submitted - len(written))   # chunk_size=1 → 묶음 수 = 처방 수
+            return super().submit(*args, **kwargs)
+
+    monkeypatch.setattr(drug_batch, 'ResultWriter', SpyWriter)
+    monkeypatch.setattr(drug_batch, 'ProcessPoolExecutor', SpyPool)
+    prescriptions = _prescriptions(40)
+    out = str(tmp_path / 'out.jsonl')
+    stats = run_batch(_write_jsonl(tmp_path / 'rx.jsonl', prescriptions), out, workers=2, chunk_size=1,
+                      snapshot_root=str(tmp_path), csv_path=SAMPLE_CSV, progress=False)
+
+    assert stats['workers'] == 2 and stats['prescriptions'] == 40
+    assert written == [rx_id for rx_id, _ in prescriptions]
+    assert max(in_flight) == 2 * drug_batch.BATCH_INFLIGHT_PER_WORKER
+    expected = engine.check_prescriptions([drugs for _, drugs in prescriptions])
+    with open(out, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [r['pairs_checked'] for r in records] == [len(rows) for rows in expected]
+    assert [len(r['interactions']) for r in records] == [sum(x[2] != "안전" for x in rows) for rows in expected]
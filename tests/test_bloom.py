@@ -0,0 +1,87 @@
+# tests/test_bloom.py
+# 상호작용 쌍 블룸 필터에 거짓 음성(실제로 있는 쌍을 '없음'으로 판정)이 없는지 확인합니다.
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SAMPLES, make_engine
+from drug_bloom import BloomFilter, measure, pair_id
+from drug_engine import PAIR_FILTER_FP_RATE
+
+
+def _synthetic_rows(n_rows=3000, n_products=400, n_ingredients=120, seed=0):
+    rng = np.random.default_rng(seed)
+    products = rng.integers(0, n_products, size=(n_rows, 2))
+    ingredients = rng.integers(0, n_ingredients, size=(n_rows, 2))
+    missing = rng.random((n_rows, 2)) < 0.05   # 성분명이 비어 있는 행도 섞음
+    return [(f'제품{a}정', None if ma else f'성분{ia}', f'제품{b}캡슐', None if mb else f'성분{ib}', '병용 주의')
+            for (a, b), (ia, ib), (ma, mb) in zip(products, ingredients, missing)]
+
+
+@pytest.fixture(scope='module')
+def synthetic_engine():
+    return make_engine(_synthetic_rows())
+
+
+def test_no_false_negatives_for_random_keys():
+    rng = np.random.default_rng(1)
+    keys = rng.integers(0, np.iinfo(np.uint64).max, size=20000, dtype=np.uint64, endpoint=True)
+    bloom = BloomFilter.from_keys(keys, 0.01)
+    assert all(int(key) in bloom for key in keys)   # numpy로 만든 비트와 파이썬 정수 조회가 같은 위치
+
+    probes = rng.integers(0, np.iinfo(np.uint64).max, size=20000, dtype=np.uint64, endpoint=True)
+    fp = sum(int(key) in bloom for key in np.setdiff1d(probes, keys))
+    assert fp / len(probes) < 0.03
+
+
+def test_every_pair_key_is_in_the_filter(synthetic_engine):
+    engine = synthetic_engine
+    keys = engine.pair_keys
+    assert len(keys) and engine.pair_filter.count == len(keys)
+    for key in keys.tolist():
+        assert key in engine.pair_filter
+        lo, hi = key >> 32, key & 0xFFFFFFFF
+        assert engine.pair_filter.contains_pair(hi, lo)
+
+
+def test_every_row_name_pair_passes_the_filter(synthetic_engine):
+    engine = synthetic_engine
+    df = engine.df
+    for side_a in ('제품명A_lower', '성분명A_lower'):
+        for side_b in ('제품명B_lower', '성분명B_lower'):
+            for a, b in zip(df[side_a], df[side_b]):
+                if pd.notna(a) and pd.notna(b):
+                    assert engine._maybe_pair(a, b) and engine._maybe_pair(b, a), (a, b)
+
+
+def test_exported_filter_keeps_every_key(synthetic_engine):
+    exported = synthetic_engine.export_indexes()
+    bloom = BloomFilter(*exported['pair_filter'])
+    assert bloom.expected_fp_rate() <= PAIR_FILTER_FP_RATE * 1.5
+    assert all(int(key) in bloom for key in exported['pair_keys'])
+
+
+def test_filter_does_not_change_answers():
+    df = pd.read_csv(os.path.join(SAMPLES, 'dur_sample.csv'), encoding='utf-8', dtype=str)
+    rows = [tuple(row) for row in df.itertuples(index=False)]
+    filtered, unfiltered = make_engine(rows), make_engine(rows)
+    unfiltered.use_pair_filter = False
+    products = sorted({p.strip() for row in rows for p in (row[0], row[2])})
+    for a in products:
+        for b in products:
+            assert filtered.check_interaction(a, b) == unfiltered.check_interaction(a, b), (a, b)
+    assert pair_id(5, 3) == pair_id(3, 5) == (3 << 32) | 5
+
+
+@pytest.mark.parametrize('use_filter', [False, True])
+def test_measure_restores_filter_setting(use_filter):
+    df = pd.read_csv(os.path.join(SAMPLES, 'dur_sample.csv'), encoding='utf-8', dtype=str)
+    engine = make_engine([tuple(row) for row in df.itertuples(index=False)])
+    engine.use_pair_filter = use_filter
+    pairs = [(a, b) for a, b in zip(df['제품명A'], df['제품명B'])]
+    report = measure(engine, pairs, fp_probes=100)
+    assert report['mismatches'] == 0
+    assert engine.use_pair_filter is use_filter
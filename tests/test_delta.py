@@ -0,0 +1,127 @@
+# tests/test_delta.py
+# 변경분 반영(drug_delta)이 바뀐 CSV로 스냅샷을 처음부터 다시 만든 결과와 같고, 출처 비트를 올바르게 남기는지 확인합니다.
+
+import itertools
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import SAMPLES, base_rows
+from drug_delta import apply_delta_file
+from drug_engine import BASE_COLUMNS, NAME_COLUMNS, SOURCE_COLUMN, load_dataframe
+from drug_kvstore import PairStore
+from drug_snapshot import build_snapshot, load_snapshot_engine, read_manifest, read_snapshot
+
+EXTRA_ROWS = [
+    ('엑스정', '엑스성분', '와이정', '와이성분', '병용 시 주의'),
+    ('엑스정', '엑스성분', '와이정', '와이성분', '병용금기'),
+]
+DELTA_ROWS = [
+    ('add', '리피토정10밀리그램', '아토르바스타틴칼슘', '이트라정', '이트라코나졸', '횡문근융해 위험 증가'),
+    ('add', '딜라트렌정', '카르베딜롤', '베라실정', '베라파밀염산염', '서맥 및 심장 부정맥'),   # 이미 있는 행
+    ('remove', '비아그라정50밀리그램', '실데나필시트르산염', '니트로글리세린설하정', '니트로글리세린', None),
+    ('remove', '코다론정', '아미오다론염산염', '시프로바이정250밀리그램', '시프로플록사신염산염',
+     'QT간격 연장 위험 증가'),
+    ('change', '엑스정', '엑스성분', '와이정', '와이성분', '병용금기'),   # 두 행이 같아짐
+    ('change', '레일라정', None, '트라마돌캡슐', '트라마돌염산염', '중추신경 억제 주의'),
+]
+
+
+@pytest.fixture
+def base_csv(tmp_path):
+    df = pd.read_csv(os.path.join(SAMPLES, 'dur_sample.csv'), encoding='utf-8', dtype=str)
+    df = pd.concat([df, pd.DataFrame(EXTRA_ROWS, columns=BASE_COLUMNS)], ignore_index=True)
+    path = tmp_path / 'base.csv'
+    df.to_csv(path, index=False, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def delta_csv(tmp_path):
+    path = tmp_path / 'delta.csv'
+    pd.DataFrame(DELTA_ROWS, columns=['작업'] + BASE_COLUMNS).to_csv(path, index=False, encoding='utf-8')
+    return str(path)
+
+
+def patched_csv(base_csv, out_path):
+    """변경분을 원본 CSV에 직접 반영한 결과 (전체 재생성용 기대값)"""
+    df = load_dataframe(base_csv)[BASE_COLUMNS].copy()
+    names = lambda frame: list(map(tuple, frame[NAME_COLUMNS].fillna('\0').to_numpy()))  # noqa: E731
+    for op, *row in DELTA_ROWS:
+        row_names = tuple('\0' if v is None else v for v in row[:4])
+        same_names = pd.Series([n == row_names for n in names(df)], index=df.index)
+        if op == 'remove':
+            df = df[~(same_names & ((df['상세정보'] == row[4]) if row[4] else True))]
+        elif op == 'change':
+            df.loc[same_names, '상세정보'] = row[4]
+    adds = pd.DataFrame([row for op, *row in DELTA_ROWS if op == 'add'], columns=BASE_COLUMNS)
+    df = pd.concat([df, adds], ignore_index=True).drop_duplicates(ignore_index=True)
+    df.to_csv(out_path, index=False, encoding='utf-8')
+    return str(out_path)
+
+
+def _pair_answers(version, root):
+    store = PairStore(read_snapshot(version, root)[3])
+    try:
+        return {tuple(sorted(entry[:2])): tuple(entry[2:]) for entry in store}
+    finally:
+        store.close()
+
+
+def _name_pairs(indexes):
+    vocab = indexes['name_vocab']
+    return {tuple(sorted((vocab[int(key) >> 32], vocab[int(key) & 0xFFFFFFFF]))) for key in indexes['pair_keys']}
+
+
+def test_delta_matches_full_rebuild(tmp_path, base_csv, delta_csv):
+    root, full_root = str(tmp_path / 'snapshots'), str(tmp_path / 'full')
+    build_snapshot(base_csv, root)
+    version = apply_delta_file(delta_csv, root)
+    expected = build_snapshot(patched_csv(base_csv, tmp_path / 'patched.csv'), full_root)
+
+    _, df, indexes, _ = read_snapshot(version, root)
+    _, full_df, full_indexes, _ = read_snapshot(expected, full_root)
+    assert df[BASE_COLUMNS].fillna('').values.tolist() == full_df[BASE_COLUMNS].fillna('').values.tolist()
+    assert read_manifest(version, root)['delta']['merged'] == 1
+    assert _name_pairs(indexes) == _name_pairs(full_indexes)
+    assert indexes['all_names'] == full_indexes['all_names']
+    assert _pair_answers(version, root) == _pair_answers(expected, full_root)
+
+    engine, full = load_snapshot_engine(version, root), load_snapshot_engine(expected, full_root)
+    try:
+        products = sorted(set(full_df['제품명A']) | set(full_df['제품명B']))
+        for a, b in itertools.combinations(products, 2):
+            assert engine.check_interaction(a, b) == full.check_interaction(a, b), (a, b)
+        for a, b in [('리피토', '이트라정'), ('비아그라', '니트로글리세린'), ('엑스정', '와이성분'), ('레일라정', '트라마돌')]:
+            assert engine.check_drug_interaction_flexible(a, b) == full.check_drug_interaction_flexible(a, b)
+    finally:
+        engine.pair_store.close()
+        full.pair_store.close()
+
+
+def test_delta_rows_carry_delta_provenance(tmp_path, base_csv, delta_csv):
+    root = str(tmp_path / 'snapshots')
+    build_snapshot(base_csv, root, stream=True)
+    version = apply_delta_file(delta_csv, root)
+
+    manifest = read_manifest(version, root)
+    assert [(s['name'], s['bit']) for s in manifest['sources']] == [('base', 0), ('delta', 1)]
+    _, df, _, _ = read_snapshot(version, root)
+    assert base_rows(df) == base_rows(load_dataframe(patched_csv(base_csv, tmp_path / 'patched.csv')))
+
+    provenance = {(row[0], row[2], row[4]): mask
+                  for row, mask in zip(df[BASE_COLUMNS].itertuples(index=False), df[SOURCE_COLUMN])}
+    assert provenance[('리피토정10밀리그램', '이트라정', '횡문근융해 위험 증가')] == 2    # 추가: 변경분만
+    assert provenance[('딜라트렌정', '베라실정', '서맥 및 심장 부정맥')] == 3           # 이미 있던 행을 추가
+    assert provenance[('엑스정', '와이정', '병용금기')] == 3                          # 변경 후 합쳐진 행
+    assert provenance[('레일라정', '트라마돌캡슐', '중추신경 억제 주의')] == 3
+    assert provenance[('조코정20밀리그램', '이트라정', '병용금기: 횡문근융해 위험 증가')] == 1
+
+    engine = load_snapshot_engine(version, root)
+    try:
+        assert '출처: delta' in engine.check_ingredient_pair('아토르바스타틴칼슘', '이트라코나졸')[1]
+        assert '출처: base)' in engine.check_ingredient_pair('심바스타틴', '이트라코나졸')[1]
+        assert '출처: base, delta' in engine.check_ingredient_pair('카르베딜롤', '베라파밀염산염')[1]
+    finally:
+        engine.pair_store.close()
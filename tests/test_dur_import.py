@@ -0,0 +1,43 @@
+# tests/test_dur_import.py
+# DUR 원본 샘플(XML/JSON/XLSX)을 가져오면 같은 내용의 CSV와 행 단위로 같은 결과가 나오는지 확인합니다.
+
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import SAMPLES, base_rows
+from drug_dur_import import check_samples, import_file, iter_json_records
+from drug_engine import load_dataframe
+from drug_ingest import read_columnar
+
+SAMPLE_CSV = os.path.join(SAMPLES, 'dur_sample.csv')
+FORMATS = ['xml', 'json', 'xlsx']
+
+
+@pytest.fixture(scope='module')
+def csv_rows():
+    return base_rows(load_dataframe(SAMPLE_CSV))
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+@pytest.mark.parametrize('chunk_rows', [None, 3])
+def test_sample_matches_csv(tmp_path, csv_rows, fmt, chunk_rows):
+    out_dir = str(tmp_path / 'columns')
+    stats = import_file(os.path.join(SAMPLES, f'dur_sample.{fmt}'), out_dir, chunk_rows=chunk_rows)
+    assert stats['format'] == fmt
+    assert stats['source_rows'] == len(pd.read_csv(SAMPLE_CSV, dtype=str))
+    assert stats['rows'] == len(csv_rows)
+    assert base_rows(read_columnar(out_dir)) == csv_rows
+
+
+def test_check_samples_reports_same_rows_for_every_format():
+    results = check_samples(SAMPLES)
+    assert sorted(results) == sorted(['dur_sample.csv'] + [f'dur_sample.{fmt}' for fmt in FORMATS])
+    rows = {name: result[1] for name, result in results.items()}
+    assert all(r == rows['dur_sample.csv'] for r in rows.values())
+
+
+def test_json_reader_is_independent_of_read_size():
+    path = os.path.join(SAMPLES, 'dur_sample.json')
+    assert list(iter_json_records(path, read_size=7)) == list(iter_json_records(path))
@@ -0,0 +1,93 @@
+# tests/test_engine_ingredients.py
+# 성분 ID 집합(복합제, 염 표기) 경로가 인덱스 준비 여부와 관계없이 같은 답을 내는지 확인합니다.
+
+import itertools
+
+import pytest
+
+COMBO_ROWS = [
+    ('타이레놀이알서방정', '아세트아미노펜', '쿠마딘정', '와파린나트륨', '와파린 효과 증가로 출혈 위험 증가'),
+    ('게보린정', '아세트아미노펜/이소프로필안티피린/카페인무수물', '아스피린정', '아스피린', '위장관 자극 가능'),
+    ('판피린큐액', '아세트아미노펜/클로르페니라민말레산염/카페인무수물', '졸피뎀정', '졸피뎀타르타르산염', '중추신경 억제'),
+    ('카페인정', '카페인', '시프로바이정', '시프로플록사신염산염', '카페인 혈중농도 증가'),
+]
+COMBO_QUERIES = ['타이레놀이알서방정', '아세트아미노펜', '쿠마딘정', '와파린나트륨', '와파린', '게보린정', '아스피린정',
+                 '판피린큐액', '졸피뎀정', '카페인정', '카페인무수물', '시프로바이정', '클로르페니라민']
+
+
+def _pairs(queries):
+    return [pair for a, b in itertools.combinations(queries, 2) for pair in ((a, b), (b, a))]
+
+
+@pytest.mark.parametrize('drug_A, drug_B, expected, shared', [
+    # 복합제의 한 성분이 다른 제품의 행에 있는 경우: 같은 성분의 정보로 표시
+    ('게보린정', '와파린나트륨', '위험', True),
+    ('게보린정', '쿠마딘정', '위험', True),
+    ('판피린큐액', '와파린', '위험', True),
+    ('게보린정', '시프로바이정', '주의', True),
+    ('카페인무수물', '시프로바이정', '주의', True),
+    # 검색한 제품이 그대로 들어 있는 행
+    ('게보린정', '아스피린정', '정보 확인', False),
+    ('판피린큐액', '졸피뎀정', '정보 확인', False),
+    ('아세트아미노펜', '와파린', '위험', False),
+    ('카페인정', '시프로바이정', '주의', False),
+    # 공통 성분이 없는 조합
+    ('게보린정', '졸피뎀정', '정보 확인', True),
+    ('쿠마딘정', '시프로바이정', '안전', False),
+])
+def test_combination_product_results(engine_pair, drug_A, drug_B, expected, shared):
+    for engine in engine_pair(COMBO_ROWS):
+        risk, explanation = engine.check_drug_interaction_flexible(drug_A, drug_B)
+        assert risk == expected, (drug_A, drug_B, explanation)
+        assert ('같은 성분' in explanation) == shared, explanation
+
+
+def test_shared_ingredient_label_names_the_ingredients(engine_pair):
+    _, index = engine_pair(COMBO_ROWS)
+    _, explanation = index.check_drug_interaction_flexible('게보린정', '와파린나트륨')
+    assert '같은 성분 아세트아미노펜 / 와파린나트륨' in explanation
+    assert '(타이레놀이알서방정 / 쿠마딘정)' not in explanation
+
+
+def test_combination_products_scan_and_index_agree(engine_pair):
+    scan, index = engine_pair(COMBO_ROWS)
+    for drug_A, drug_B in _pairs(COMBO_QUERIES):
+        assert scan.check_drug_interaction_flexible(drug_A, drug_B) == \
+            index.check_drug_interaction_flexible(drug_A, drug_B), (drug_A, drug_B)
+
+
+def test_ingredient_sets_ready_before_background_build(engine_pair):
+    scan, _ = engine_pair(COMBO_ROWS)
+    assert scan.index_status['ingredients'] == 'ready'
+    assert scan.index_status['aliases'] == 'ready'
+    assert scan.index_status['ngram'] == 'pending'
+
+
+SALT_ROWS = [
+    ('아모잘탄정', '암로디핀캄실산염/로사르탄칼륨', '리튬정', '탄산리튬', '리튬 혈중농도 증가'),
+    ('노바스크정', '암로디핀베실산염', '심바스타틴정', '심바스타틴', '심바스타틴 혈중농도 증가'),
+    # SALT_WORDS에 없는 염 표기 (기본 성분 키가 어긋나도 부분 문자열 검색으로 찾아야 함)
+    ('오로디핀정', '암로디핀오로트산염', '클래리시드정', '클래리스로마이신', '암로디핀 혈중농도 증가'),
+]
+SALT_QUERIES = ['암로디핀', '암로디핀캄실산염', '암로디핀베실산염', '암로디핀오로트산염', 'amlodipine',
+                '리튬정', '탄산리튬', '심바스타틴', '클래리스로마이신', '아모잘탄정', '노바스크정', '오로디핀정']
+
+
+@pytest.mark.parametrize('drug_A, drug_B, expected', [
+    ('리튬정', '암로디핀', '주의'),
+    ('암로디핀', '리튬정', '주의'),
+    ('탄산리튬', '암로디핀캄실산염', '주의'),
+    ('암로디핀', '클래리스로마이신', '주의'),
+    ('심바스타틴', '암로디핀베실산염', '주의'),
+])
+def test_salt_variant_known_hits(engine_pair, drug_A, drug_B, expected):
+    scan, index = engine_pair(SALT_ROWS)
+    assert scan.check_drug_interaction_flexible(drug_A, drug_B)[0] == expected
+    assert index.check_drug_interaction_flexible(drug_A, drug_B)[0] == expected
+
+
+def test_salt_variants_scan_and_index_agree(engine_pair):
+    scan, index = engine_pair(SALT_ROWS)
+    for drug_A, drug_B in _pairs(SALT_QUERIES):
+        assert scan.check_drug_interaction_flexible(drug_A, drug_B) == \
+            index.check_drug_interaction_flexible(drug_A, drug_B), (drug_A, drug_B)
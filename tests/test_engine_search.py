@@ -0,0 +1,68 @@
+# tests/test_engine_search.py
+# 제품 검색과 자유 입력 상호작용 검색이 기존(V8) 의미를 유지하고, 인덱스 준비 여부와 관계없이 같은 답을 내는지 확인합니다.
+
+import itertools
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import SAMPLES, make_engine
+from drug_names import clean_query, parse_product_name
+
+SAMPLE_COLUMNS = ['제품명A', '성분명A', '제품명B', '성분명B']
+
+
+@pytest.fixture(scope='module')
+def sample_rows():
+    df = pd.read_csv(os.path.join(SAMPLES, 'dur_sample.csv'), encoding='utf-8', dtype=str)
+    return [tuple(row) for row in df.itertuples(index=False)]
+
+
+@pytest.fixture(scope='module')
+def sample_engines(sample_rows):
+    return make_engine(sample_rows), make_engine(sample_rows, build=True)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('비아그라정50밀리그램', '비아그라정50밀리그램'),   # 함량/'정'은 특정 제품 필터에 그대로 남김
+    ('타이레놀(500mg)', '타이레놀'),
+    ('판피린시럽', '판피린'),
+    ('ＡＳＰＩＲＩＮ 캡슐', 'aspirin'),
+    ('', ''),
+])
+def test_clean_query_keeps_v8_semantics(query, expected):
+    assert clean_query(query) == expected
+
+
+def test_parse_product_name_still_splits_strength_and_form():
+    parsed = parse_product_name('비아그라정50밀리그램')
+    assert (parsed.base, parsed.strength, parsed.unit, parsed.form) == ('비아그라', 50.0, 'mg', '정')
+
+
+def test_specific_product_filter_is_not_widened(sample_engines):
+    for engine in sample_engines:
+        risk, explanation = engine.check_drug_interaction_flexible('비아그라정50밀리그램', '니트로글리세린')
+        assert risk == '위험'
+        assert '비아그라서방정' not in explanation
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('레일라정', ['레일라서방정', '레일라정']),
+    ('딜라트렌정', ['딜라트렌서방정', '딜라트렌정']),
+    ('쿠마딘 2mg', ['쿠마딘정2밀리그램']),                                 # 함량이 있으면 구조화 컬럼으로
+    ('리피토 10mg', ['리피토서방정10밀리그램', '리피토정10밀리그램']),
+])
+def test_search_products(sample_engines, query, expected):
+    for engine in sample_engines:
+        assert engine.search_products(query) == expected
+
+
+def test_search_and_flexible_scan_and_index_agree(sample_rows, sample_engines):
+    scan, index = sample_engines
+    names = sorted({name for row in sample_rows for name in row[:4] if isinstance(name, str)})
+    for name in names:
+        assert scan.search_products(name) == index.search_products(name), name
+    for drug_A, drug_B in itertools.combinations(names, 2):
+        assert scan.check_drug_interaction_flexible(drug_A, drug_B) == \
+            index.check_drug_interaction_flexible(drug_A, drug_B), (drug_A, drug_B)
@@ -0,0 +1,84 @@
+# tests/test_ingest.py
+# 스트리밍 적재(drug_ingest)가 load_dataframe과 같은 행을 남기고, 중복 판정을 해시만으로 하지 않는지 확인합니다.
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SAMPLES, base_rows
+from drug_engine import BASE_COLUMNS, SOURCE_COLUMN, load_dataframe
+from drug_ingest import (INGEST_MAX_CHUNK_ROWS, INGEST_PROBE_ROWS, RowDeduplicator, _next_chunk_rows,
+                         ingest_chunks, ingest_csv, read_columnar)
+
+SAMPLE_CSV = os.path.join(SAMPLES, 'dur_sample.csv')
+
+
+@pytest.mark.parametrize('chunk_rows', [None, 1, 4, 7])
+def test_stream_ingest_matches_load_dataframe(tmp_path, chunk_rows):
+    stats = ingest_csv(SAMPLE_CSV, str(tmp_path / 'columns'), chunk_rows=chunk_rows)
+    expected = load_dataframe(SAMPLE_CSV)
+    assert stats['rows'] == len(expected)
+    assert base_rows(read_columnar(str(tmp_path / 'columns'))) == base_rows(expected)
+
+
+def test_chunk_mem_is_a_chunk_size_hint(tmp_path):
+    # 청크 크기는 현재 RSS와 관계없이 행당 메모리와 chunk_mem_mb로만 정해짐
+    assert _next_chunk_rows(None, 256) == INGEST_PROBE_ROWS
+    assert _next_chunk_rows(1024, 1) == 1024
+    assert _next_chunk_rows(1, 1024) == INGEST_MAX_CHUNK_ROWS
+    ingest_csv(SAMPLE_CSV, str(tmp_path / 'columns'), chunk_mem_mb=1)
+    with open(tmp_path / 'columns' / 'meta.json', encoding='utf-8') as f:
+        stats = json.load(f)
+    assert stats['chunk_mem_mb'] == 1 and 'max_rss_mb' not in stats
+    assert stats['peak_rss_mb'] > 0
+
+
+def test_whitespace_variants_are_one_row(tmp_path):
+    rows = [('코다론정', '아미오다론염산염', '쿠마딘정', '와파린나트륨', '출혈 위험 증가'),
+            ('  코다론정 ', '아미오다론염산염', '쿠마딘정', ' 와파린나트륨', '출혈 위험 증가  '),
+            ('코다론정', '', '쿠마딘정', '와파린나트륨', '출혈 위험 증가')]
+    csv_path = tmp_path / 'rows.csv'
+    pd.DataFrame(rows, columns=BASE_COLUMNS).to_csv(csv_path, index=False, encoding='utf-8')
+
+    loaded = load_dataframe(str(csv_path))
+    ingest_csv(str(csv_path), str(tmp_path / 'columns'), chunk_rows=1)
+    streamed = read_columnar(str(tmp_path / 'columns'))
+    assert len(loaded) == len(streamed) == 2
+    assert base_rows(loaded) == base_rows(streamed)
+    assert streamed['성분명A'].isna().sum() == 1
+
+
+def test_dedup_confirms_hash_matches_against_values(monkeypatch):
+    # 모든 행의 해시가 같아도 값이 다른 행은 버리지 않아야 함
+    monkeypatch.setattr(pd.util, 'hash_pandas_object',
+                        lambda df, index=False: pd.Series(np.zeros(len(df), dtype=np.uint64)))
+    dedup = RowDeduplicator(width=2)
+    first = dedup.filter(np.array([[0, 1], [2, 3], [0, 1]], dtype=np.int32), 1)
+    second = dedup.filter(np.array([[2, 3], [4, 5], [0, 1], [6, 7]], dtype=np.int32), 2)
+    assert first.tolist() == [True, True, False]
+    assert second.tolist() == [False, True, False, True]
+    assert dedup.provenance.tolist() == [3, 3, 2, 2]
+
+
+def test_dedup_across_many_chunks_matches_drop_duplicates():
+    rng = np.random.default_rng(0)
+    chunks = [rng.integers(0, 6, size=(int(rng.integers(1, 50)), 3)).astype(np.int32) for _ in range(40)]
+    dedup = RowDeduplicator(width=3)
+    kept = np.concatenate([chunk[dedup.filter(chunk, 1)] for chunk in chunks])
+    expected = pd.DataFrame(np.concatenate(chunks)).drop_duplicates().to_numpy()
+    assert kept.tolist() == expected.tolist()
+    assert len(dedup.runs) <= int(np.log2(len(kept))) + 1
+
+
+def test_provenance_from_every_source(tmp_path):
+    row = ('코다론정', '아미오다론염산염', '쿠마딘정', '와파린나트륨', '출혈 위험 증가')
+    other = ('리피토정', '아토르바스타틴칼슘', '클래리시드정', '클래리스로마이신', '근육병증 위험 증가')
+    chunks = [(0, pd.DataFrame([row], columns=BASE_COLUMNS)),
+              (1, pd.DataFrame([other, row], columns=BASE_COLUMNS))]
+    stats = ingest_chunks(chunks, str(tmp_path / 'columns'), source_names=['a', 'b'])
+    df = read_columnar(str(tmp_path / 'columns'))
+    assert stats['rows'] == 2
+    assert df[SOURCE_COLUMN].tolist() == [3, 2]
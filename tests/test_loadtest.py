@@ -0,0 +1,57 @@
+# tests/test_loadtest.py
+# 부하 측정의 연결들이 서로 다른 순서로 요청을 보내고, 실제 서버에 오류 없이 요청하는지 확인합니다.
+
+import asyncio
+import os
+
+import drug_loadtest
+from conftest import SAMPLES
+from drug_loadtest import build_requests, run_load
+
+
+class FakeWriter:
+    def close(self):
+        pass
+
+
+def test_connections_use_different_request_sequences(monkeypatch):
+    requests = build_requests(os.path.join(SAMPLES, 'dur_sample.csv'), count=200)
+    sent = {}
+
+    async def open_connection(host, port):
+        return None, FakeWriter()
+
+    async def send(reader, writer, host, method, target, body):
+        sent.setdefault(id(writer), []).append(target)
+        await asyncio.sleep(0)
+        return 200
+
+    monkeypatch.setattr(drug_loadtest.asyncio, 'open_connection', open_connection)
+    monkeypatch.setattr(drug_loadtest, '_send', send)
+    result = asyncio.run(run_load('127.0.0.1', 0, requests, concurrency=4, seconds=0.05))
+
+    sequences = [tuple(targets[:20]) for targets in sent.values()]
+    assert len(sequences) == 4 and all(len(s) == 20 for s in sequences)
+    assert len(set(sequences)) == 4
+    assert result['errors'] == 0 and result['requests'] == sum(len(t) for t in sent.values())
+
+
+def test_same_seed_repeats_the_same_sequences(monkeypatch):
+    requests = build_requests(os.path.join(SAMPLES, 'dur_sample.csv'), count=200)
+    runs = []
+    for _ in range(2):
+        sent = {}
+
+        async def open_connection(host, port):
+            return None, FakeWriter()
+
+        async def send(reader, writer, host, method, target, body, sent=sent):
+            sent.setdefault(id(writer), []).append(target)
+            await asyncio.sleep(0)
+            return 200
+
+        monkeypatch.setattr(drug_loadtest.asyncio, 'open_connection', open_connection)
+        monkeypatch.setattr(drug_loadtest, '_send', send)
+        asyncio.run(run_load('127.0.0.1', 0, requests, concurrency=3, seconds=0.05, seed=7))
+        runs.append(sorted(tuple(t[:10]) for t in sent.values()))
+    assert runs[0] == runs[1]
@@ -0,0 +1,61 @@
+# tests/test_prescriptions.py
+# 처방 묶음 확인(check_prescriptions)이 쌍마다 따로 확인한 답과 같은지, 인덱스 준비 여부와 관계없이 확인합니다.
+
+import os
+import random
+
+import pandas as pd
+import pytest
+
+from conftest import SAMPLES, make_engine
+
+CHECKS = {'product': 'check_interaction', 'text': 'check_drug_interaction_flexible',
+          'ingredient': 'check_ingredient_pair'}
+
+
+@pytest.fixture(scope='module')
+def sample_rows():
+    df = pd.read_csv(os.path.join(SAMPLES, 'dur_sample.csv'), encoding='utf-8', dtype=str)
+    return [tuple(row) for row in df.itertuples(index=False)]
+
+
+def _names(rows, mode):
+    if mode == 'product':
+        names = {name for row in rows for name in (row[0], row[2])}
+    elif mode == 'ingredient':
+        names = {name for row in rows for name in (row[1], row[3]) if isinstance(name, str)}
+    else:
+        names = {name for row in rows for name in row[:4] if isinstance(name, str)} | {'와파린', '리피토', '타이레놀'}
+    return sorted(names) + ['없는약정']
+
+
+def _prescriptions(names, count=30, seed=0):
+    rng = random.Random(seed)
+    batch = [rng.sample(names, rng.randint(2, 6)) for _ in range(count)]
+    batch.append([names[0], names[0], names[1]])   # 처방 안의 중복 이름
+    batch.append([names[0]])                       # 쌍이 없는 처방
+    return batch
+
+
+@pytest.mark.parametrize('build', [False, True])
+@pytest.mark.parametrize('mode', list(CHECKS))
+def test_batch_equals_per_pair(sample_rows, mode, build):
+    batch = _prescriptions(_names(sample_rows, mode))
+    results = make_engine(sample_rows, build=build).check_prescriptions(batch, mode)
+
+    per_pair = getattr(make_engine(sample_rows, build=build), CHECKS[mode])   # 캐시를 나눠 쓰지 않는 엔진
+    assert len(results) == len(batch)
+    for drugs, rows in zip(batch, results):
+        unique = list(dict.fromkeys(drugs))
+        assert [(a, b) for a, b, _, _ in rows] == [(a, b) for i, a in enumerate(unique) for b in unique[i + 1:]]
+        for a, b, risk, explanation in rows:
+            assert (risk, explanation) == tuple(per_pair(a, b)), (mode, a, b)
+
+
+@pytest.mark.parametrize('mode', list(CHECKS))
+def test_iter_interactions_matches_batch(sample_rows, mode):
+    engine = make_engine(sample_rows, build=True)
+    drugs = _names(sample_rows, mode)[:10]
+    rows = engine.check_prescriptions([drugs], mode)[0]
+    streamed = list(engine.iter_interactions(drugs, mode))
+    assert sorted(streamed) == sorted(row for row in rows if row[2] != "안전")
@@ -0,0 +1,106 @@
+# tests/test_reload.py
+# 데이터가 바뀌어 엔진을 교체하면 이전 엔진의 키-값 파일(mmap)을 닫고 백그라운드 작업을 멈추며,
+# 처리 중이던 요청은 같은 답을 받는지 확인합니다.
+
+import os
+import threading
+import time
+
+import pytest
+
+import drug_warmup
+
+from conftest import SAMPLES
+from drug_engine import DrugEngine, load_dataframe
+from drug_kvstore import PairStore, build_pair_file
+from drug_reload import EngineHolder, PollingReloader
+from drug_warmup import start_warmup
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'druglist.csv'
+    path.write_bytes(open(os.path.join(SAMPLES, 'dur_sample.csv'), 'rb').read())
+    return str(path)
+
+
+def _build(tmp_path):
+    counter = iter(range(100))
+
+    def build_engine(file_path):
+        df = load_dataframe(file_path)
+        pair_path = str(tmp_path / f'pairs{next(counter)}.kv')
+        build_pair_file(df=df, out_path=pair_path)
+        return DrugEngine(df, pair_store=PairStore(pair_path))
+    return build_engine
+
+
+def test_reload_closes_the_old_pair_store(tmp_path, data_file):
+    build_engine = _build(tmp_path)
+    holder = EngineHolder(build_engine(data_file))
+    reloader = PollingReloader(holder, data_file, build_engine, interval=0.01)
+    old_engine = holder.current()
+    old_store = old_engine.pair_store
+    expected = old_engine.check_ingredient_pair('아스피린', '와파린나트륨')
+    assert expected[0] == '위험'
+
+    with open(data_file, 'a', encoding='utf-8') as f:
+        f.write('새약정,새성분,쿠마딘정2밀리그램,와파린나트륨,출혈 위험 증가\n')
+    assert reloader.check_once()
+
+    assert holder.current() is not old_engine and holder.current().pair_store is not None
+    assert old_engine.pair_store is None
+    assert old_store._mm.closed and old_store._file.closed
+    # 교체 전에 엔진을 받아 둔 요청도 데이터프레임으로 같은 답을 받음
+    assert old_engine.check_ingredient_pair('아스피린', '와파린나트륨') == expected
+    assert holder.current().check_ingredient_pair('새성분', '와파린나트륨')[0] == '위험'
+
+
+def test_lookup_on_a_closed_store_falls_back_to_the_dataframe(tmp_path, data_file):
+    engine = _build(tmp_path)(data_file)
+    expected = engine.check_ingredient_pair('심바스타틴', '이트라코나졸')
+    engine.pair_store.close()   # close() 전에 store를 잡은 요청과 같은 상황
+    assert engine.check_ingredient_pair('심바스타틴', '이트라코나졸') == expected
+
+
+def test_reload_stops_the_old_engines_background_work(tmp_path, data_file, monkeypatch):
+    warm_entry = drug_warmup._warm_entry
+    building = threading.Event()
+
+    def slow_warm_entry(engine, entry):
+        time.sleep(0.01)
+        warm_entry(engine, entry)
+    monkeypatch.setattr(drug_warmup, '_warm_entry', slow_warm_entry)
+
+    def build_engine(file_path):
+        engine = DrugEngine(load_dataframe(file_path))
+        ngram = engine._build_ngram_index
+
+        def slow_ngram():
+            building.set()
+            engine._closing.wait(5)   # close()가 불릴 때까지 첫 인덱스 생성이 이어짐
+            return ngram()
+        engine._build_ngram_index = slow_ngram
+        engine.start_index_build()
+        pairs = [('아스피린프로텍트정100밀리그램', f'약{i}') for i in range(500)]
+        _, engine.warmup_report = start_warmup(engine, str(tmp_path / 'no_log.txt'), pairs=pairs, names=[])
+        return engine
+
+    holder = EngineHolder(build_engine(data_file))
+    reloader = PollingReloader(holder, data_file, build_engine, interval=0.01)
+    old_engine = holder.current()
+    assert building.wait(5)
+
+    with open(data_file, 'a', encoding='utf-8') as f:
+        f.write('새약정,새성분,쿠마딘정2밀리그램,와파린나트륨,출혈 위험 증가\n')
+    assert reloader.check_once()
+
+    assert old_engine.closed and not old_engine._background_threads
+    assert old_engine.warmup_report['status'] == 'stopped'
+    assert old_engine.warmup_report['done'] < old_engine.warmup_report['total']
+    assert old_engine.index_report()['fuzzy'] == 'pending'
+    assert all(len(cache) == 0 for cache in old_engine.caches.values())
+    # 닫힌 엔진도 답은 하지만 캐시는 다시 채우지 않음
+    old_engine.check_interaction('아스피린프로텍트정100밀리그램', '쿠마딘정2밀리그램')
+    assert not old_engine.is_cached('interaction', ('아스피린프로텍트정100밀리그램', '쿠마딘정2밀리그램'))
+    holder.current().close()
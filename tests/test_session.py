@@ -0,0 +1,83 @@
+# tests/test_session.py
+# 세션 보관소가 크기 측정(pickle)과 디스크 보관을 잠금 밖에서 하고, 그동안 다른 요청을 막지 않는지 확인합니다.
+
+import threading
+
+import pytest
+
+from drug_session import DiskSpill, SessionStore
+
+
+class LockProbe:
+    """pickle될 때 보관소 잠금이 잡혀 있었는지 기록합니다."""
+
+    def __init__(self, store):
+        self.store = store
+        self.locked = []
+
+    def __reduce__(self):
+        self.locked.append(self.store._lock.locked())
+        return (str, ('probe',))
+
+
+class SlowSpill(DiskSpill):
+    """save 도중에 멈춰, 그동안 다른 스레드가 보관소를 쓸 수 있는지 확인하게 합니다."""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def save(self, session_id, payload):
+        self.entered.set()
+        assert self.release.wait(5)
+        super().save(session_id, payload)
+
+
+def test_measure_and_spill_outside_the_lock(tmp_path):
+    store = SessionStore(idle_timeout=0.0, spill=DiskSpill(str(tmp_path)), sweep_interval=3600)
+    probe = LockProbe(store)
+    store.get('a')['probe'] = probe
+    store.sweep(keep='other')
+    assert probe.locked and not any(probe.locked)
+    assert store.counts['spilled'] == 1 and store.stats()['sessions'] == 0
+    assert store.get('a')['probe'] == 'probe'   # 디스크에서 되살림
+    assert store.counts['restored'] == 1
+
+
+def test_other_sessions_are_served_while_spilling(tmp_path):
+    spill = SlowSpill(str(tmp_path))
+    store = SessionStore(idle_timeout=0.0, spill=spill, sweep_interval=3600)
+    store.get('idle').messages = ['hello']
+    sweeper = threading.Thread(target=store.sweep, kwargs={'keep': 'busy'})
+    sweeper.start()
+    try:
+        assert spill.entered.wait(5)
+        store.get('busy').messages = []           # 디스크에 쓰는 중에도 바로 응답
+        revived = store.get('idle')               # 쓰는 중인 세션은 메모리에서 그대로 되살림
+        assert revived.messages == ['hello']
+    finally:
+        spill.release.set()
+        sweeper.join(5)
+    assert not sweeper.is_alive()
+    assert store.counts['restored'] == 0 and store.counts['spilled'] == 0
+    assert spill.load('idle') is None             # 되살린 세션의 디스크 사본은 지움
+    assert store.get('idle') is revived
+
+
+def test_budget_warning_is_a_real_warning():
+    store = SessionStore(budget_bytes=10, min_idle=3600, sweep_interval=3600)
+    store.get('a').messages = ['x' * 100]
+    with pytest.warns(RuntimeWarning, match='예산'):
+        store.sweep()
+    assert store.stats()['sessions'] == 1         # 사용 중인 세션은 내보내지 않음
+
+
+def test_budget_eviction_drops_without_spill():
+    store = SessionStore(budget_bytes=300, min_idle=0.0, sweep_interval=3600)   # 세션 하나 약 210B
+    store.get('old').messages = ['x' * 150]
+    store.get('new').messages = ['y' * 150]
+    store.sweep()
+    assert store.counts['evicted_budget'] == 1 and store.counts['dropped'] == 1
+    assert store.get('new').messages == ['y' * 150]
+    assert 'messages' not in store.get('old')
@@ -0,0 +1,46 @@
+# tests/test_warmup.py
+# 조회 기록이 사용자 동작 하나에 한 줄씩 쌓이고, 크기 한도를 넘으면 돌려져 두 파일 이상 커지지 않는지 확인합니다.
+
+import os
+
+import pandas as pd
+
+from conftest import SAMPLES, make_engine
+from drug_warmup import append_query_log, read_query_log, run_warmup, select_warmup_targets
+
+DRUGS = ('아스피린프로텍트정100밀리그램', '쿠마딘정2밀리그램', '리피토정10밀리그램', '클래리시드정250밀리그램')
+
+
+def test_one_line_per_action(tmp_path):
+    log = str(tmp_path / 'query_log.txt')
+    append_query_log([DRUGS], log_path=log)                       # N:N 분석 한 번
+    append_query_log([('타이레놀',), ('아스피린',), ('',)], log_path=log)   # 입력 한 번의 이름들 (빈 이름 제외)
+    append_query_log([], log_path=log)
+    with open(log, encoding='utf-8') as f:
+        assert f.read().splitlines() == ['\t'.join(DRUGS), '타이레놀', '아스피린']
+    assert read_query_log(log) == {DRUGS: 1, ('타이레놀',): 1, ('아스피린',): 1}
+
+
+def test_log_is_rotated_at_the_size_cap(tmp_path):
+    log = str(tmp_path / 'query_log.txt')
+    for i in range(200):
+        append_query_log([(f'약물{i:03d}', '와파린')], log_path=log, max_bytes=1000)
+    assert os.path.getsize(log) < 1000 + 100
+    assert os.path.getsize(log + '.1') < 1000 + 100
+    counts = read_query_log(log)   # 돌려 둔 파일까지 읽음
+    assert ('약물199', '와파린') in counts
+    assert sum(counts.values()) < 200   # 가장 오래된 기록은 버려짐
+
+
+def test_warmup_fills_the_report_cache_for_logged_analyses(tmp_path):
+    df = pd.read_csv(os.path.join(SAMPLES, 'dur_sample.csv'), encoding='utf-8', dtype=str)
+    engine = make_engine([tuple(row) for row in df.itertuples(index=False)])
+    log = str(tmp_path / 'query_log.txt')
+    append_query_log([DRUGS], log_path=log)
+    append_query_log([DRUGS[:2]], log_path=log)
+
+    counts = read_query_log(log)
+    report = run_warmup(engine, select_warmup_targets(counts, pairs=[], names=[]), counts)
+    assert report['failed'] == 0 and report['coverage'] == 1.0
+    assert engine.is_cached('report', (DRUGS, 'product'))
+    assert engine.is_cached('interaction', DRUGS[:2])